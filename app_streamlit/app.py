@@ -20,6 +20,8 @@ if not os.getenv("OPENAI_API_KEY") and hasattr(st.secrets, "OPENAI_API_KEY"):
     os.environ["OPENAI_API_KEY"] = st.secrets.OPENAI_API_KEY
     os.environ["PINECONE_API_KEY"] = st.secrets.PINECONE_API_KEY
     os.environ["PINECONE_INDEX_NAME"] = st.secrets.PINECONE_INDEX_NAME
+    if hasattr(st.secrets, "VECTOR_STORE_BACKEND"):
+        os.environ["VECTOR_STORE_BACKEND"] = st.secrets.VECTOR_STORE_BACKEND
 
 # Debug prints
 print(f"Python path: {sys.path}")
@@ -27,9 +29,12 @@ print(f"Current working directory: {os.getcwd()}")
 print(f"Project root: {project_root}")
 print(f"OPENAI_API_KEY exists: {bool(os.getenv('OPENAI_API_KEY'))}")
 
-from noc_prototype.document_loader import DocumentLoader
 from noc_prototype.vector_store import VectorStore
 from noc_prototype.chat_engine import ChatEngine
+from noc_prototype.memory import ConversationMemory
+from noc_prototype.metrics import REGISTRY, record_stage, request_trace
+from noc_prototype.config import VECTOR_STORE_BACKEND, PRODUCT_AREA_KEYWORDS, DOCUMENT_TYPE_KEYWORDS, DEFAULT_TAG
+from noc_prototype.tags import build_filter
 from app_streamlit.utils import get_custom_css, format_source_documents
 
 # Page configuration
@@ -49,6 +54,36 @@ st.set_page_config(
 # Inject custom CSS
 st.markdown(get_custom_css(), unsafe_allow_html=True)
 
+# Check environment variables
+required_env_vars = ["OPENAI_API_KEY"]
+if VECTOR_STORE_BACKEND == "pinecone":
+    required_env_vars += ["PINECONE_API_KEY", "PINECONE_INDEX_NAME"]
+
+missing_vars = [var for var in required_env_vars if not os.getenv(var)]
+if missing_vars:
+    st.error(f"Missing required environment variables: {', '.join(missing_vars)}")
+    st.stop()
+
+# Clients, index connection and chain are built once per server process and
+# shared by every session; only chat history and settings live in the session
+@st.cache_resource(show_spinner="Loading existing knowledge base...")
+def get_vector_store() -> VectorStore:
+    return VectorStore()
+
+@st.cache_resource(show_spinner="Warming up the assistant...")
+def get_chat_engine() -> ChatEngine:
+    chat_engine = ChatEngine(get_vector_store().load_vector_store())
+    chat_engine.warm_up()
+    return chat_engine
+
+try:
+    vector_store = get_vector_store()
+    chat_engine = get_chat_engine()
+except Exception as e:
+    st.error(f"Could not load the knowledge base: {str(e)}")
+    st.info("Build the index with `python -m noc_prototype.initialize_db` and restart the app.")
+    st.stop()
+
 # Sidebar
 with st.sidebar:
     st.title("Settings ⚙️")
@@ -60,8 +95,22 @@ with st.sidebar:
         help="Controls randomness in responses"
     )
     
+    # Scoped questions only search chunks with matching tags
+    product_areas = st.multiselect(
+        "Product area",
+        options=list(PRODUCT_AREA_KEYWORDS) + [DEFAULT_TAG],
+        help="Only search documents about these products"
+    )
+    document_types = st.multiselect(
+        "Document type",
+        options=list(DOCUMENT_TYPE_KEYWORDS) + [DEFAULT_TAG],
+        help="Only search these kinds of documents"
+    )
+    search_filter = build_filter(product_area=product_areas or None, document_type=document_types or None)
+    
     if st.button("Clear Chat History"):
         st.session_state.messages = []
+        st.session_state.memory.clear()
         st.rerun()
 
     with st.expander("Debug Tools"):
@@ -69,37 +118,32 @@ with st.sidebar:
             stats = vector_store.verify_index_content()
             st.write(f"Documents in index: {stats}")
             
+        if st.button("Answer Cache Stats"):
+            st.json(chat_engine.answer_cache.stats())
+            
         if st.button("Test Retrieval"):
             test_query = "premium club voucher"
-            results = st.session_state.chat_engine.test_retrieval(test_query)
+            results = chat_engine.test_retrieval(test_query)
             for doc, score in results:
                 st.write(f"Score: {score}")
                 st.code(doc.page_content[:200])
+        
+        if st.button("Latency Metrics"):
+            summary = REGISTRY.summary()
+            st.write("Stage latencies (rolling percentiles):")
+            st.dataframe(summary["latencies"])
+            st.write("Counters:")
+            st.dataframe(summary["counters"])
+            st.write("Recent requests:")
+            st.json(list(REGISTRY.traces)[-5:])
+            st.download_button("Download Prometheus metrics", REGISTRY.to_prometheus(), file_name="noc_metrics.prom")
 
 # Initialize session state
-if "chat_engine" not in st.session_state:
-    # Initialize vector store
-    vector_store = VectorStore()
-    try:
-        with st.spinner("Loading existing knowledge base..."):
-            vs = vector_store.load_vector_store()
-    except:
-        with st.status("Processing documents...", expanded=True) as status:
-            st.write("Loading documents...")
-            loader = DocumentLoader()
-            documents = loader.load_documents()
-            
-            st.write("Creating vector embeddings...")
-            vs = vector_store.create_vector_store(documents)
-            
-            status.update(label="✅ Document processing complete!", state="complete")
-            time.sleep(1)
-    
-    # Initialize chat engine
-    st.session_state.chat_engine = ChatEngine(vs)
-
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "memory" not in st.session_state:
+    # Token-capped history used to turn follow-ups into standalone questions
+    st.session_state.memory = ConversationMemory()
 
 # Main chat interface
 st.title("NOC Team Assistant 🤖")
@@ -128,32 +172,47 @@ for message in st.session_state.messages:
 
 # Chat input
 if prompt := st.chat_input("How can I help you today?"):
+    st.session_state.messages.append({"role": "user", "content": prompt})
     with st.chat_message("user"):
         st.markdown(prompt)
     
-    with st.spinner("Thinking..."):
-        response, source_docs = st.session_state.chat_engine.get_response(prompt)
+    # Sources come back before generation starts; tokens are rendered as they arrive
+    # The engine's stages join this trace, so rendering shows up next to them
+    with st.chat_message("assistant"), request_trace("chat") as trace:
+        with st.spinner("Searching documentation..."):
+            source_docs, token_stream = chat_engine.stream_response(
+                prompt, temperature=temperature, memory=st.session_state.memory, filter=search_filter
+            )
         
-        # Debug info in sidebar
-        with st.sidebar:
-            with st.expander("Debug Info"):
-                st.write("Retrieved Documents:")
-                for i, doc in enumerate(source_docs, 1):
-                    st.write(f"Doc {i}:")
-                    st.code(doc.page_content[:200] + "...")
-
-    # Display assistant response
-    with st.chat_message("assistant"):
-        st.markdown(f"""
-            <div class="assistant-bubble">
-                <div class="main-text">{response}</div>
-            </div>
-        """, unsafe_allow_html=True)
+        response_placeholder = st.empty()
+        response = ""
+        render_seconds = 0.0
+        for token in token_stream:
+            response += token
+            start = time.perf_counter()
+            response_placeholder.markdown(f"""
+                <div class="assistant-bubble">
+                    <div class="main-text">{response}</div>
+                </div>
+            """, unsafe_allow_html=True)
+            render_seconds += time.perf_counter() - start
+        start = time.perf_counter()
         st.markdown(f"""
             <div class="source-text">
                 {format_source_documents(source_docs)}
             </div>
         """, unsafe_allow_html=True)
+        record_stage("render", render_seconds + time.perf_counter() - start)
+    
+    # Debug info in sidebar
+    with st.sidebar:
+        with st.expander("Debug Info"):
+            st.write("Retrieved Documents:")
+            for i, doc in enumerate(source_docs, 1):
+                st.write(f"Doc {i} (score: {doc.metadata.get('score', 0):.3f}):")
+                st.code(doc.page_content[:200] + "...")
+            st.write("Timing:")
+            st.json(trace.as_dict())
     
     # Store assistant response
     st.session_state.messages.append({
@@ -161,15 +220,3 @@ if prompt := st.chat_input("How can I help you today?"):
         "content": response,
         "sources": format_source_documents(source_docs)
     })
-
-# Check environment variables
-required_env_vars = [
-    "OPENAI_API_KEY",
-    "PINECONE_API_KEY",
-    "PINECONE_INDEX_NAME"
-]
-
-missing_vars = [var for var in required_env_vars if not os.getenv(var)]
-if missing_vars:
-    st.error(f"Missing required environment variables: {', '.join(missing_vars)}")
-    st.stop() 
\ No newline at end of file
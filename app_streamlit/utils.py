@@ -68,11 +68,11 @@ def format_source_documents(source_docs) -> str:
     """Format source documents into a readable string."""
     sources = []
     for doc in source_docs:
-        if hasattr(doc.metadata, 'source'):
+        if 'source' in doc.metadata:
             source = Path(doc.metadata['source']).name
-            page = doc.metadata.get('page', 1)
+            page = doc.metadata.get('page', 0) + 1  # Pages are stored zero-based
             sources.append(f"📄 {source} (Page {page})")
     
     if sources:
-        return "\n".join(["**Sources:**"] + list(set(sources)))
+        return "\n".join(["**Sources:**"] + list(dict.fromkeys(sources)))
     return "No source documents found." 
\ No newline at end of file
@@ -0,0 +1,129 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from langchain_core.documents import Document
+from .config import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_SIMILARITY
+from .utils import get_index_version
+import logging
+import re
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def normalize_query(query: str) -> str:
+    """Normalize a question for exact-match lookups."""
+    query = re.sub(r'\s+', ' ', query.lower()).strip()
+    return query.rstrip('?!. ')
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    sources: List[Document]
+    embedding: Optional[np.ndarray] = None
+
+class AnswerCache:
+    """Two-level cache of chat answers.
+
+    Level one matches the normalized question exactly; level two finds the
+    nearest previously answered question by embedding and accepts it above
+    a cosine similarity cutoff. Everything is dropped when the index
+    version changes, i.e. after documents are re-ingested.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 similarity_threshold: float = ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._matrix_keys = []
+        self._index_version = get_index_version()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _check_version(self):
+        version = get_index_version()
+        if version != self._index_version:
+            logger.info(f"Index version changed to {version}, clearing {len(self._entries)} cached answers")
+            self._entries.clear()
+            self._matrix = None
+            self._index_version = version
+
+    def get_exact(self, query: str) -> Optional[CachedAnswer]:
+        """Return the cached answer for the same normalized question."""
+        key = normalize_query(query)
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+            return entry
+
+    def get_similar(self, embedding: List[float]) -> Optional[Tuple[CachedAnswer, float]]:
+        """Return the closest cached answer if its question is similar enough."""
+        with self._lock:
+            self._check_version()
+            if self._matrix is None:
+                self._rebuild_matrix()
+
+            if self._matrix is not None:
+                similarities = self._matrix @ _unit(embedding)
+                best = int(np.argmax(similarities))
+                similarity = float(similarities[best])
+                if similarity >= self.similarity_threshold:
+                    key = self._matrix_keys[best]
+                    self._entries.move_to_end(key)
+                    self.semantic_hits += 1
+                    return self._entries[key], similarity
+
+            self.misses += 1
+            return None
+
+    def put(self, query: str, answer: str, sources: List[Document],
+            embedding: Optional[List[float]] = None):
+        """Store an answer for the question and evict the oldest past the size limit."""
+        key = normalize_query(query)
+        entry = CachedAnswer(
+            answer=answer,
+            sources=sources,
+            embedding=_unit(embedding) if embedding is not None else None
+        )
+        with self._lock:
+            self._check_version()
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def _rebuild_matrix(self):
+        self._matrix_keys = [key for key, entry in self._entries.items() if entry.embedding is not None]
+        if self._matrix_keys:
+            self._matrix = np.vstack([self._entries[key].embedding for key in self._matrix_keys])
+        else:
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> dict:
+        """Hit counts and rates for display and logging."""
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -0,0 +1,225 @@
+"""
+Offline performance benchmarks for ingestion, retrieval and answers.
+
+    python -m noc_prototype.benchmark
+    python -m noc_prototype.benchmark --llm-latency 0.4 --baseline benchmark_results/main.json
+
+Everything runs against the deterministic stand-ins in stand_ins.py, so the
+numbers depend only on this code and the injected latencies. Results are
+written as JSON; with --baseline, metrics that got worse by more than
+--tolerance are reported and the exit status is 1.
+"""
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from .answer_cache import AnswerCache
+from .chat_engine import ChatEngine
+from .corpus import CorpusStore
+from .document_loader import DocumentLoader, load_processed_documents
+from .lexical_index import BM25Index
+from .stand_ins import (
+    StandInEmbeddings, StandInLLM, StandInVectorStore, synthetic_corpus, synthetic_queries
+)
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """p50/p90/p99/mean/max in milliseconds of samples given in seconds."""
+    ms = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "max_ms": float(ms.max()),
+    }
+
+def _time_each(func: Callable, items) -> List[float]:
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def bench_chunking(documents: List[Dict]) -> Dict[str, float]:
+    """clean_text and token-aware chunking throughput."""
+    loader = DocumentLoader()
+    pages = [item["text"] for doc in documents for item in doc["content"]]
+    megabytes = sum(len(text.encode("utf-8")) for text in pages) / 1e6
+
+    start = time.perf_counter()
+    for text in pages:
+        loader.clean_text(text)
+    clean_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    chunks = sum(1 for _ in loader.iter_chunks(documents))
+    chunk_seconds = time.perf_counter() - start
+
+    return {
+        "pages": len(pages),
+        "megabytes": megabytes,
+        "clean_mb_per_second": megabytes / clean_seconds,
+        "chunk_pages_per_second": len(pages) / chunk_seconds,
+        "chunks": chunks,
+        "chunks_per_second": chunks / chunk_seconds,
+    }
+
+def bench_load_processed(documents: List[Dict], directory: str, repeats: int = 5) -> Dict[str, float]:
+    """Time to load the processed corpus from disk."""
+    with CorpusStore(directory) as corpus:
+        for doc in documents:
+            corpus.put(doc)
+    samples = _time_each(lambda _: load_processed_documents(directory), range(repeats))
+    return {
+        "documents": len(documents),
+        "load_min_ms": min(samples) * 1000,
+        "load_median_ms": float(np.median(samples)) * 1000,
+    }
+
+def build_engine(documents: List[Dict], embed_latency: float = 0.0, search_latency: float = 0.0,
+                 llm_latency: float = 0.0, token_latency: float = 0.0,
+                 embed_error_rate: float = 0.0, search_error_rate: float = 0.0,
+                 llm_error_rate: float = 0.0) -> ChatEngine:
+    """ChatEngine over stand-ins indexed with the given documents; answers are never cached."""
+    chunks = list(DocumentLoader().iter_chunks(documents))
+    embeddings = StandInEmbeddings()
+    store = StandInVectorStore(embeddings)
+    store.add_documents(chunks)
+    # Latency and failures apply to queries only, not to building the index
+    embeddings.latency = embed_latency
+    embeddings.failures.error_rate = embed_error_rate
+    store.latency = search_latency
+    store.failures.error_rate = search_error_rate
+    return ChatEngine(
+        store,
+        answer_cache=AnswerCache(similarity_threshold=1.01),
+        lexical_index=BM25Index.from_documents(chunks),
+        llm=StandInLLM(first_token_latency=llm_latency, token_latency=token_latency, error_rate=llm_error_rate)
+    )
+
+def bench_retrieval(engine: ChatEngine, queries: List[str]) -> Dict[str, float]:
+    """Per-query latency of embedding, hybrid search and re-ranking."""
+    return {"queries": len(queries), **latency_summary(_time_each(engine.retrieve, queries))}
+
+def bench_get_response(engine: ChatEngine, queries: List[str], allocation_queries: int = 20) -> Dict[str, float]:
+    """End-to-end get_response latency, then peak memory allocated per request."""
+    result = {"queries": len(queries), **latency_summary(_time_each(engine.get_response, queries))}
+
+    # Traced separately since tracemalloc slows every allocation down
+    peaks = []
+    tracemalloc.start()
+    try:
+        for query in queries[:allocation_queries]:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            engine.get_response(query + " (traced)")
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    result["peak_alloc_median_kb"] = float(np.median(peaks)) / 1024
+    result["peak_alloc_max_kb"] = max(peaks) / 1024
+    return result
+
+def run_benchmarks(documents: int = 20, pages: int = 10, queries: int = 200,
+                   embed_latency: float = 0.0, search_latency: float = 0.0,
+                   llm_latency: float = 0.0, token_latency: float = 0.0) -> Dict:
+    """Run every benchmark and return the results with the parameters used."""
+    corpus = list(synthetic_corpus(documents, pages))
+    query_list = list(synthetic_queries(queries))
+    results = {}
+
+    results["chunking"] = bench_chunking(corpus)
+    with tempfile.TemporaryDirectory() as directory:
+        results["load_processed_documents"] = bench_load_processed(corpus, directory)
+
+    engine = build_engine(corpus, embed_latency, search_latency, llm_latency, token_latency)
+    engine.retrieve("warm up")
+    results["retrieval"] = bench_retrieval(engine, query_list)
+    results["get_response"] = bench_get_response(engine, query_list)
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "documents": documents, "pages": pages, "queries": queries,
+            "embed_latency": embed_latency, "search_latency": search_latency,
+            "llm_latency": llm_latency, "token_latency": token_latency,
+        },
+        "benchmarks": results,
+    }
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def find_regressions(results: Dict, baseline: Dict, tolerance: float = 0.2) -> List[str]:
+    """Metrics worse than the baseline by more than tolerance (a fraction)."""
+    regressions = []
+    for bench, metrics in results["benchmarks"].items():
+        for name, value in metrics.items():
+            old = baseline.get("benchmarks", {}).get(bench, {}).get(name)
+            if not isinstance(old, (int, float)) or not old:
+                continue
+            lower_is_better = name.endswith("_ms") or name.endswith("_kb")
+            higher_is_better = name.endswith("_per_second")
+            if (lower_is_better and value > old * (1 + tolerance)) or \
+                    (higher_is_better and value < old * (1 - tolerance)):
+                regressions.append(f"{bench}.{name}: {old:.3f} -> {value:.3f}")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the offline performance benchmarks.")
+    parser.add_argument("--documents", type=int, default=20, help="Synthetic PDFs in the corpus")
+    parser.add_argument("--pages", type=int, default=10, help="Pages per synthetic PDF")
+    parser.add_argument("--queries", type=int, default=200, help="Queries for the latency benchmarks")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds added per embedding call")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Seconds added per vector query")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds to the first LLM token")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per generated token")
+    parser.add_argument("--output", help="Results file (default: benchmark_results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging, as a fraction")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = run_benchmarks(
+        args.documents, args.pages, args.queries,
+        args.embed_latency, args.search_latency, args.llm_latency, args.token_latency
+    )
+
+    output = Path(args.output or f"benchmark_results/{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    for bench, metrics in results["benchmarks"].items():
+        print(f"{bench}: " + ", ".join(f"{name}={value:.3g}" for name, value in metrics.items()))
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
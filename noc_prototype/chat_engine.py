@@ -1,24 +1,147 @@
-from langchain_openai import ChatOpenAI
-from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
-from .config import OPENAI_API_KEY, MODEL_NAME
+from langchain_core.documents import Document
+from .config import (
+    OPENAI_API_KEY, MODEL_NAME, RETRIEVAL_K, SCORE_THRESHOLD,
+    RETRIEVAL_CANDIDATES, FILTERED_RETRIEVAL_CANDIDATES, LEXICAL_INDEX_PATH, CONTEXT_TOKEN_BUDGET,
+    SINGLE_FLIGHT_IDLE_TIMEOUT
+)
 from noc_prototype.vector_store import get_vector_store
-from langchain.prompts import PromptTemplate
+from .answer_cache import AnswerCache, CachedAnswer, normalize_query
+from .context import PackedContext, pack_context
+from .memory import ConversationMemory, Turn
+from .metrics import RequestTrace, activate_trace, begin_trace, count, end_trace, record_stage, span
+from .lexical_index import BM25Index, reciprocal_rank_fusion
+from .rerank import mmr_select
+from .tags import Filter, filter_key
+from langchain_core.prompts import PromptTemplate
+from .utils import count_tokens, get_index_version, iterate_sync, run_sync
+import asyncio
 import logging
 import re
-from typing import List
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
+NO_ANSWER = "I cannot answer this question as it's not covered in the NOC documentation."
+
+async def _aiter_once(text: str) -> AsyncIterator[str]:
+    yield text
+
+async def _finish_after(tokens: AsyncIterator[str], trace, owned: bool) -> AsyncIterator[str]:
+    """Yield the tokens, then record the request trace if this request started it."""
+    try:
+        async for token in tokens:
+            yield token
+    finally:
+        if owned:
+            end_trace(trace)
+
+class _SharedAnswer:
+    """An answer produced once and read by every identical question in flight.
+
+    The producer times its stages into a trace of its own, which each reader
+    merges into its request trace once the answer is done.
+    """
+
+    def __init__(self):
+        self.trace = RequestTrace("shared_answer")
+        self.sources: List[Document] = []
+        self.query_embedding: Optional[List[float]] = None
+        self.parts: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._ready = False
+        self.prepared = asyncio.Event()
+        self.demanded = asyncio.Event()
+        self._changed = asyncio.Condition()
+
+    def set_prepared(self, sources: List[Document], query_embedding: Optional[List[float]]):
+        self.sources = sources
+        self.query_embedding = query_embedding
+        self._ready = True
+        self.prepared.set()
+
+    async def wait_prepared(self) -> Tuple[List[Document], Optional[List[float]]]:
+        """Sources and query embedding, or the error that prevented retrieval."""
+        await self.prepared.wait()
+        if not self._ready:
+            raise self.error or RuntimeError("Shared answer finished before retrieving sources")
+        return self.sources, self.query_embedding
+
+    async def publish(self, part: str):
+        async with self._changed:
+            self.parts.append(part)
+            self._changed.notify_all()
+
+    async def finish(self, error: Optional[BaseException] = None):
+        async with self._changed:
+            self.error = error
+            self.done = True
+            self._changed.notify_all()
+        self.prepared.set()
+
+    async def iter_parts(self) -> AsyncIterator[str]:
+        """Every part from the start, then new ones as they are published."""
+        self.demanded.set()
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: sent < len(self.parts) or self.done)
+                parts = self.parts[sent:]
+                done, error = self.done, self.error
+            for part in parts:
+                yield part
+            sent += len(parts)
+            if done and sent == len(self.parts):
+                if error is not None:
+                    raise error
+                return
+
+    async def answer(self) -> str:
+        return "".join([part async for part in self.iter_parts()])
+
+CONDENSE_TEMPLATE = """Given the conversation below and a follow-up question, rewrite the follow-up as a standalone question about the NOC documentation. Keep product names, error codes and other exact terms. If the question is already standalone, return it unchanged.
+
+Conversation:
+{history}
+
+Follow-up question: {question}
+
+Standalone question:"""
+
+def _doc_key(doc: Document) -> str:
+    """Identity of a chunk across the vector and lexical indexes."""
+    return doc.metadata.get("chunk_id") or doc.page_content
+
 class ChatEngine:
-    def __init__(self, vector_store):
-        """Initialize the chat engine with vector store and LLM."""
-        self.vector_store = vector_store
-        self.llm = ChatOpenAI(
-            model_name=MODEL_NAME,
-            openai_api_key=OPENAI_API_KEY,
-            temperature=0.2
-        )
+    def __init__(self, vector_store=None, answer_cache: Optional[AnswerCache] = None,
+                 lexical_index: Optional[BM25Index] = None, llm=None):
+        """Initialize the chat engine with vector store and LLM.
+
+        Without an explicit vector store the backend set in config is loaded.
+        Without an explicit lexical index the one built at ingestion is used;
+        retrieval is vector-only while that index is empty. Without an
+        explicit LLM the configured OpenAI chat model is used.
+        """
+        self.vector_store = vector_store if vector_store is not None else get_vector_store()
+        self.answer_cache = answer_cache if answer_cache is not None else AnswerCache()
+        self._lexical_index = lexical_index
+        self._lexical_version = None
+        self._reload_lexical = lexical_index is None
+        
+        # Answers being generated, by normalized standalone question, temperature and filter
+        self._in_flight: Dict[Tuple[str, Optional[float], str], _SharedAnswer] = {}
+        self._producers: Set[asyncio.Task] = set()
+        
+        if llm is None:
+            # Imported here so that importing the module stays cheap
+            from langchain_openai import ChatOpenAI
+            llm = ChatOpenAI(
+                model_name=MODEL_NAME,
+                openai_api_key=OPENAI_API_KEY,
+                temperature=0.2
+            )
+        self.llm = llm
         
         # Create proper prompt template with explicit formatting instructions
         SYSTEM_TEMPLATE = """You are a helpful NOC (Network Operations Center) assistant specializing in technical documentation and procedures. 
@@ -57,65 +180,438 @@ Question: {question}
 
 Answer:"""
         
-        PROMPT = PromptTemplate(
+        # Prompt is filled directly with the retrieved documents so each
+        # query is embedded and searched exactly once
+        self.prompt = PromptTemplate(
             template=SYSTEM_TEMPLATE,
             input_variables=["context", "question"]
         )
         
-        # Create QA chain with custom prompt
-        self.qa_chain = ConversationalRetrievalChain.from_llm(
-            llm=self.llm,
-            retriever=self.vector_store.as_retriever(
-                search_kwargs={
-                    "k": 4  # Remove score_threshold as it's not supported
-                }
-            ),
-            return_source_documents=True,
-            combine_docs_chain_kwargs={"prompt": PROMPT},
-            verbose=True
+        # Follow-ups are rewritten into standalone questions from the capped
+        # session history; the answer prompt itself never carries history
+        self.condense_prompt = PromptTemplate(
+            template=CONDENSE_TEMPLATE,
+            input_variables=["history", "question"]
         )
 
-    def get_response(self, query: str) -> tuple[str, list]:
-        """Get response with document verification."""
-        try:
-            # Get documents and scores
-            docs_and_scores = self.vector_store.similarity_search_with_score(
-                query,
-                k=4
-            )
+    @property
+    def lexical_index(self) -> BM25Index:
+        """BM25 index over the indexed chunks, reloaded from disk after re-ingestion."""
+        if self._reload_lexical:
+            version = get_index_version()
+            if version != self._lexical_version:
+                self._lexical_index = BM25Index.load(LEXICAL_INDEX_PATH)
+                self._lexical_version = version
+        return self._lexical_index
+
+    async def aembed_query(self, query: str) -> List[float]:
+        """Embed the query once so it can be shared by the cache and the search."""
+        with span("embed_query"):
+            return await self.vector_store.embeddings.aembed_query(query)
+
+    async def aretrieve(self, query: str, query_embedding: Optional[List[float]] = None,
+                        filter: Optional[Filter] = None) -> List[Tuple[Document, float]]:
+        """
+        Retrieve documents above the score threshold in a single vector query,
+        fused with BM25 matches when the lexical index is available and
+        re-ranked for diversity down to RETRIEVAL_K. A metadata filter is
+        pushed down to the backend so only matching chunks are searched.
+        """
+        if query_embedding is None:
+            query_embedding = await self.aembed_query(query)
+        
+        # A scoped search has fewer chunks to choose from, so fewer candidates do
+        candidates_k = FILTERED_RETRIEVAL_CANDIDATES if filter else RETRIEVAL_CANDIDATES
+        
+        # Vector store clients are blocking, so search off the event loop
+        with span("vector_search"):
+            vector_hits = await asyncio.to_thread(self._search_with_vectors, query_embedding, candidates_k, filter)
+        
+        # Filter by score threshold manually
+        relevant = []
+        vectors = {}
+        for doc, score, vector in vector_hits:
+            if score >= SCORE_THRESHOLD:
+                # Keep the score on the document so callers can show it with citations
+                doc.metadata["score"] = score
+                relevant.append((doc, score))
+                vectors[_doc_key(doc)] = vector
+        
+        lexical_index = self.lexical_index
+        if len(lexical_index):
+            # Exact tokens such as error codes, hostnames and product names
+            # are matched lexically, in memory
+            with span("lexical_search"):
+                lexical_hits = lexical_index.search(query, k=candidates_k, filter=filter)
+            candidates = self._fuse(relevant, lexical_hits)
+        else:
+            candidates = relevant
+        
+        with span("rerank"):
+            return await asyncio.to_thread(self._diversify, candidates, vectors)
+
+    def _search_with_vectors(self, embedding: List[float], k: int,
+                             filter: Optional[Filter] = None) -> List[Tuple[Document, float, Optional[List[float]]]]:
+        """One vector query returning matches with their stored vectors where the store supports it."""
+        kwargs = {"filter": filter} if filter else {}
+        search = getattr(self.vector_store, "similarity_search_by_vector_with_vectors", None)
+        if search is not None:
+            return search(embedding, k=k, **kwargs)
+        return [
+            (doc, score, None)
+            for doc, score in self.vector_store.similarity_search_by_vector_with_score(embedding, k=k, **kwargs)
+        ]
+
+    def _fuse(self, vector_hits: List[Tuple[Document, float]],
+              lexical_hits: List[Tuple[Document, float]]) -> List[Tuple[Document, float]]:
+        """Merge vector and BM25 rankings with reciprocal rank fusion."""
+        docs = {}
+        for doc, _ in vector_hits:
+            docs.setdefault(_doc_key(doc), doc)
+        for doc, score in lexical_hits:
+            doc = docs.setdefault(_doc_key(doc), doc)
+            doc.metadata["bm25_score"] = score
+            doc.metadata.setdefault("score", 0.0)  # Lexical-only hits have no similarity
+        
+        fused = reciprocal_rank_fusion([
+            [_doc_key(doc) for doc, _ in vector_hits],
+            [_doc_key(doc) for doc, _ in lexical_hits],
+        ])
+        return [(docs[key], score) for key, score in fused]
+
+    def _diversify(self, candidates: List[Tuple[Document, float]],
+                   vectors: Dict[str, Optional[List[float]]]) -> List[Tuple[Document, float]]:
+        """
+        Pick RETRIEVAL_K candidates by maximal marginal relevance so overlapping
+        chunks and repeated boilerplate don't crowd the prompt. Vectors come
+        from the query results, else from the local embedding cache.
+        """
+        if len(candidates) <= RETRIEVAL_K:
+            return candidates
+        
+        keys = [_doc_key(doc) for doc, _ in candidates]
+        missing = [i for i, key in enumerate(keys) if vectors.get(key) is None]
+        cached_vectors = getattr(self.vector_store.embeddings, "cached_vectors", None)
+        if missing and cached_vectors is not None:
+            found = cached_vectors([candidates[i][0].page_content for i in missing])
+            for i, vector in zip(missing, found):
+                vectors[keys[i]] = vector
+        
+        order = mmr_select(
+            [score for _, score in candidates],
+            [vectors.get(key) for key in keys],
+            RETRIEVAL_K
+        )
+        return [candidates[i] for i in order]
+
+    def _build_context(self, docs: List[Document]) -> PackedContext:
+        """Pack retrieved documents into the prompt context within the token budget."""
+        return pack_context(docs, CONTEXT_TOKEN_BUDGET)
+
+    async def _acheck_cache(self, query: str, query_embedding: Optional[List[float]] = None
+                            ) -> Tuple[Optional[CachedAnswer], Optional[List[float]]]:
+        """Look the question up in the answer cache, embedding it only if needed."""
+        # Repeated questions are answered from the cache
+        with span("answer_cache"):
+            cached = self.answer_cache.get_exact(query)
+        if cached is not None:
+            count("noc_answer_cache_hits_total", match="exact")
+            logger.info(f"Answer cache exact hit: {self.answer_cache.stats()}")
+            return cached, None
+        
+        if query_embedding is None:
+            query_embedding = await self.aembed_query(query)
+        with span("answer_cache"):
+            similar = self.answer_cache.get_similar(query_embedding)
+        if similar is not None:
+            cached, similarity = similar
+            count("noc_answer_cache_hits_total", match="semantic")
+            logger.info(f"Answer cache semantic hit (similarity {similarity:.3f}): {self.answer_cache.stats()}")
+            return cached, query_embedding
+        
+        count("noc_answer_cache_misses_total")
+        return None, query_embedding
+
+    async def _areusable_sources(self, query: str, memory: Optional[ConversationMemory],
+                                 filter: Optional[Filter] = None
+                                 ) -> Tuple[Optional[List[Document]], Optional[List[float]]]:
+        """The previous turn's sources if this question follows up on them, and its embedding."""
+        # The previous turn's sources may lie outside a filter, so scoped questions always search
+        if memory is None or filter or memory.last_turn is None or not memory.last_turn.sources:
+            return None, None
+        query_embedding = await self.aembed_query(query)
+        return memory.reusable_sources(query_embedding), query_embedding
+
+    async def _aprepare_prompt(self, query: str, query_embedding: List[float],
+                               reused: Optional[List[Document]] = None,
+                               filter: Optional[Filter] = None) -> Tuple[List[Document], Optional[str]]:
+        """Retrieve sources, or use reused ones, and build the prompt; no prompt means nothing relevant was found."""
+        if reused is not None:
+            # Follow-up on the same topic: answer from the previous turn's sources
+            logger.info(f"Reusing {len(reused)} sources from the previous turn")
+            relevant_docs = reused
+        else:
+            docs_and_scores = await self.aretrieve(query, query_embedding, filter)
             
-            # Filter by score threshold manually
-            relevant_docs = [
-                doc for doc, score in docs_and_scores 
-                if score >= 0.2  # Manual score threshold
-            ]
+            if not docs_and_scores:
+                return [], None
             
-            if not relevant_docs:
-                return (
-                    "I cannot answer this question as it's not covered in the NOC documentation.",
-                    []
-                )
+            relevant_docs = [doc for doc, _ in docs_and_scores]
             
             # Log retrieved documents for verification
             logger.info("Retrieved documents:")
-            for i, doc in enumerate(relevant_docs, 1):
-                logger.info(f"Doc {i}: {doc.page_content[:200]}...")
+            for i, (doc, score) in enumerate(docs_and_scores, 1):
+                logger.info(f"Doc {i} (score {score:.3f}): {doc.page_content[:200]}...")
+        
+        # Answer from the same documents that are returned as sources
+        with span("context_pack"):
+            context = self._build_context(relevant_docs)
+        prompt = self.prompt.format(
+            context=context.text,
+            question=query
+        )
+        count("noc_prompt_tokens_total", count_tokens(prompt))
+        count("noc_context_tokens_saved_total", context.saved_tokens)
+        return context.documents, prompt
+
+    def _llm_for(self, temperature: Optional[float] = None):
+        """The shared LLM, bound to a per-request temperature when one is given."""
+        if temperature is None:
+            return self.llm
+        return self.llm.bind(temperature=temperature)
+
+    async def _acondense(self, query: str, memory: Optional[ConversationMemory]) -> str:
+        """Rewrite a follow-up as a standalone question, at most once per turn."""
+        if memory is None or not len(memory):
+            return query
+        
+        standalone = memory.get_condensed(query)
+        if standalone is None:
+            prompt = self.condense_prompt.format(history=memory.render(), question=query)
+            with span("condense"):
+                standalone = (await self._llm_for(0.0).ainvoke(prompt)).content.strip() or query
+            memory.set_condensed(query, standalone)
+            logger.info(f"Condensed follow-up question to: {standalone}")
+        return standalone
+
+    def _record_answer(self, answer: str):
+        count("noc_completion_tokens_total", count_tokens(answer))
+        count("noc_answer_bytes_total", len(answer.encode("utf-8")))
+
+    def _remember(self, memory: Optional[ConversationMemory], query: str, standalone: str,
+                  answer: str, sources: List[Document], query_embedding: Optional[List[float]]):
+        if memory is not None:
+            memory.add_turn(Turn(query, standalone, answer, sources, query_embedding))
+
+    def _shared_answer(self, standalone: str, temperature: Optional[float], stream: bool,
+                       filter: Optional[Filter] = None, reused: Optional[List[Document]] = None,
+                       query_embedding: Optional[List[float]] = None) -> _SharedAnswer:
+        """
+        The in-flight answer to the same question, or a new one. Identical
+        questions arriving while one is being answered share its embedding,
+        search and LLM call instead of repeating them.
+        
+        Only inputs that don't depend on the asker are shared. A follow-up
+        answered from its own conversation's previous sources (reused) gets
+        an answer of its own instead.
+        """
+        key = (normalize_query(standalone), temperature, filter_key(filter))
+        shared = self._in_flight.get(key) if reused is None else None
+        if shared is not None:
+            count("noc_coalesced_requests_total")
+            logger.info(f"Joining in-flight answer for: {standalone}")
+            return shared
+        
+        shared = _SharedAnswer()
+        if reused is None:
+            self._in_flight[key] = shared
+        # A task of its own, so one caller going away doesn't cancel it for the others
+        task = asyncio.ensure_future(
+            self._aproduce(shared, standalone, temperature, stream, filter, reused, query_embedding)
+        )
+        self._producers.add(task)
+        
+        def forget(task):
+            self._producers.discard(task)
+            if self._in_flight.get(key) is shared:
+                del self._in_flight[key]
+        
+        task.add_done_callback(forget)
+        return shared
+
+    async def _aproduce(self, shared: _SharedAnswer, standalone: str, temperature: Optional[float],
+                        stream: bool, filter: Optional[Filter] = None,
+                        reused: Optional[List[Document]] = None, query_embedding: Optional[List[float]] = None):
+        """Answer a standalone question into shared, from the cache or the LLM."""
+        with activate_trace(shared.trace):
+            await self._aproduce_traced(shared, standalone, temperature, stream, filter, reused, query_embedding)
+
+    async def _aproduce_traced(self, shared: _SharedAnswer, standalone: str, temperature: Optional[float],
+                               stream: bool, filter: Optional[Filter], reused: Optional[List[Document]],
+                               query_embedding: Optional[List[float]]):
+        error = None
+        try:
+            if filter:
+                # Cached answers don't record the scope they were answered in
+                cached = None
+                if query_embedding is None:
+                    query_embedding = await self.aembed_query(standalone)
+            else:
+                cached, query_embedding = await self._acheck_cache(standalone, query_embedding)
+            if cached is not None:
+                shared.set_prepared(cached.sources, query_embedding)
+                await shared.publish(cached.answer)
+                return
+            
+            relevant_docs, prompt = await self._aprepare_prompt(standalone, query_embedding, reused, filter)
+            shared.set_prepared(relevant_docs, query_embedding)
+            if prompt is None:
+                await shared.publish(NO_ANSWER)
+                return
+            
+            llm = self._llm_for(temperature)
+            if stream:
+                # Generation starts once somebody reads the stream
+                await asyncio.wait_for(shared.demanded.wait(), SINGLE_FLIGHT_IDLE_TIMEOUT)
+                start = time.perf_counter()
+                try:
+                    async for chunk in llm.astream(prompt):
+                        if not shared.parts:
+                            record_stage("llm_first_token", time.perf_counter() - start)
+                        await shared.publish(chunk.content)
+                finally:
+                    record_stage("llm", time.perf_counter() - start)
+            else:
+                with span("llm"):
+                    await shared.publish((await llm.ainvoke(prompt)).content)
             
-            # Get response from QA chain using filtered docs
-            result = self.qa_chain({
-                "question": query,
-                "chat_history": []
-            })
+            answer = "".join(shared.parts)
+            self._record_answer(answer)
             
             # Log for verification
-            logger.info(f"Response: {result['answer']}")
-            logger.info(f"Number of source documents: {len(result['source_documents'])}")
+            logger.info(f"Response: {answer}")
+            logger.info(f"Number of source documents: {len(relevant_docs)}")
             
-            return result["answer"], result["source_documents"]
+            # Answers grounded on a filter or on one conversation's sources aren't for everyone
+            if not filter and reused is None:
+                self.answer_cache.put(standalone, answer, relevant_docs, query_embedding)
+            
+        except asyncio.TimeoutError as e:
+            logger.info(f"Stream for '{standalone}' was never read, not generating it")
+            error = e
+        except asyncio.CancelledError as e:
+            # Readers would otherwise wait forever or see an empty answer
+            error = e
+            raise
+        except Exception as e:
+            logger.error(f"Error generating response: {str(e)}")
+            error = e
+        finally:
+            await shared.finish(error)
+
+    async def aget_response(self, query: str, temperature: Optional[float] = None,
+                            memory: Optional[ConversationMemory] = None,
+                            filter: Optional[Filter] = None) -> tuple[str, list]:
+        """
+        Get response with document verification without blocking the event loop.
+        With a session's memory, follow-ups are condensed into standalone questions.
+        With a metadata filter (see tags.build_filter), only matching chunks are searched.
+        """
+        trace, owned = begin_trace("get_response")
+        try:
+            with activate_trace(trace):
+                standalone = await self._acondense(query, memory)
+                reused, query_embedding = await self._areusable_sources(standalone, memory, filter)
+                shared = self._shared_answer(standalone, temperature, False, filter, reused, query_embedding)
+                try:
+                    sources, query_embedding = await shared.wait_prepared()
+                    answer = await shared.answer()
+                finally:
+                    trace.merge(shared.trace)
+                self._remember(memory, query, standalone, answer, sources, query_embedding)
+                return answer, sources
+            
+        except Exception as e:
+            logger.error(f"Error getting response: {str(e)}")
+            raise
+        finally:
+            if owned:
+                end_trace(trace)
+
+    async def astream_response(self, query: str, temperature: Optional[float] = None,
+                               memory: Optional[ConversationMemory] = None,
+                               filter: Optional[Filter] = None) -> Tuple[List[Document], AsyncIterator[str]]:
+        """
+        Return the source documents straight away and an async iterator over
+        the answer's tokens as the LLM generates them.
+        """
+        # The trace stays open until the last token has been generated
+        trace, owned = begin_trace("stream_response")
+        shared = None
+        try:
+            with activate_trace(trace):
+                standalone = await self._acondense(query, memory)
+                reused, query_embedding = await self._areusable_sources(standalone, memory, filter)
+                shared = self._shared_answer(standalone, temperature, True, filter, reused, query_embedding)
+                sources, query_embedding = await shared.wait_prepared()
             
         except Exception as e:
             logger.error(f"Error getting response: {str(e)}")
+            if shared is not None:
+                trace.merge(shared.trace)
+            if owned:
+                end_trace(trace)
             raise
+        
+        async def tokens():
+            parts = []
+            try:
+                async for part in shared.iter_parts():
+                    parts.append(part)
+                    yield part
+            except Exception as e:
+                logger.error(f"Error streaming response: {str(e)}")
+                raise
+            finally:
+                # The shared stages are complete once the stream is
+                trace.merge(shared.trace)
+            self._remember(memory, query, standalone, "".join(parts), sources, query_embedding)
+        
+        return sources, _finish_after(tokens(), trace, owned)
+
+    # Synchronous API: thin wrappers that run the async path on the shared loop
+
+    def embed_query(self, query: str) -> List[float]:
+        return run_sync(self.aembed_query(query))
+
+    def retrieve(self, query: str, query_embedding: Optional[List[float]] = None,
+                 filter: Optional[Filter] = None) -> List[Tuple[Document, float]]:
+        return run_sync(self.aretrieve(query, query_embedding, filter))
+
+    def get_response(self, query: str, temperature: Optional[float] = None,
+                     memory: Optional[ConversationMemory] = None,
+                     filter: Optional[Filter] = None) -> tuple[str, list]:
+        """Get response with document verification."""
+        return run_sync(self.aget_response(query, temperature, memory, filter))
+
+    def stream_response(self, query: str, temperature: Optional[float] = None,
+                        memory: Optional[ConversationMemory] = None,
+                        filter: Optional[Filter] = None) -> Tuple[List[Document], Iterator[str]]:
+        """
+        Return the source documents straight away and an iterator over the
+        answer's tokens as the LLM generates them.
+        """
+        sources, tokens = run_sync(self.astream_response(query, temperature, memory, filter))
+        return sources, iterate_sync(tokens)
+
+    def warm_up(self):
+        """Start the event loop and open index and embedding connections before the first question."""
+        try:
+            start = time.perf_counter()
+            self.retrieve("NOC procedures")
+            logger.info(f"Chat engine warmed up in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            logger.warning(f"Chat engine warm-up failed: {str(e)}")
 
     def _format_response(self, text: str) -> str:
         """Format the response for better readability."""
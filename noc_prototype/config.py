@@ -4,33 +4,125 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-# Force reload of environment variables
-os.environ.clear()
+# Load .env once at import. Variables already in the environment (shell,
+# Streamlit secrets) take precedence and nothing else in it is touched.
 env_path = find_dotenv()
-logger.info(f"Loading .env from: {env_path}")
-load_dotenv(env_path, override=True)
-
-# Debug: Print the raw API key value
-api_key = os.environ.get("OPENAI_API_KEY")  # Use os.environ.get instead of os.getenv
-logger.info(f"Raw API Key value length: {len(api_key) if api_key else 0}")
-logger.info(f"API Key starts with: {api_key[:10] if api_key else 'None'}")
-
-# Load environment variables
-load_dotenv()
+logger.info(f"Loading .env from: {env_path or 'not found'}")
+load_dotenv(env_path)
 
 # OpenAI API configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 # Vector store configuration
-CHROMA_PERSIST_DIR = "chroma_db"
+# "pinecone" for the hosted index, "chroma" for a local persistent index,
+# "quantized" for the local memory-mapped float16/int8 index
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "chroma_db")
+CHROMA_COLLECTION_NAME = "noc_docs"
+
+# Quantized local index: vectors stored as float16 or int8 (4x smaller than float32)
+QUANTIZED_INDEX_DIR = os.getenv("QUANTIZED_INDEX_DIR", "quantized_index")
+QUANTIZED_DTYPE = os.getenv("QUANTIZED_DTYPE", "int8")
+IVF_LISTS = int(os.getenv("IVF_LISTS", 0))  # Coarse k-means partitions; 0 scans every vector
+IVF_PROBES = 8  # Partitions searched per query when IVF_LISTS is set
+# NumPy widens float16 about 8x slower than it scans float32, so float16
+# indexes search a float32 copy held in memory while it fits this budget
+QUANTIZED_FLOAT16_CACHE_MB = int(os.getenv("QUANTIZED_FLOAT16_CACHE_MB", 512))
 
 # Model configuration
 MODEL_NAME = "gpt-4-turbo-preview"
 EMBEDDING_MODEL = "text-embedding-3-small"
+# text-embedding-3 models can return shorter vectors (e.g. 512 or 256);
+# changing this requires rebuilding the index
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", 1536))
+
+# Embedding cache configuration
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite")
+EMBEDDING_CACHE_MAX_ENTRIES = 200_000  # Least recently used vectors are evicted past this
 
 # Document processing configuration
+# Chunk sizes are measured in tokens of TOKEN_ENCODING, the tokenizer shared
+# by the chat and embedding models
+TOKEN_ENCODING = "cl100k_base"
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", os.cpu_count() or 1))
+EXTRACTION_TIMEOUT = 300  # Seconds allowed per PDF before it is skipped
+
+# Tiered extraction: pages are read from the PDF's text layer, and only pages
+# whose text is shorter than OCR_MIN_PAGE_CHARS or less than OCR_MIN_TEXT_RATIO
+# readable go through unstructured's OCR
+OCR_MIN_PAGE_CHARS = 20
+OCR_MIN_TEXT_RATIO = 0.8
+OCR_STRATEGY = os.getenv("OCR_STRATEGY", "ocr_only")  # "hi_res" also detects layout, but is slower
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", 4))  # Pages of one PDF OCRed at a time
+# Extracted page text reused across runs; relative to the working directory
+EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", ".cache/extraction.sqlite")
+
+# Ingestion pipeline configuration
+EMBED_BATCH_SIZE = 100  # Texts per embedding request
+UPSERT_BATCH_SIZE = 100  # Vectors per upsert request
+INGEST_MAX_CONCURRENCY = 4  # Embedding/upsert batches in flight at once
+INGEST_MAX_RETRIES = 6
+INGEST_CHECKPOINT_PATH = os.getenv("INGEST_CHECKPOINT_PATH", ".cache/ingest_checkpoint.json")
+
+# Retrieval configuration
+RETRIEVAL_K = 4
+SCORE_THRESHOLD = 0.2  # Minimum similarity score for a document to reach the prompt
+
+# Hybrid retrieval: BM25 over chunk text fused with vector results, then
+# re-ranked with maximal marginal relevance down to RETRIEVAL_K
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", ".cache/lexical_index.json")
+RETRIEVAL_CANDIDATES = 10  # Candidates taken from each retriever before fusion and re-ranking
+MMR_LAMBDA = 0.7  # 1.0 ranks by relevance only, lower values favour diverse chunks
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60  # Reciprocal rank fusion damping constant
+
+# Document tags attached at ingestion, usable as retrieval filters. A PDF in a
+# subfolder of the data directory takes the folder name as its product area;
+# otherwise the first area/type whose keywords appear in its filename or
+# first page is used, else DEFAULT_TAG.
+PRODUCT_AREA_KEYWORDS = {
+    "premium_club": ["premium club", "voucher", "loyalty"],
+    "sms": ["sms", "verification", "otp"],
+    "payments": ["payment", "billing", "invoice", "refund"],
+    "network": ["network", "gateway", "dns", "outage"],
+}
+DOCUMENT_TYPE_KEYWORDS = {
+    "runbook": ["runbook", "procedure", "playbook", "troubleshooting"],
+    "escalation": ["escalation", "on call", "on-call", "contacts"],
+    "faq": ["faq", "frequently asked"],
+    "release_notes": ["release notes", "changelog"],
+}
+DEFAULT_TAG = "general"
+FILTERED_RETRIEVAL_CANDIDATES = 6  # Scoped searches cover fewer chunks, so fetch fewer candidates
+
+# Prompt context: retrieved text is packed into this many tokens, best first
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 3000))
+CONTEXT_MIN_TRUNCATED_TOKENS = 50  # Smaller remainders are dropped rather than truncated
+
+# Conversation memory, per chat session
+MEMORY_TOKEN_CAP = 1000  # Hard cap on history sent to the question-condensing prompt
+MEMORY_WINDOW_TURNS = 4  # Recent turns kept verbatim; older ones only as a topic summary
+MEMORY_ANSWER_TOKENS = 150  # Each remembered answer is clipped to this many tokens
+MEMORY_TOPIC_SIMILARITY = 0.9  # Follow-ups this close to the last question reuse its sources
+
+# Latency metrics: percentiles cover the last METRICS_WINDOW samples of each stage
+METRICS_WINDOW = 1000
+METRICS_TRACE_HISTORY = 50  # Recent per-request breakdowns kept for the debug view
+METRICS_TEXTFILE_PATH = os.getenv("METRICS_TEXTFILE_PATH")  # Prometheus text dump written after ingestion, if set
+
+# Identical questions in flight share one answer; an unread stream is dropped after this many seconds
+SINGLE_FLIGHT_IDLE_TIMEOUT = 60
+
+# Answer cache configuration
+ANSWER_CACHE_MAX_ENTRIES = 1000
+ANSWER_CACHE_SIMILARITY = 0.95  # Minimum cosine similarity for a semantic cache hit
+
+# Index state: version bumped on every re-ingestion, manifest of indexed chunks
+INDEX_VERSION_PATH = os.getenv("INDEX_VERSION_PATH", ".cache/index_version")
+INDEX_MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", ".cache/index_manifest.json")
 
 # Remove the strict check to allow the app to start
 # We'll handle the missing API key in the Streamlit app instead
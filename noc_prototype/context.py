@@ -0,0 +1,118 @@
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+from langchain_core.documents import Document
+from .config import CONTEXT_TOKEN_BUDGET, CONTEXT_MIN_TRUNCATED_TOKENS
+from .utils import count_tokens, get_token_encoding
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PackedContext:
+    text: str
+    documents: List[Document]
+    tokens: int
+    input_tokens: int
+    duplicate_tokens: int = 0
+    truncated_tokens: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.input_tokens - self.tokens
+
+def _uncovered(start: int, end: int, covered: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Parts of [start, end) not inside any covered interval."""
+    segments = [(start, end)]
+    for c_start, c_end in covered:
+        remaining = []
+        for s, e in segments:
+            if c_end <= s or c_start >= e:
+                remaining.append((s, e))
+                continue
+            if s < c_start:
+                remaining.append((s, c_start))
+            if c_end < e:
+                remaining.append((c_end, e))
+        segments = remaining
+    return segments
+
+def _truncate(text: str, max_tokens: int) -> str:
+    encoding = get_token_encoding()
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+def pack_context(documents: List[Document], budget: int = CONTEXT_TOKEN_BUDGET,
+                 separator: str = "\n\n") -> PackedContext:
+    """
+    Fill a token budget with documents in the given (relevance) order.
+
+    Text already included through an overlapping chunk of the same page is
+    cut out using the chunks' character offsets, repeated chunks are dropped,
+    and the last document that does not fit is truncated if enough of the
+    budget remains. Documents contributing nothing are left out of the
+    returned list so sources always match the prompt.
+    """
+    separator_tokens = count_tokens(separator)
+    covered: Dict[Tuple[str, int], List[Tuple[int, int]]] = {}
+    seen_texts = set()
+    parts = []
+    used_docs = []
+    used = 0
+    full = False
+    input_tokens = 0
+    duplicate_tokens = 0
+    truncated_tokens = 0
+
+    for doc in documents:
+        doc_tokens = count_tokens(doc.page_content)
+        input_tokens += doc_tokens
+        if full:
+            truncated_tokens += doc_tokens
+            continue
+
+        text = doc.page_content
+        offset = doc.metadata.get("offset")
+        # Pinecone returns numeric metadata as floats
+        offset = int(offset) if isinstance(offset, (int, float)) and not isinstance(offset, bool) else None
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        if offset is not None and key[0] is not None:
+            end = offset + len(text)
+            segments = _uncovered(offset, end, covered.get(key, []))
+            covered.setdefault(key, []).append((offset, end))
+            text = " … ".join(text[s - offset:e - offset].strip() for s, e in segments).strip()
+        elif text in seen_texts:
+            text = ""
+        seen_texts.add(doc.page_content)
+
+        tokens = count_tokens(text) if text else 0
+        duplicate_tokens += max(0, doc_tokens - tokens)
+        if not tokens:
+            continue
+
+        cost = tokens + (separator_tokens if parts else 0)
+        if used + cost > budget:
+            room = budget - used - (separator_tokens if parts else 0)
+            full = True
+            if room < CONTEXT_MIN_TRUNCATED_TOKENS:
+                truncated_tokens += tokens
+                continue
+            text = _truncate(text, room)
+            truncated_tokens += tokens - count_tokens(text)
+            cost = count_tokens(text) + (separator_tokens if parts else 0)
+
+        parts.append(text)
+        used_docs.append(doc)
+        used += cost
+
+    packed = PackedContext(
+        text=separator.join(parts),
+        documents=used_docs,
+        tokens=used,
+        input_tokens=input_tokens,
+        duplicate_tokens=duplicate_tokens,
+        truncated_tokens=truncated_tokens,
+    )
+    logger.info(
+        f"Context packed to {packed.tokens}/{budget} tokens from {len(used_docs)}/{len(documents)} documents, "
+        f"saved {packed.saved_tokens} tokens ({duplicate_tokens} duplicate, {truncated_tokens} over budget)"
+    )
+    return packed
@@ -0,0 +1,207 @@
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import json
+import logging
+import mmap
+
+logger = logging.getLogger(__name__)
+
+CORPUS_FILE = "corpus.jsonl"
+CORPUS_INDEX_FILE = "corpus.index.json"
+
+# Rewrite the data file once more than this share of it is superseded records
+COMPACT_GARBAGE_RATIO = 0.5
+
+def _is_processed_document(json_content) -> bool:
+    return (isinstance(json_content, dict)
+            and isinstance(json_content.get("metadata"), dict)
+            and "source" in json_content["metadata"]
+            and isinstance(json_content.get("content"), list))
+
+class CorpusStore:
+    """Processed documents in one append-only file with a byte-offset index.
+
+    Every page is a compact JSON line in corpus.jsonl. corpus.index.json maps
+    each source to its filename and the (offset, length) of its pages, so a
+    single page or document is read through a memory map without parsing
+    anything else. Re-processing a document appends its new pages and
+    repoints the index; superseded lines are dropped by compact(), which
+    writes a new data file (corpus.N.jsonl) that the index then names.
+
+    Use as a context manager when writing many documents so the index is
+    saved once at the end instead of after every put().
+    """
+
+    def __init__(self, directory: str = "processed_data"):
+        self.directory = Path(directory)
+        self.data_path = self.directory / CORPUS_FILE
+        self.index_path = self.directory / CORPUS_INDEX_FILE
+        self.generation = 0
+        self.documents: Dict[str, Dict] = {}
+        self._map = None
+        self._file = None
+        self._batching = False
+        if self.index_path.exists():
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            self.documents = index["documents"]
+            self.generation = index.get("generation", 0)
+            self.data_path = self.directory / index.get("data_file", CORPUS_FILE)
+
+    def __enter__(self) -> "CorpusStore":
+        self._batching = True
+        return self
+
+    def __exit__(self, *exc_info):
+        self._batching = False
+        self.save_index()
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __contains__(self, source: str) -> bool:
+        return source in self.documents
+
+    def exists(self) -> bool:
+        return self.index_path.exists()
+
+    def sources(self) -> List[str]:
+        return list(self.documents)
+
+    def put(self, json_content: Dict):
+        """Append a processed document, replacing any earlier version of the same source."""
+        metadata = json_content["metadata"]
+        self.directory.mkdir(parents=True, exist_ok=True)
+        pages = []
+        with open(self.data_path, "ab") as f:
+            offset = f.tell()
+            for item in json_content["content"]:
+                line = json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+                f.write(line)
+                pages.append([offset, len(line) - 1])
+                offset += len(line)
+        self.documents[str(metadata["source"])] = {"metadata": metadata, "pages": pages}
+        if not self._batching:
+            self.save_index()
+
+    def remove(self, source: str):
+        """Forget a document; its bytes are reclaimed by the next compaction."""
+        if self.documents.pop(source, None) is not None and not self._batching:
+            self.save_index()
+
+    def save_index(self):
+        """Write the offset index atomically, compacting first if mostly garbage."""
+        if not self.data_path.exists():
+            return
+        live = sum(length + 1 for doc in self.documents.values() for _, length in doc["pages"])
+        size = self.data_path.stat().st_size
+        if size and (size - live) / size > COMPACT_GARBAGE_RATIO:
+            self.compact()
+            return
+        self._write_index()
+
+    def _write_index(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"generation": self.generation, "data_file": self.data_path.name,
+                       "documents": self.documents}, f, separators=(",", ":"))
+        tmp_path.replace(self.index_path)
+
+    def compact(self):
+        """Rewrite the data file with only the pages the index points at.
+
+        The pages go to a new data file and replacing the index switches to
+        it, so an interrupted compaction leaves the previous index and data
+        file in use; its partial file is overwritten by the next attempt.
+        """
+        generation = self.generation + 1
+        data_path = self.directory / f"corpus.{generation}.jsonl"
+        documents = {}
+        with open(data_path, "wb") as out:
+            for source, entry in self.documents.items():
+                pages = []
+                for page in self._read_raw(source):
+                    pages.append([out.tell(), len(page)])
+                    out.write(page + b"\n")
+                documents[source] = {"metadata": entry["metadata"], "pages": pages}
+        self.close()
+        old_path = self.data_path
+        self.documents, self.data_path, self.generation = documents, data_path, generation
+        self._write_index()
+        old_path.unlink(missing_ok=True)
+        logger.info(f"Compacted corpus to {self.data_path.stat().st_size} bytes")
+
+    def _view(self, end: int) -> mmap.mmap:
+        # Appends grow the file past the current mapping, so remap on demand
+        if self._map is None or len(self._map) < end:
+            self.close()
+            self._file = open(self.data_path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _read_raw(self, source: str) -> Iterator[bytes]:
+        for offset, length in self.documents[source]["pages"]:
+            yield self._view(offset + length)[offset:offset + length]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def page_count(self, source: str) -> int:
+        return len(self.documents[source]["pages"])
+
+    def get_page(self, source: str, page: int) -> Dict:
+        """Return one content item of a document, reading only its bytes."""
+        offset, length = self.documents[source]["pages"][page]
+        return json.loads(self._view(offset + length)[offset:offset + length])
+
+    def get_document(self, source: str) -> Optional[Dict]:
+        """Return a document in the processed JSON layout, or None if unknown."""
+        if source not in self.documents:
+            return None
+        return {
+            "metadata": self.documents[source]["metadata"],
+            "content": [json.loads(page) for page in self._read_raw(source)]
+        }
+
+    def iter_documents(self) -> Iterator[Dict]:
+        """Yield every document in insertion order, one at a time."""
+        for source in list(self.documents):
+            yield self.get_document(source)
+
+    def import_json_files(self) -> int:
+        """Copy legacy per-document JSON files in the directory into the store.
+
+        Imported files are kept, renamed to *.json.migrated so they are not
+        imported again; files that aren't processed documents are skipped.
+        """
+        json_files = sorted(
+            path for path in self.directory.glob("*.json") if path.name != CORPUS_INDEX_FILE
+        )
+        imported = []
+        batching, self._batching = self._batching, True
+        try:
+            for json_file in json_files:
+                try:
+                    with open(json_file, "r", encoding="utf-8") as f:
+                        json_content = json.load(f)
+                    if not _is_processed_document(json_content):
+                        raise ValueError("not a processed document")
+                except ValueError as e:
+                    logger.warning(f"Skipping {json_file.name}: {str(e)}")
+                    continue
+                self.put(json_content)
+                imported.append(json_file)
+        finally:
+            self._batching = batching
+        if imported:
+            self.save_index()
+            for json_file in imported:
+                json_file.replace(json_file.with_name(json_file.name + ".migrated"))
+            logger.info(f"Imported {len(imported)} processed JSON files into {self.data_path}")
+        return len(imported)
@@ -1,29 +1,37 @@
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 from pathlib import Path
-from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader, UnstructuredPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from .config import CHUNK_SIZE, CHUNK_OVERLAP
-from unstructured.partition.pdf import partition_pdf
-from unstructured.documents.elements import (
-    Text, Table, Image, ListItem, Title
-)
-import json
-import base64
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .config import CHUNK_SIZE, CHUNK_OVERLAP, EXTRACTION_WORKERS, EXTRACTION_TIMEOUT, EXTRACTION_CACHE_PATH
+from .corpus import CorpusStore
+from .extraction import OCR, ExtractionCache, extract_pages
+from .metrics import INGEST_STAGE_SECONDS, count, record_stage
+from .tags import TAG_FIELDS, tag_document
+from .utils import count_tokens
+import hashlib
 import logging
 import os
 import re
-from langchain.schema import Document
+import signal
+import time
+from langchain_core.documents import Document
 
 logger = logging.getLogger(__name__)
 
+def get_text_splitter(chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+    """Text splitter whose chunk size and overlap are measured in tokens."""
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=count_tokens,
+        add_start_index=True,
+    )
+
 class DocumentLoader:
-    def __init__(self, docs_dir: str = "data/docs"):
+    def __init__(self, docs_dir: str = "data/docs", chunk_size: int = CHUNK_SIZE,
+                 chunk_overlap: int = CHUNK_OVERLAP):
         self.docs_dir = Path(docs_dir)
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
-            length_function=len,
-        )
+        self.text_splitter = get_text_splitter(chunk_size, chunk_overlap)
 
     def load_documents(self) -> List:
         if not self.docs_dir.exists():
@@ -31,8 +39,7 @@ class DocumentLoader:
 
         documents = []
         for pdf_file in self.docs_dir.glob("*.pdf"):
-            loader = PyPDFLoader(str(pdf_file))
-            documents.extend(loader.load())
+            documents.extend(_page_documents(str(pdf_file)))
 
         return self.text_splitter.split_documents(documents)
 
@@ -56,33 +63,68 @@ class DocumentLoader:
         return text.strip()
 
     def _convert_json_to_documents(self, json_docs):
-        """Convert JSON documents to LangChain Document format with cleaning."""
-        documents = []
-        for doc in json_docs:
-            # Clean and combine all content
-            text = "\n".join(
-                self.clean_text(item["text"]) 
-                for item in doc["content"]
-            )
+        """Convert JSON documents to cleaned, token-bounded LangChain chunks."""
+        return list(self.iter_chunks(json_docs))
+
+    def iter_chunks(self, json_docs: Iterable[Dict]) -> Iterator[Document]:
+        """Lazily clean and chunk documents, holding one page at a time."""
+        for json_doc in json_docs:
+            yield from self.iter_document_chunks(json_doc)
+
+    def split_json_document(self, json_doc: Dict) -> List[Document]:
+        """Split a processed document into per-page chunks with stable IDs."""
+        return list(self.iter_document_chunks(json_doc))
+
+    def iter_document_chunks(self, json_doc: Dict) -> Iterator[Document]:
+        source = json_doc["metadata"]["source"]
+        tags = {field: json_doc["metadata"][field] for field in TAG_FIELDS if field in json_doc["metadata"]}
+        if "product_area" not in tags:
+            # Processed before documents were tagged
+            first_page = json_doc["content"][0]["text"] if json_doc["content"] else ""
+            tags = tag_document(source, first_page)
+        for index, item in enumerate(json_doc["content"]):
+            page = item.get("page_number")
+            if page is None:
+                page = index
+            text = self.clean_text(item["text"])
+            if not text:
+                continue
             
-            # Create LangChain Document
-            document = Document(
-                page_content=text,
-                metadata={
-                    "source": doc["metadata"]["source"],
-                    "filename": doc["metadata"]["filename"]
-                }
-            )
-            documents.append(document)
-        return documents
+            metadata = {
+                "source": source,
+                "filename": json_doc["metadata"]["filename"],
+                "page": page,
+                **tags
+            }
+            for chunk in self.text_splitter.create_documents([text], metadatas=[metadata]):
+                offset = chunk.metadata.pop("start_index")
+                chunk.metadata["offset"] = offset
+                chunk.metadata["chunk_id"] = make_chunk_id(source, page, offset)
+                yield chunk
 
-def process_pdf_to_json(pdf_path: str) -> Dict:
+def make_chunk_id(source: str, page: int, offset: int) -> str:
+    """Deterministic vector ID for the chunk at a given page and character offset."""
+    return hashlib.sha1(f"{source}|{page}|{offset}".encode("utf-8")).hexdigest()
+
+def _page_documents(pdf_path: str) -> List[Document]:
+    """One LangChain document per page, extracted through the tiered path."""
+    return [
+        Document(page_content=page["text"], metadata={"source": pdf_path, "page": page["page_number"]})
+        for page in extract_pages(pdf_path)
+    ]
+
+def process_pdf_to_json(pdf_path: str, data_dir: Optional[str] = None,
+                        cache_path: str = EXTRACTION_CACHE_PATH) -> Dict:
     """
-    Extract content from PDF using a simpler approach.
-    Returns a structured JSON with the content.
+    Extract content from PDF, reading the text layer and OCRing only the
+    pages where it is unusable (see extraction.py).
+    Returns a structured JSON with the content and the document's tags.
     """
-    loader = PyPDFLoader(pdf_path)
-    pages = loader.load()
+    cache = ExtractionCache(cache_path)
+    try:
+        pages = extract_pages(pdf_path, cache)
+    finally:
+        cache.close()
     
     # Initialize structure for JSON
     document_content = {
@@ -97,66 +139,122 @@ def process_pdf_to_json(pdf_path: str) -> Dict:
     for page in pages:
         content_item = {
             "type": "Text",
-            "page_number": page.metadata.get("page", None),
-            "text": page.page_content
+            "page_number": page["page_number"],
+            "text": page["text"],
+            "extraction": page["method"]
         }
         document_content["content"].append(content_item)
     
+    first_page = pages[0]["text"] if pages else ""
+    document_content["metadata"].update(tag_document(pdf_path, first_page, data_dir))
     return document_content
 
-def process_directory_to_json(data_dir: str = "data", output_dir: str = "processed_data"):
+class ExtractionTimeout(Exception):
+    """Raised inside a worker when a PDF takes longer than the per-file timeout."""
+
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeout()
+
+def _extract_pdf_worker(pdf_path: str, timeout: Optional[int], data_dir: Optional[str] = None,
+                        cache_path: str = EXTRACTION_CACHE_PATH) -> Dict:
+    """Run process_pdf_to_json in a pool worker, bounded by an alarm where supported."""
+    use_alarm = bool(timeout) and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.alarm(timeout)
+    try:
+        return process_pdf_to_json(pdf_path, data_dir, cache_path)
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+
+def extract_pdfs(pdf_paths: List[Path], max_workers: int = EXTRACTION_WORKERS,
+                 timeout: Optional[int] = EXTRACTION_TIMEOUT,
+                 data_dir: Optional[str] = None,
+                 cache_path: str = EXTRACTION_CACHE_PATH) -> Iterator[Tuple[Path, Optional[Dict]]]:
     """
-    Process all PDFs in a directory to JSON files.
+    Extract PDFs across a process pool, yielding (path, json_content) as each finishes.
+    A PDF that fails or times out yields None instead of stopping the run.
+    Subfolders of data_dir name the product area of the PDFs inside them.
     """
-    Path(output_dir).mkdir(exist_ok=True)
-    
-    pdf_files = list(Path(data_dir).glob("**/*.pdf"))
-    processed_docs = []
+    with ProcessPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {
+            pool.submit(_extract_pdf_worker, str(pdf_path), timeout, data_dir, cache_path): pdf_path
+            for pdf_path in pdf_paths
+        }
+        for future in as_completed(futures):
+            pdf_path = futures[future]
+            try:
+                yield pdf_path, future.result()
+            except ExtractionTimeout:
+                logger.error(f"Timed out after {timeout}s processing {pdf_path.name}")
+                yield pdf_path, None
+            except Exception as e:
+                logger.error(f"Error processing {pdf_path.name}: {str(e)}")
+                yield pdf_path, None
+
+def process_directory_to_json(data_dir: str = "data", output_dir: str = "processed_data",
+                              max_workers: int = EXTRACTION_WORKERS,
+                              timeout: Optional[int] = EXTRACTION_TIMEOUT,
+                              cache_path: str = EXTRACTION_CACHE_PATH) -> List[Dict]:
+    """
+    Process all PDFs in a directory in parallel into the corpus store in output_dir.
+    """
+    pdf_files = sorted(Path(data_dir).glob("**/*.pdf"))
+    results = {}
+    failed = []
+    pages = 0
+    ocr_pages = 0
+    start = time.perf_counter()
     
-    for pdf_path in pdf_files:
-        try:
-            logger.info(f"Processing {pdf_path.name}...")
-            json_content = process_pdf_to_json(str(pdf_path))
+    with CorpusStore(output_dir) as corpus:
+        # Directories written before the corpus store hold one JSON per PDF
+        corpus.import_json_files()
+        for pdf_path, json_content in extract_pdfs(pdf_files, max_workers, timeout, data_dir, cache_path):
+            if json_content is None:
+                failed.append(pdf_path.name)
+                continue
             
-            # Save individual JSON file
-            output_path = Path(output_dir) / f"{pdf_path.stem}.json"
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(json_content, f, indent=2)
-                
-            processed_docs.append(json_content)
+            corpus.put(json_content)
+            results[pdf_path] = json_content
+            pages += len(json_content["content"])
+            ocr_pages += sum(1 for item in json_content["content"] if item.get("extraction") == OCR)
             logger.info(f"Successfully processed {pdf_path.name}")
-            
-        except Exception as e:
-            logger.error(f"Error processing {pdf_path.name}: {str(e)}")
-            continue
     
-    return processed_docs
+    elapsed = time.perf_counter() - start
+    record_stage("extract_pdfs", elapsed, INGEST_STAGE_SECONDS)
+    count("noc_ingest_pages_total", pages)
+    count("noc_ingest_ocr_pages_total", ocr_pages)
+    count("noc_ingest_pdf_failures_total", len(failed))
+    logger.info(
+        f"Processed {len(results)}/{len(pdf_files)} PDFs ({pages} pages, {ocr_pages} OCRed) in {elapsed:.1f}s "
+        f"with {max_workers} workers: {pages / elapsed if elapsed else 0:.1f} pages/s"
+    )
+    if failed:
+        logger.warning(f"Failed to process: {', '.join(failed)}")
+    
+    # Keep directory order regardless of completion order
+    return [results[pdf_path] for pdf_path in pdf_files if pdf_path in results]
 
 def load_documents(data_dir: str = "data"):
     """Load and process documents from the data directory."""
     try:
-        # Initialize PDF loader for the directory
-        loader = DirectoryLoader(
-            data_dir,
-            glob="**/*.pdf",
-            loader_cls=UnstructuredPDFLoader,
-            show_progress=True,
-            use_multithreading=True
-        )
-        
+        pdf_files = sorted(Path(data_dir).glob("**/*.pdf"))
         logger.info("Processing documents and creating vector store...")
         
-        # Load documents
-        documents = loader.load()
-        logger.info(f"Loaded {len(documents)} documents")
-        
-        # Split documents into chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200
-        )
+        # One document per page; OCR only runs on pages without a usable text layer
+        documents = []
+        for pdf_path, json_content in extract_pdfs(pdf_files, data_dir=data_dir):
+            if json_content is None:
+                continue
+            documents.extend(
+                Document(page_content=item["text"], metadata={"source": str(pdf_path), "page": item["page_number"]})
+                for item in json_content["content"]
+            )
+        logger.info(f"Loaded {len(documents)} pages")
         
-        split_docs = text_splitter.split_documents(documents)
+        # Split documents into token-bounded chunks
+        split_docs = get_text_splitter().split_documents(documents)
         logger.info(f"Split into {len(split_docs)} chunks")
         
         return split_docs
@@ -165,33 +263,25 @@ def load_documents(data_dir: str = "data"):
         logger.error(f"Error loading documents: {str(e)}")
         raise
 
-def process_directory_to_json(directory: str):
-    """Process PDF files in directory to JSON format."""
+def iter_processed_documents(processed_dir: str = "processed_data") -> Iterator[Dict]:
+    """Yield documents from the corpus store in processed_dir one at a time."""
+    processed_dir_path = Path(processed_dir)
+    if not processed_dir_path.exists():
+        raise FileNotFoundError(f"Processed data directory not found: {processed_dir}")
+
+    corpus = CorpusStore(processed_dir)
+    if not corpus.exists() and any(processed_dir_path.glob("*.json")):
+        logger.warning(f"{processed_dir} holds processed JSON files but no corpus store; "
+                       f"process or index the documents again to import them")
     try:
-        for file in os.listdir(directory):
-            if file.endswith('.pdf'):
-                logger.info(f"Processing {file}...")
-                # Your existing PDF to JSON processing code
-                logger.info(f"Successfully processed {file}")
-                
-    except Exception as e:
-        logger.error(f"Error processing directory: {str(e)}")
-        raise
+        yield from corpus.iter_documents()
+    finally:
+        corpus.close()
 
 def load_processed_documents(processed_dir: str = "processed_data") -> List[Dict]:
-    """Load documents from processed JSON files."""
+    """Load all documents from the corpus store in processed_dir."""
     try:
-        processed_dir_path = Path(processed_dir)
-        if not processed_dir_path.exists():
-            raise FileNotFoundError(f"Processed data directory not found: {processed_dir}")
-
-        documents = []
-        for json_file in processed_dir_path.glob("*.json"):
-            logger.info(f"Loading {json_file.name}...")
-            with open(json_file, "r", encoding="utf-8") as f:
-                doc = json.load(f)
-                documents.append(doc)
-            
+        documents = list(iter_processed_documents(processed_dir))
         logger.info(f"Loaded {len(documents)} processed documents")
         return documents
 
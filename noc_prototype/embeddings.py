@@ -1,13 +1,193 @@
-from langchain_openai import OpenAIEmbeddings
-from .config import OPENAI_API_KEY, EMBEDDING_MODEL
+from langchain_core.embeddings import Embeddings
+from .config import (
+    OPENAI_API_KEY, EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+)
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional
+import asyncio
+import hashlib
 import logging
+import re
+import sqlite3
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
-def get_embeddings():
-    """Initialize and return the OpenAI embeddings model."""
-    logger.info(f"Initializing embeddings with API key (first 10 chars): {OPENAI_API_KEY[:10]}")
-    return OpenAIEmbeddings(
-        openai_api_key=OPENAI_API_KEY,
-        model=EMBEDDING_MODEL
-    ) 
\ No newline at end of file
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so formatting-only changes hit the same cache entry."""
+    return re.sub(r'\s+', ' ', text).strip()
+
+class EmbeddingCache:
+    """Durable content-addressed embedding store with LRU eviction.
+
+    Vectors are kept in SQLite keyed by a hash of the embedding model and
+    the normalized text, so entries survive restarts and never mix models.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, model: str) -> str:
+        """Hash of the model name and normalized text."""
+        payload = f"{model}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Return cached vectors for the given keys and mark them as recently used."""
+        found = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+            
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        """Store vectors and evict the least recently used entries past the size limit."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+            )
+            overflow = self._count() - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (overflow,)
+                )
+                logger.info(f"Evicted {overflow} embeddings from cache")
+            self._conn.commit()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only calls the underlying model for uncached texts."""
+
+    def __init__(self, underlying: Embeddings, model: str = EMBEDDING_MODEL,
+                 cache: Optional[EmbeddingCache] = None):
+        self.underlying = underlying
+        self.model = model
+        self.cache = cache if cache is not None else EmbeddingCache()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [EmbeddingCache.make_key(text, self.model) for text in texts]
+        vectors = self.cache.get_many(list(dict.fromkeys(keys)))
+        
+        # Embed each missing text once, even if it appears several times
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        
+        if missing:
+            logger.info(f"Embedding {len(missing)} uncached texts ({len(texts) - len(missing)} cached)")
+            new_vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_vectors))
+            self.cache.put_many(computed)
+            vectors.update(computed)
+        
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = EmbeddingCache.make_key(text, self.model)
+        cached = self.cache.get_many([key])
+        if key in cached:
+            return cached[key]
+        
+        vector = self.underlying.embed_query(text)
+        self.cache.put_many({key: vector})
+        return vector
+
+    def cached_vectors(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Vectors already in the cache for the texts, None where missing; never calls the model."""
+        keys = [EmbeddingCache.make_key(text, self.model) for text in texts]
+        vectors = self.cache.get_many(list(dict.fromkeys(keys)))
+        return [vectors.get(key) for key in keys]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [EmbeddingCache.make_key(text, self.model) for text in texts]
+        vectors = await asyncio.to_thread(self.cache.get_many, list(dict.fromkeys(keys)))
+        
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        
+        if missing:
+            new_vectors = await self.underlying.aembed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_vectors))
+            await asyncio.to_thread(self.cache.put_many, computed)
+            vectors.update(computed)
+        
+        return [vectors[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = EmbeddingCache.make_key(text, self.model)
+        cached = await asyncio.to_thread(self.cache.get_many, [key])
+        if key in cached:
+            return cached[key]
+        
+        vector = await self.underlying.aembed_query(text)
+        await asyncio.to_thread(self.cache.put_many, {key: vector})
+        return vector
+
+def get_embeddings(openai_api_key: Optional[str] = None):
+    """Initialize and return the OpenAI embeddings model behind the persistent cache."""
+    from langchain_openai import OpenAIEmbeddings
+    
+    # Shortened vectors are cached apart from full-size ones of the same text
+    reduced = EMBEDDING_DIMENSIONS != 1536
+    model = f"{EMBEDDING_MODEL}:{EMBEDDING_DIMENSIONS}" if reduced else EMBEDDING_MODEL
+    
+    logger.info(f"Initializing {model} embeddings with cache at {EMBEDDING_CACHE_PATH}")
+    return CachedEmbeddings(
+        OpenAIEmbeddings(
+            openai_api_key=openai_api_key or OPENAI_API_KEY,
+            model=EMBEDDING_MODEL,
+            dimensions=EMBEDDING_DIMENSIONS if reduced else None
+        ),
+        model=model
+    )
@@ -0,0 +1,212 @@
+"""
+Tiered PDF text extraction.
+
+Every page is read from the PDF's text layer first, which is fast. Only
+pages whose text layer is empty or garbled (scans, broken font encodings)
+go through unstructured's OCR, several at a time in child processes that
+are killed if the PDF's extraction is abandoned. Results are cached by a
+hash of what each page draws, so unchanged pages are never extracted twice,
+even when other pages of the PDF change.
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from .config import (
+    OCR_MIN_PAGE_CHARS, OCR_MIN_TEXT_RATIO, OCR_STRATEGY, OCR_WORKERS, EXTRACTION_CACHE_PATH
+)
+import hashlib
+import io
+import logging
+import multiprocessing
+import re
+import sqlite3
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# How a page's text was obtained, recorded on each page of the processed JSON
+TEXT_LAYER = "text_layer"
+OCR = "ocr"
+
+# Non-space characters of readable text; anything else counts as garbage
+_READABLE = re.compile(r"[\w.,;:!?'\"()\[\]{}<>/\\|@#$%&*+=~^`\-–—•·°€£]")
+# pdfminer-style placeholders for glyphs without a Unicode mapping
+_CID = re.compile(r"\(cid:\d+\)")
+
+def text_quality(text: str) -> float:
+    """Share of a page's non-space characters that are readable text."""
+    compact = re.sub(r"\s+", "", text)
+    garbled = sum(len(match) for match in _CID.findall(compact))
+    compact = _CID.sub("", compact)
+    total = len(compact) + garbled
+    if not total:
+        return 0.0
+    return len(_READABLE.findall(compact)) / total
+
+def needs_ocr(text: str) -> bool:
+    """Whether a text layer is too short or too garbled to use."""
+    return (len(re.sub(r"\s+", "", text)) < OCR_MIN_PAGE_CHARS
+            or text_quality(text) < OCR_MIN_TEXT_RATIO)
+
+def _stream_bytes(obj) -> bytes:
+    try:
+        return obj.get_data()
+    except Exception:
+        # Filters pypdf can't decode (e.g. JBIG2); the encoded bytes identify it as well
+        return getattr(obj, "_data", b"")
+
+def _hash_resources(resources, digest, depth: int = 0):
+    if resources is None or depth > 4:
+        return
+    resources = resources.get_object()
+    for name, font in sorted((resources.get("/Font") or {}).items()):
+        digest.update(f"{name}={font.get_object().get('/BaseFont')}".encode("utf-8"))
+    for name, xobject in sorted((resources.get("/XObject") or {}).items()):
+        xobject = xobject.get_object()
+        digest.update(name.encode("utf-8"))
+        digest.update(_stream_bytes(xobject))
+        # Form XObjects draw with resources of their own
+        _hash_resources(xobject.get("/Resources"), digest, depth + 1)
+
+def page_hash(page) -> str:
+    """Hash of what a pypdf page draws: its content stream, fonts and images."""
+    digest = hashlib.sha256()
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(_stream_bytes(contents))
+    _hash_resources(page.get("/Resources"), digest)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """Extracted page text in SQLite, keyed by page hash and extraction settings.
+
+    Shared by the extraction worker processes, so writes wait on each other
+    rather than failing.
+    """
+
+    def __init__(self, path: str = EXTRACTION_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages (key TEXT PRIMARY KEY, method TEXT NOT NULL, text TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(page_hash: str) -> str:
+        """Page hash combined with the settings that decide how a page is extracted."""
+        settings = f"{OCR_STRATEGY}\0{OCR_MIN_PAGE_CHARS}\0{OCR_MIN_TEXT_RATIO}"
+        return hashlib.sha256(f"{page_hash}\0{settings}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, Tuple[str, str]]:
+        """(method, text) of the cached pages among keys."""
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, method, text FROM pages WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update((key, (method, text)) for key, method, text in rows)
+        return found
+
+    def put_many(self, items: Dict[str, Tuple[str, str]]):
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (key, method, text) VALUES (?, ?, ?)",
+                [(key, method, text) for key, (method, text) in items.items()]
+            )
+            self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+def _single_page_pdf(page) -> bytes:
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    writer.add_page(page)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+def ocr_page(pdf_bytes: bytes) -> str:
+    """Text of a one-page PDF through unstructured's OCR."""
+    from langchain_community.document_loaders import UnstructuredPDFLoader
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "page.pdf"
+        path.write_bytes(pdf_bytes)
+        docs = UnstructuredPDFLoader(str(path), strategy=OCR_STRATEGY).load()
+    return "\n\n".join(doc.page_content for doc in docs)
+
+def _ocr_worker(item: Tuple[int, bytes]) -> Tuple[int, Optional[str], Optional[str]]:
+    """(page number, text, error) of one page, run in an OCR pool process."""
+    number, pdf_bytes = item
+    try:
+        return number, ocr_page(pdf_bytes), None
+    except Exception as e:
+        return number, None, str(e)
+
+def extract_pages(pdf_path: str, cache: Optional[ExtractionCache] = None,
+                  max_workers: int = OCR_WORKERS) -> List[Dict]:
+    """
+    Text of every page of a PDF as {"page_number", "text", "method"}, from the
+    text layer where it is usable and OCR elsewhere. A page whose OCR fails
+    keeps its text layer and is not cached, so a later run tries again.
+    """
+    from pypdf import PdfReader
+
+    owns_cache = cache is None
+    cache = cache or ExtractionCache()
+    try:
+        reader = PdfReader(pdf_path)
+        keys = [ExtractionCache.make_key(page_hash(page)) for page in reader.pages]
+        cached = cache.get_many(keys)
+
+        pages = []
+        extracted = {}
+        to_ocr = {}
+        for number, (page, key) in enumerate(zip(reader.pages, keys)):
+            if key in cached:
+                method, text = cached[key]
+            else:
+                method, text = TEXT_LAYER, page.extract_text()
+                if needs_ocr(text):
+                    to_ocr[number] = _single_page_pdf(page)
+                else:
+                    extracted[key] = (method, text)
+            pages.append({"page_number": number, "text": text, "method": method})
+
+        if to_ocr:
+            logger.info(f"OCR of {len(to_ocr)}/{len(pages)} pages of {Path(pdf_path).name}")
+            pool = multiprocessing.Pool(max(1, min(max_workers, len(to_ocr))))
+            try:
+                for number, text, error in pool.imap_unordered(_ocr_worker, to_ocr.items()):
+                    if error is not None:
+                        logger.warning(
+                            f"OCR failed for page {number} of {Path(pdf_path).name}, "
+                            f"keeping its text layer: {error}"
+                        )
+                        continue
+                    # A blank page reads as nothing either way
+                    if text.strip():
+                        pages[number].update(text=text, method=OCR)
+                    extracted[keys[number]] = (pages[number]["method"], pages[number]["text"])
+            finally:
+                # Kills OCR still running, e.g. when the PDF's timeout fired
+                pool.terminate()
+                pool.join()
+
+        cache.put_many(extracted)
+        return pages
+    finally:
+        if owns_cache:
+            cache.close()
@@ -0,0 +1,185 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from langchain_core.documents import Document
+from .config import (
+    EMBED_BATCH_SIZE, UPSERT_BATCH_SIZE, INGEST_MAX_CONCURRENCY,
+    INGEST_MAX_RETRIES, INGEST_CHECKPOINT_PATH
+)
+from .metrics import INGEST_STAGE_SECONDS, count, span
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def _status_code(error: Exception) -> Optional[int]:
+    """HTTP status of an OpenAI or Pinecone client error, if it carries one."""
+    for attr in ("status_code", "status"):
+        status = getattr(error, attr, None)
+        if isinstance(status, int):
+            return status
+    return None
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Server-suggested wait from a Retry-After header, if present."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors and dropped connections are worth retrying."""
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+def with_retries(func: Callable, description: str, max_retries: int = INGEST_MAX_RETRIES,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+    """Call func, backing off exponentially with jitter on retryable errors."""
+    for attempt in range(max_retries + 1):
+        try:
+            return func()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            delay = _retry_after(e) or min(max_delay, base_delay * 2 ** attempt)
+            delay *= random.uniform(1.0, 1.25)
+            logger.warning(f"{description} failed ({str(e)[:100]}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+class IngestCheckpoint:
+    """Set of batches already upserted, persisted so a restarted run can skip them."""
+
+    def __init__(self, path: str = INGEST_CHECKPOINT_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.completed: Set[str] = set()
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.completed = set(json.load(f).get("completed", []))
+            logger.info(f"Resuming from checkpoint with {len(self.completed)} completed batches")
+
+    def mark_done(self, batch_key: str):
+        with self._lock:
+            self.completed.add(batch_key)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"completed": sorted(self.completed)}, f)
+            tmp_path.replace(self.path)
+
+    def clear(self):
+        self.completed.clear()
+        self.path.unlink(missing_ok=True)
+
+def discard_checkpoint(path: str = INGEST_CHECKPOINT_PATH):
+    """Forget batches of an interrupted run after the index was cleared."""
+    Path(path).unlink(missing_ok=True)
+
+def batch_key(documents: List[Document], scope: str = "") -> str:
+    """Stable key for a batch of chunks written to the index named by scope.
+
+    Chunk IDs only say where a chunk sits in its PDF, so the text and
+    metadata are hashed too: a checkpoint left by an interrupted run must
+    not skip a batch whose content has changed since, or skip writing to a
+    different index.
+    """
+    digest = hashlib.sha1(scope.encode("utf-8") + b"\0")
+    for doc in documents:
+        digest.update(doc.metadata["chunk_id"].encode("utf-8") + b"\0")
+        digest.update(doc.page_content.encode("utf-8") + b"\0")
+        digest.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8") + b"\n")
+    return digest.hexdigest()
+
+def _batches(items: Iterable, size: int) -> Iterable[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class IngestionPipeline:
+    """
+    Embed and upsert chunks in batches with a bounded number of batches in
+    flight, retrying rate-limited calls and checkpointing finished batches.
+    """
+
+    def __init__(self, backend, embed_batch_size: int = EMBED_BATCH_SIZE,
+                 upsert_batch_size: int = UPSERT_BATCH_SIZE,
+                 max_concurrency: int = INGEST_MAX_CONCURRENCY,
+                 checkpoint_path: str = INGEST_CHECKPOINT_PATH):
+        self.backend = backend
+        self.embed_batch_size = embed_batch_size
+        self.upsert_batch_size = upsert_batch_size
+        self.max_concurrency = max(1, max_concurrency)
+        self.checkpoint = IngestCheckpoint(checkpoint_path)
+
+    def _process_batch(self, documents: List[Document]) -> bool:
+        """Embed and upsert one batch; returns False if a previous run already did."""
+        ids = [doc.metadata["chunk_id"] for doc in documents]
+        key = batch_key(documents, self.backend.scope)
+        if key in self.checkpoint.completed:
+            return False
+
+        texts = [doc.page_content for doc in documents]
+        with span("embed_batch", INGEST_STAGE_SECONDS):
+            vectors = with_retries(
+                lambda: self.backend.embeddings.embed_documents(texts),
+                f"Embedding {len(texts)} chunks"
+            )
+        for start in range(0, len(documents), self.upsert_batch_size):
+            end = start + self.upsert_batch_size
+            with span("upsert_batch", INGEST_STAGE_SECONDS):
+                with_retries(
+                    lambda: self.backend.upsert_vectors(ids[start:end], vectors[start:end], documents[start:end]),
+                    f"Upserting {len(ids[start:end])} vectors"
+                )
+        count("noc_ingest_chunks_total", len(documents))
+        count("noc_ingest_bytes_total", sum(len(text.encode("utf-8")) for text in texts))
+
+        self.checkpoint.mark_done(key)
+        return True
+
+    def run(self, documents: Iterable[Document]) -> Dict[str, float]:
+        """Embed and upsert all documents, returning counts and throughput."""
+        start = time.perf_counter()
+        counts = {"upserted": 0, "resumed": 0}
+        batch_sizes = {}
+
+        def collect(futures):
+            for future in futures:
+                processed = future.result()
+                counts["upserted" if processed else "resumed"] += batch_sizes.pop(future)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            pending = set()
+            for batch in _batches(documents, self.embed_batch_size):
+                # Bound queued batches so the pool never holds the whole corpus
+                if len(pending) >= self.max_concurrency * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                future = pool.submit(self._process_batch, batch)
+                batch_sizes[future] = len(batch)
+                pending.add(future)
+            collect(pending)
+
+        elapsed = time.perf_counter() - start
+        rate = counts["upserted"] / elapsed if elapsed else 0.0
+        logger.info(
+            f"Upserted {counts['upserted']} vectors in {elapsed:.1f}s ({rate:.1f} vectors/s), "
+            f"{counts['resumed']} skipped from checkpoint"
+        )
+
+        # Finished cleanly; the next run starts fresh
+        self.checkpoint.clear()
+        return {**counts, "seconds": elapsed, "vectors_per_second": rate}
@@ -1,7 +1,9 @@
+import argparse
 import os
-from .vector_store import process_documents
+from .vector_store import VectorStore, update_index
 import logging
-from .config import OPENAI_API_KEY
+from .config import OPENAI_API_KEY, VECTOR_STORE_BACKEND, METRICS_TEXTFILE_PATH
+from .metrics import REGISTRY
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -9,20 +11,13 @@ logger = logging.getLogger(__name__)
 def initialize():
     """Initialize the vector database with documents."""
     try:
-        # Debug: Print current working directory and env info
         logger.info(f"Current working directory: {os.getcwd()}")
-        logger.info(f".env file exists: {os.path.exists('.env')}")
-        
-        # Debug: Print API key info
-        logger.info(f"API Key from config (first 10 chars): {OPENAI_API_KEY[:10]}")
-        logger.info(f"Direct env var (first 10 chars): {os.getenv('OPENAI_API_KEY', 'NOT_FOUND')[:10]}")
-        
-        with open('.env', 'r') as f:
-            logger.info(f"Raw .env content: {f.read()}")
-        
+        if not OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY not found in environment variables")
+
         # Process documents and create vector store
-        logger.info("Processing documents and creating vector store...")
-        vector_store = process_documents()
+        logger.info(f"Processing documents and creating {VECTOR_STORE_BACKEND} vector store...")
+        vector_store = VectorStore().create_vector_store()
         
         logger.info("Initialization complete!")
         return vector_store
@@ -32,4 +27,19 @@ def initialize():
         raise
 
 if __name__ == "__main__":
-    initialize()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the NOC document index.")
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Only re-index documents that changed since the last run"
+    )
+    args = parser.parse_args()
+    
+    if args.update:
+        update_index()
+    else:
+        initialize()
+    
+    if METRICS_TEXTFILE_PATH:
+        REGISTRY.write_prometheus(METRICS_TEXTFILE_PATH)
+        logger.info(f"Ingestion metrics written to {METRICS_TEXTFILE_PATH}")
@@ -0,0 +1,156 @@
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
+from .config import LEXICAL_INDEX_PATH, BM25_K1, BM25_B, RRF_K
+from .tags import Filter, matches_filter
+import heapq
+import json
+import logging
+import math
+import re
+
+logger = logging.getLogger(__name__)
+
+# Keeps error codes, hostnames and paths ("ERR-502", "noc01.example.com") as
+# single tokens; their parts are indexed as well so "502" still matches
+TOKEN_PATTERN = re.compile(r"[a-z0-9](?:[a-z0-9_.:/\-]*[a-z0-9])?")
+PART_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or "
+    "the this to what when where which who why with you your".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms for indexing and querying, compound tokens plus their parts."""
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        parts = PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            terms.append(token)
+        terms.extend(part for part in parts if part not in STOPWORDS)
+    return terms
+
+class BM25Index:
+    """In-memory inverted index over chunk text, scored with Okapi BM25.
+
+    Chunks are keyed by their chunk_id so the index can be updated in step
+    with the vector index and results can be matched against vector hits.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self._documents: Dict[str, Tuple[str, dict]] = {}
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Document]) -> "BM25Index":
+        index = cls()
+        index.add_documents(documents)
+        return index
+
+    def add_documents(self, documents: Iterable[Document]):
+        """Index chunks, replacing any already indexed under the same chunk_id."""
+        for doc in documents:
+            chunk_id = doc.metadata["chunk_id"]
+            if chunk_id in self._documents:
+                self.remove([chunk_id])
+
+            term_counts = Counter(tokenize(doc.page_content))
+            for term, count in term_counts.items():
+                self._postings[term][chunk_id] = count
+            length = sum(term_counts.values())
+            self._lengths[chunk_id] = length
+            self._total_length += length
+            self._documents[chunk_id] = (doc.page_content, dict(doc.metadata))
+
+    def remove(self, chunk_ids: Iterable[str]):
+        """Drop chunks from the index; unknown IDs are ignored."""
+        for chunk_id in chunk_ids:
+            entry = self._documents.pop(chunk_id, None)
+            if entry is None:
+                continue
+            self._total_length -= self._lengths.pop(chunk_id)
+            for term in set(tokenize(entry[0])):
+                postings = self._postings[term]
+                del postings[chunk_id]
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query: str, k: int = 4, filter: Optional[Filter] = None) -> List[Tuple[Document, float]]:
+        """Return the k best matching chunks, within filter if given, with their BM25 scores."""
+        if not self._documents:
+            return []
+
+        count = len(self._documents)
+        avg_length = self._total_length / count
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / avg_length)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if filter:
+            scores = {
+                chunk_id: score for chunk_id, score in scores.items()
+                if matches_filter(self._documents[chunk_id][1], filter)
+            }
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        results = []
+        for chunk_id, score in best:
+            text, metadata = self._documents[chunk_id]
+            # Fresh documents so callers can annotate metadata freely
+            results.append((Document(page_content=text, metadata=dict(metadata)), score))
+        return results
+
+    def save(self, path: str = LEXICAL_INDEX_PATH):
+        """Write the indexed chunks atomically; postings are rebuilt on load."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "chunks": [
+                    {"text": text, "metadata": metadata}
+                    for text, metadata in self._documents.values()
+                ]
+            }, f)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: str = LEXICAL_INDEX_PATH) -> "BM25Index":
+        """Load the index, or return an empty one if none has been built."""
+        index = cls()
+        path = Path(path)
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                chunks = json.load(f)["chunks"]
+            index.add_documents(
+                Document(page_content=chunk["text"], metadata=chunk["metadata"])
+                for chunk in chunks
+            )
+            logger.info(f"Loaded lexical index with {len(index)} chunks from {path}")
+        return index
+
+def discard_lexical_index(path: str = LEXICAL_INDEX_PATH):
+    """Forget the lexical index after the vector index was cleared."""
+    Path(path).unlink(missing_ok=True)
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = RRF_K) -> List[Tuple[Hashable, float]]:
+    """Merge ranked lists of keys, scoring each key by the sum of 1 / (k + rank)."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
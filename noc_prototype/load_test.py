@@ -0,0 +1,236 @@
+"""
+Concurrent load generator for the chat engine.
+
+    python -m noc_prototype.load_test --sessions 50 --turns 5
+    python -m noc_prototype.load_test --sessions 200 --llm-latency 0.8 --llm-error-rate 0.02
+
+Each simulated operator session runs in its own thread, as Streamlit runs
+each browser session, and asks questions through ChatEngine.get_response
+with its own conversation memory. All sessions share one engine over the
+stand-ins in stand_ins.py, whose latency and error rates are configurable.
+The report covers throughput, latency percentiles, time spent queued for
+the shared event loop, per-stage percentiles and memory per session.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from .benchmark import build_engine, latency_summary
+from .chat_engine import ChatEngine
+from .memory import ConversationMemory
+from .metrics import REGISTRY
+from .stand_ins import synthetic_corpus, synthetic_queries
+from .utils import run_sync
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RequestResult:
+    session: int
+    seconds: float
+    queued_seconds: float
+    error: Optional[str] = None
+
+class _InFlight:
+    """Count of requests in progress and its high-water mark."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.current -= 1
+
+def _peak_rss_kb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / 1024 if sys.platform == "darwin" else float(usage)
+
+def timed_request(engine: ChatEngine, query: str, memory: ConversationMemory, session: int) -> RequestResult:
+    """One get_response call, separating time queued for the event loop from the rest."""
+    submitted = time.perf_counter()
+    started = []
+
+    async def respond():
+        started.append(time.perf_counter())
+        return await engine.aget_response(query, memory=memory)
+
+    try:
+        run_sync(respond())
+        error = None
+    except Exception as e:
+        error = type(e).__name__
+    finished = time.perf_counter()
+    queued = (started[0] if started else finished) - submitted
+    return RequestResult(session, finished - submitted, queued, error)
+
+def run_session(engine: ChatEngine, session: int, turns: int, think_time: float,
+                start_delay: float, in_flight: _InFlight,
+                barrier: Optional[threading.Barrier] = None) -> List[RequestResult]:
+    """
+    One simulated operator asking `turns` questions in the same conversation.
+    With a barrier, the session waits there after its last turn, still
+    holding its memory, until every session has finished.
+    """
+    try:
+        time.sleep(start_delay)
+        memory = ConversationMemory()
+        results = []
+        for query in synthetic_queries(turns, seed=1000 + session):
+            with in_flight:
+                results.append(timed_request(engine, query, memory, session))
+            if think_time:
+                time.sleep(think_time)
+    except Exception:
+        # Don't leave the other sessions waiting for this one
+        if barrier is not None:
+            barrier.abort()
+        raise
+    if barrier is not None:
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+    return results
+
+def run_load_test(sessions: int = 10, turns: int = 5, ramp_up: float = 0.0, think_time: float = 0.0,
+                  documents: int = 20, pages: int = 10, embed_latency: float = 0.0,
+                  search_latency: float = 0.0, llm_latency: float = 0.0, token_latency: float = 0.0,
+                  embed_error_rate: float = 0.0, search_error_rate: float = 0.0,
+                  llm_error_rate: float = 0.0, trace_memory: bool = False) -> Dict:
+    """Drive concurrent sessions through one shared engine and summarise the run."""
+    engine = build_engine(
+        list(synthetic_corpus(documents, pages)), embed_latency, search_latency, llm_latency,
+        token_latency, embed_error_rate, search_error_rate, llm_error_rate
+    )
+    engine.warm_up()
+    REGISTRY.reset()
+    in_flight = _InFlight()
+    rss_before = _peak_rss_kb()
+    barrier = None
+    live = {}
+    if trace_memory:
+        tracemalloc.start()
+        # Measured once every session has finished but still holds its memory
+        barrier = threading.Barrier(
+            sessions, action=lambda: live.setdefault("bytes", tracemalloc.get_traced_memory()[0])
+        )
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [
+            pool.submit(run_session, engine, session, turns, think_time,
+                        ramp_up * session / sessions, in_flight, barrier)
+            for session in range(sessions)
+        ]
+        results = [result for future in futures for result in future.result()]
+    elapsed = time.perf_counter() - start
+
+    memory = {}
+    if trace_memory:
+        released, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # What the sessions held, without the engine caches that outlive them
+        if "bytes" in live:
+            memory["traced_per_session_kb"] = max(0, live["bytes"] - released) / 1024 / sessions
+        memory["traced_retained_kb"] = released / 1024
+        memory["traced_peak_kb"] = peak / 1024
+    rss_after = _peak_rss_kb()
+    if rss_before is not None:
+        memory["peak_rss_kb"] = rss_after
+        memory["rss_growth_per_session_kb"] = (rss_after - rss_before) / sessions
+
+    succeeded = [r for r in results if r.error is None]
+    errors: Dict[str, int] = {}
+    for r in results:
+        if r.error is not None:
+            errors[r.error] = errors.get(r.error, 0) + 1
+
+    return {
+        "parameters": {
+            "sessions": sessions, "turns": turns, "ramp_up": ramp_up, "think_time": think_time,
+            "documents": documents, "pages": pages,
+            "embed_latency": embed_latency, "search_latency": search_latency,
+            "llm_latency": llm_latency, "token_latency": token_latency,
+            "embed_error_rate": embed_error_rate, "search_error_rate": search_error_rate,
+            "llm_error_rate": llm_error_rate,
+        },
+        "seconds": elapsed,
+        "requests": len(results),
+        "succeeded": len(succeeded),
+        "errors": errors,
+        "requests_per_second": len(succeeded) / elapsed if elapsed else 0.0,
+        "peak_in_flight": in_flight.peak,
+        "latency": latency_summary([r.seconds for r in succeeded]) if succeeded else {},
+        "queued": latency_summary([r.queued_seconds for r in results]) if results else {},
+        "stages": REGISTRY.summary()["latencies"],
+        "memory": memory,
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the chat engine with concurrent simulated sessions.")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent operator sessions")
+    parser.add_argument("--turns", type=int, default=5, help="Questions asked per session")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which sessions start")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds between a session's questions")
+    parser.add_argument("--documents", type=int, default=20, help="Synthetic PDFs in the corpus")
+    parser.add_argument("--pages", type=int, default=10, help="Pages per synthetic PDF")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds added per embedding call")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Seconds added per vector query")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds to the first LLM token")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per generated token")
+    parser.add_argument("--embed-error-rate", type=float, default=0.0, help="Fraction of embedding calls that fail")
+    parser.add_argument("--search-error-rate", type=float, default=0.0, help="Fraction of vector queries that fail")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of LLM calls that fail")
+    parser.add_argument("--trace-memory", action="store_true", help="Measure allocations per session (slower)")
+    parser.add_argument("--output", help="Report file (default: benchmark_results/load-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    report = run_load_test(
+        args.sessions, args.turns, args.ramp_up, args.think_time, args.documents, args.pages,
+        args.embed_latency, args.search_latency, args.llm_latency, args.token_latency,
+        args.embed_error_rate, args.search_error_rate, args.llm_error_rate, args.trace_memory
+    )
+
+    output = Path(args.output or f"benchmark_results/load-{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(
+        f"{report['succeeded']}/{report['requests']} requests in {report['seconds']:.1f}s "
+        f"({report['requests_per_second']:.1f}/s), peak {report['peak_in_flight']} in flight"
+    )
+    for name in ("latency", "queued"):
+        if report[name]:
+            print(f"{name}: " + ", ".join(f"{k}={v:.1f}" for k, v in report[name].items()))
+    for stage in report["stages"]:
+        print(f"  {stage.get('stage', stage.get('kind', stage['metric']))}: "
+              f"p50={stage['p50_ms']:.1f}ms p99={stage['p99_ms']:.1f}ms")
+    if report["errors"]:
+        print("errors: " + ", ".join(f"{name}={n}" for name, n in report["errors"].items()))
+    if report["memory"]:
+        print("memory: " + ", ".join(f"{k}={v:.0f}" for k, v in report["memory"].items()))
+    print(f"Report written to {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+from pathlib import Path
+from typing import Dict, Optional
+from langchain_core.documents import Document
+from .config import INDEX_MANIFEST_PATH
+from .tags import TAG_FIELDS
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+def hash_file(path: Path) -> str:
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_text(text: str) -> str:
+    """SHA-256 of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def hash_chunk(chunk: Document) -> str:
+    """SHA-256 of a chunk's text and the tags searches filter on.
+
+    A re-tagged chunk, such as an untouched page of an edited PDF whose
+    last_modified moved, must be re-upserted even though its text is the same.
+    """
+    tags = {field: chunk.metadata.get(field) for field in TAG_FIELDS}
+    return hash_text(chunk.page_content + "\0" + json.dumps(tags, sort_keys=True, default=str))
+
+class IndexManifest:
+    """Record of which source PDFs and chunks are in the vector index.
+
+    Each source entry holds the PDF's hash, mtime and size plus a map of
+    chunk ID to chunk hash (text and tags), so re-ingestion can tell exactly which
+    chunks to upsert and which to delete.
+    """
+
+    def __init__(self, path: str = INDEX_MANIFEST_PATH, backend: Optional[str] = None):
+        self.path = Path(path)
+        self.backend = backend
+        self.sources: Dict[str, Dict] = {}
+
+    @classmethod
+    def load(cls, path: str = INDEX_MANIFEST_PATH) -> "IndexManifest":
+        """Load the manifest, or return an empty one if none has been written."""
+        manifest = cls(path)
+        if manifest.path.exists():
+            with open(manifest.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            manifest.backend = data.get("backend")
+            manifest.sources = data.get("sources", {})
+        return manifest
+
+    def save(self):
+        """Write the manifest atomically so a crash never leaves it half written."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"backend": self.backend, "sources": self.sources}, f)
+        tmp_path.replace(self.path)
+
+    def is_unchanged(self, source: str, mtime: float, size: int) -> bool:
+        """Cheap check on file stats before hashing the PDF."""
+        entry = self.sources.get(source)
+        return entry is not None and entry["mtime"] == mtime and entry["size"] == size
+
+    def chunk_hashes(self, source: str) -> Dict[str, str]:
+        entry = self.sources.get(source)
+        return dict(entry["chunks"]) if entry else {}
+
+def discard_manifest(path: str = INDEX_MANIFEST_PATH):
+    """Forget the manifest after the index was rebuilt or cleared by other means."""
+    Path(path).unlink(missing_ok=True)
@@ -0,0 +1,114 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from .answer_cache import normalize_query
+from .config import (
+    MEMORY_TOKEN_CAP, MEMORY_WINDOW_TURNS, MEMORY_ANSWER_TOKENS, MEMORY_TOPIC_SIMILARITY
+)
+from .utils import count_tokens, get_token_encoding
+import threading
+import numpy as np
+
+@dataclass
+class Turn:
+    question: str
+    standalone_question: str
+    answer: str
+    sources: List[Document]
+    query_embedding: Optional[List[float]] = None
+
+def _clip(text: str, max_tokens: int) -> str:
+    encoding = get_token_encoding()
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    # Leave room for the ellipsis so the clipped text stays within max_tokens
+    return encoding.decode(tokens[:max(0, max_tokens - 2)]) + " …"
+
+class ConversationMemory:
+    """Per-session chat history with a hard token cap.
+
+    The last MEMORY_WINDOW_TURNS turns are kept verbatim (answers clipped);
+    older turns are folded into a rolling summary of the questions asked.
+    The rendered history never exceeds max_tokens, so the condensing
+    prompt stays the same size however long the conversation runs.
+    Condensed questions are cached per turn so reruns never regenerate them.
+    """
+
+    def __init__(self, max_tokens: int = MEMORY_TOKEN_CAP, window_turns: int = MEMORY_WINDOW_TURNS,
+                 answer_tokens: int = MEMORY_ANSWER_TOKENS):
+        self.max_tokens = max_tokens
+        self.window_turns = window_turns
+        self.answer_tokens = answer_tokens
+        self.turns = deque()
+        self.summary = deque(maxlen=50)
+        self._turn_count = 0
+        self._condensed: Dict[Tuple[int, str], str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._turn_count
+
+    @property
+    def last_turn(self) -> Optional[Turn]:
+        return self.turns[-1] if self.turns else None
+
+    def add_turn(self, turn: Turn):
+        with self._lock:
+            self.turns.append(turn)
+            self._turn_count += 1
+            while len(self.turns) > self.window_turns:
+                # Older turns survive only as the topic they asked about
+                self.summary.append(self.turns.popleft().standalone_question)
+            # Condensed questions only apply to the history they were made from
+            self._condensed = {
+                key: value for key, value in self._condensed.items() if key[0] == self._turn_count
+            }
+
+    def reusable_sources(self, query_embedding: Optional[List[float]],
+                         threshold: float = MEMORY_TOPIC_SIMILARITY) -> Optional[List[Document]]:
+        """Sources of the previous turn if the new question is on the same topic."""
+        last = self.last_turn
+        if last is None or not last.sources or last.query_embedding is None or query_embedding is None:
+            return None
+        a = np.asarray(last.query_embedding, dtype=np.float32)
+        b = np.asarray(query_embedding, dtype=np.float32)
+        norms = np.linalg.norm(a) * np.linalg.norm(b)
+        if norms and float(a @ b) / norms >= threshold:
+            return last.sources
+        return None
+
+    def get_condensed(self, question: str) -> Optional[str]:
+        return self._condensed.get((self._turn_count, normalize_query(question)))
+
+    def set_condensed(self, question: str, standalone_question: str):
+        self._condensed[(self._turn_count, normalize_query(question))] = standalone_question
+
+    def render(self) -> str:
+        """History for the condensing prompt, newest turns kept first, within max_tokens."""
+        with self._lock:
+            blocks = []
+            used = 0
+            for turn in reversed(self.turns):
+                block = f"User: {turn.question}\nAssistant: {_clip(turn.answer, self.answer_tokens)}"
+                tokens = count_tokens(block + "\n\n")
+                if used + tokens > self.max_tokens:
+                    break
+                blocks.append(block)
+                used += tokens
+
+            summary = ""
+            if self.summary and used < self.max_tokens:
+                summary = _clip(
+                    "Earlier the user asked about: " + "; ".join(reversed(self.summary)),
+                    self.max_tokens - used
+                )
+            return "\n\n".join(([summary] if summary else []) + list(reversed(blocks)))
+
+    def clear(self):
+        with self._lock:
+            self.turns.clear()
+            self.summary.clear()
+            self._condensed.clear()
+            self._turn_count = 0
@@ -0,0 +1,234 @@
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from .config import METRICS_WINDOW, METRICS_TRACE_HISTORY
+import threading
+import time
+import numpy as np
+
+QUERY_STAGE_SECONDS = "noc_query_stage_seconds"
+INGEST_STAGE_SECONDS = "noc_ingest_stage_seconds"
+REQUEST_SECONDS = "noc_request_seconds"
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def _key(name: str, labels: Dict[str, str]) -> Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+class RequestTrace:
+    """Stage timings and counters of a single request, for per-request breakdowns."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = time.time()
+        self.seconds = 0.0
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+
+    def add_stage(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add(self, counter: str, value: float):
+        self.counters[counter] = self.counters.get(counter, 0.0) + value
+
+    def merge(self, other: "RequestTrace"):
+        """Add another trace's stages and counters, e.g. work shared by several requests."""
+        for stage, seconds in other.stages.items():
+            self.add_stage(stage, seconds)
+        for counter, value in other.counters.items():
+            self.add(counter, value)
+
+    def as_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "total_ms": round(self.seconds * 1000, 2),
+            "stages_ms": {stage: round(seconds * 1000, 2) for stage, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+class MetricsRegistry:
+    """In-process latency summaries, counters and recent request traces.
+
+    Latencies keep a rolling window of the last `window` samples per series
+    for percentiles, plus lifetime count and sum, matching a Prometheus
+    summary.
+    """
+
+    def __init__(self, window: int = METRICS_WINDOW, trace_history: int = METRICS_TRACE_HISTORY):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[Key, deque] = {}
+        self._sums: Dict[Key, float] = {}
+        self._counts: Dict[Key, int] = {}
+        self._counters: Dict[Key, float] = {}
+        self.traces = deque(maxlen=trace_history)
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=self.window)
+                self._sums[key] = 0.0
+                self._counts[key] = 0
+            self._samples[key].append(seconds)
+            self._sums[key] += seconds
+            self._counts[key] += 1
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def add_trace(self, trace: RequestTrace):
+        with self._lock:
+            self.traces.append(trace.as_dict())
+
+    def percentiles(self, name: str, **labels) -> Dict[float, float]:
+        with self._lock:
+            samples = list(self._samples.get(_key(name, labels), ()))
+        if not samples:
+            return {}
+        values = np.percentile(samples, [q * 100 for q in QUANTILES])
+        return dict(zip(QUANTILES, (float(v) for v in values)))
+
+    def summary(self) -> Dict[str, List[Dict]]:
+        """Latency percentiles in milliseconds and counter totals, for display."""
+        with self._lock:
+            series = {key: list(samples) for key, samples in self._samples.items()}
+            counts = dict(self._counts)
+            counters = dict(self._counters)
+        latencies = []
+        for (name, labels), samples in sorted(series.items()):
+            values = np.percentile(samples, [q * 100 for q in QUANTILES]) * 1000
+            latencies.append({
+                "metric": name, **dict(labels), "count": counts[(name, labels)],
+                **{f"p{int(q * 100)}_ms": round(float(v), 2) for q, v in zip(QUANTILES, values)},
+            })
+        totals = [
+            {"metric": name, **dict(labels), "value": value}
+            for (name, labels), value in sorted(counters.items())
+        ]
+        return {"latencies": latencies, "counters": totals}
+
+    def to_prometheus(self) -> str:
+        """All series in the Prometheus text exposition format."""
+        with self._lock:
+            series = {key: list(samples) for key, samples in self._samples.items()}
+            sums = dict(self._sums)
+            counts = dict(self._counts)
+            counters = dict(self._counters)
+
+        lines = []
+        typed = set()
+        for (name, labels), samples in sorted(series.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            values = np.percentile(samples, [q * 100 for q in QUANTILES])
+            for q, value in zip(QUANTILES, values):
+                lines.append(f"{name}{_format_labels(labels, (('quantile', str(q)),))} {float(value):.6f}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {sums[(name, labels)]:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {counts[(name, labels)]}")
+        for (name, labels), value in sorted(counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Write the text dump atomically, e.g. for node_exporter's textfile collector."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(self.to_prometheus(), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._sums.clear()
+            self._counts.clear()
+            self._counters.clear()
+            self.traces.clear()
+
+REGISTRY = MetricsRegistry()
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("noc_request_trace", default=None)
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+def begin_trace(name: str) -> Tuple[RequestTrace, bool]:
+    """The request trace in progress, or a new one; True if the caller owns (and ends) it."""
+    trace = _current_trace.get()
+    if trace is not None:
+        return trace, False
+    return RequestTrace(name), True
+
+@contextmanager
+def activate_trace(trace: RequestTrace):
+    """Make trace the current one for stages timed in this context."""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+def end_trace(trace: RequestTrace, registry: Optional[MetricsRegistry] = None):
+    """Record a finished request's total time and breakdown."""
+    registry = registry or REGISTRY
+    trace.seconds = time.time() - trace.started_at
+    registry.observe(REQUEST_SECONDS, trace.seconds, kind=trace.name)
+    registry.add_trace(trace)
+
+@contextmanager
+def request_trace(name: str, registry: Optional[MetricsRegistry] = None) -> Iterator[RequestTrace]:
+    """Collect the stages of one request; nested traces join the outermost one.
+
+    The trace lives in a context variable, so stages timed on the shared
+    event loop or in worker threads started from this context are included.
+    """
+    trace, owned = begin_trace(name)
+    try:
+        with activate_trace(trace):
+            yield trace
+    finally:
+        if owned:
+            end_trace(trace, registry)
+
+@contextmanager
+def span(stage: str, metric: str = QUERY_STAGE_SECONDS, registry: Optional[MetricsRegistry] = None,
+         trace: Optional[RequestTrace] = None):
+    """Time a stage into the registry and the current request trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start, metric, registry, trace)
+
+def record_stage(stage: str, seconds: float, metric: str = QUERY_STAGE_SECONDS,
+                 registry: Optional[MetricsRegistry] = None, trace: Optional[RequestTrace] = None):
+    (registry or REGISTRY).observe(metric, seconds, stage=stage)
+    trace = trace or _current_trace.get()
+    if trace is not None:
+        trace.add_stage(stage, seconds)
+
+def count(counter: str, value: float = 1.0, registry: Optional[MetricsRegistry] = None,
+          trace: Optional[RequestTrace] = None, **labels):
+    """Add to a counter in the registry and the current request trace."""
+    (registry or REGISTRY).inc(counter, value, **labels)
+    trace = trace or _current_trace.get()
+    if trace is not None:
+        trace.add(counter, value)
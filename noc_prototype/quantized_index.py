@@ -0,0 +1,651 @@
+"""
+Compact in-process vector index: embeddings stored as float16 or int8 in
+memory-mapped files and searched with vectorized NumPy.
+
+    python -m noc_prototype.quantized_index --vectors 20000 --dimension 1536
+    python -m noc_prototype.quantized_index --embedding-cache .cache/embeddings.sqlite
+
+The command prints a recall-vs-latency report for each storage type,
+reduced dimension and IVF setting against exact float32 search, on
+synthetic vectors or on real ones from the embedding cache.
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
+from .config import QUANTIZED_INDEX_DIR, QUANTIZED_DTYPE, QUANTIZED_FLOAT16_CACHE_MB, IVF_LISTS, IVF_PROBES
+from .corpus import COMPACT_GARBAGE_RATIO
+from .tags import Filter, filter_key, matches_filter
+import argparse
+import json
+import logging
+import mmap
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.bin"
+SCALES_FILE = "scales.bin"
+TEXTS_FILE = "texts.bin"
+STATE_FILE = "index.json"
+ROWS_FILE = "rows.jsonl"
+IVF_FILE = "ivf.npz"
+# File of each kind in generation 0; compaction and IVF training write the
+# kinds they change as a new generation named in index.json
+FILE_KINDS = {"vectors": VECTORS_FILE, "scales": SCALES_FILE, "texts": TEXTS_FILE,
+              "rows": ROWS_FILE, "ivf": IVF_FILE}
+
+DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+# Rows converted to float32 at a time while scoring; small blocks stay in cache
+SEARCH_BLOCK_ROWS = 256
+
+def _generation_name(name: str, generation: int) -> str:
+    stem, suffix = name.split(".", 1)
+    return f"{stem}.{generation}.{suffix}"
+
+def normalize(vectors) -> np.ndarray:
+    """Rows scaled to unit length, as float32."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def quantize(vectors, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Unit vectors in the storage dtype, with a scale per row for int8."""
+    vectors = normalize(vectors)
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    return vectors.astype(DTYPES[dtype]), None
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), SEARCH_BLOCK_ROWS):
+        block = vectors[start:start + SEARCH_BLOCK_ROWS]
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+def kmeans(vectors: np.ndarray, n_lists: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means centroids for IVF partitioning."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _nearest(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        # Empty partitions keep their previous centroid
+        filled = np.bincount(assignments, minlength=n_lists) > 0
+        centroids[filled] = normalize(sums[filled])
+    return centroids
+
+class QuantizedIndex:
+    """Local vector index of float16 or int8 embeddings in memory-mapped files.
+
+    vectors.bin holds one row per upserted vector (with a float32 scale per
+    row in scales.bin for int8) and texts.bin the chunk texts. rows.jsonl is
+    an append-only log of each row's ID, text offset and metadata, and of
+    deletions; index.json records the dtype and dimension. Upserts write
+    their vectors at the next row position and then log the rows, so a
+    batch interrupted before its log line leaves bytes that the next open
+    cuts off. Replaced and deleted rows become tombstones, which compaction
+    reclaims by writing a new generation of files and then naming it in
+    index.json, so an interrupted compaction leaves the previous generation
+    in use.
+
+    int8 rows are converted to float32 a block at a time while scoring.
+    Widening float16 that way costs about 8x a float32 scan (107 ms against
+    12 ms p50 at 20k x 1536 on one core), so float16 indexes search a float32
+    copy kept in memory while it fits QUANTIZED_FLOAT16_CACHE_MB: float16
+    then halves disk and page cache use but not search memory.
+
+    With train_ivf(), rows are also partitioned by k-means so a query only
+    scores the n_probe partitions whose centroids are closest.
+    """
+
+    def __init__(self, directory: str = QUANTIZED_INDEX_DIR, dtype: str = QUANTIZED_DTYPE, embeddings=None):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown dtype '{dtype}'. Expected one of: {', '.join(DTYPES)}")
+        self.directory = Path(directory)
+        self.embeddings = embeddings
+        self.dtype = dtype
+        self.dimension: Optional[int] = None
+        self.generation = 0
+        self._files: Dict[str, str] = dict(FILE_KINDS)
+        self.ids: List[Optional[str]] = []
+        self.texts: List[List[int]] = []
+        self.metadata: List[Dict] = []
+        self.centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._rows: Dict[str, int] = {}
+        self._vectors = None
+        self._scales = None
+        self._text_map = None
+        self._text_file = None
+        self._masks: Dict[str, np.ndarray] = {}
+        self._lists = None
+        self._widened: Optional[np.ndarray] = None
+        self._lock = threading.RLock()
+
+        state_path = self.directory / STATE_FILE
+        if state_path.exists():
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.dtype = state["dtype"]
+            self.dimension = state["dimension"]
+            self.generation = state.get("generation", 0)
+            self._files.update(state.get("files", {}))
+            ivf_path = self._path("ivf")
+            if ivf_path.exists():
+                with np.load(ivf_path) as ivf:
+                    self.centroids = ivf["centroids"]
+            self._replay()
+            self._open()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _path(self, kind: str) -> Path:
+        return self.directory / self._files[kind]
+
+    @property
+    def vector_bytes(self) -> int:
+        """Bytes of vector data per stored row, including its scale."""
+        if self.dimension is None:
+            return 0
+        return self.dimension * np.dtype(DTYPES[self.dtype]).itemsize + (4 if self.dtype == "int8" else 0)
+
+    def _replay(self):
+        """Rebuild the rows from the log, dropping whatever an interrupted write left behind."""
+        log_path = self._path("rows")
+        assignments = []
+        if log_path.exists():
+            with open(log_path, "rb") as f:
+                good = 0
+                for line in f:
+                    try:
+                        record = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        record = None
+                    if record is None:
+                        logger.warning(f"Ignoring a partly written record at the end of {log_path}")
+                        break
+                    good += len(line)
+                    if "deleted" in record:
+                        for vector_id in record["deleted"]:
+                            row = self._rows.pop(vector_id, None)
+                            if row is not None:
+                                self.ids[row] = None
+                    else:
+                        self._add_row(record["id"], record["text"], record["metadata"])
+                        assignments.append(record.get("list", -1))
+            if good < log_path.stat().st_size:
+                with open(log_path, "r+b") as f:
+                    f.truncate(good)
+
+        self._alive = np.array([i is not None for i in self.ids], dtype=bool)
+        self._assignments = np.array(assignments, dtype=np.int32)
+        # Vectors are written before their rows are logged; cut off any without a row
+        for kind, row_bytes in self._data_files():
+            path = self._path(kind)
+            size = path.stat().st_size if path.exists() else 0
+            if size < len(self.ids) * row_bytes:
+                raise ValueError(f"{path} holds fewer rows than {log_path} lists; rebuild the index")
+            if size > len(self.ids) * row_bytes:
+                with open(path, "r+b") as f:
+                    f.truncate(len(self.ids) * row_bytes)
+
+    def _data_files(self) -> List[Tuple[str, int]]:
+        """Kinds of per-row data file with the bytes each row takes in them."""
+        files = [("vectors", self.dimension * np.dtype(DTYPES[self.dtype]).itemsize)]
+        if self.dtype == "int8":
+            files.append(("scales", 4))
+        return files
+
+    def _open(self):
+        """Map the vector files for the current number of rows."""
+        rows = len(self.ids)
+        self._vectors = self._scales = None
+        if not rows:
+            return
+        self._vectors = np.memmap(self._path("vectors"), dtype=DTYPES[self.dtype], mode="r",
+                                  shape=(rows, self.dimension))
+        if self.dtype == "int8":
+            self._scales = np.memmap(self._path("scales"), dtype=np.float32, mode="r", shape=(rows,))
+
+    def _invalidate(self):
+        self._masks.clear()
+        self._lists = None
+
+    def _add_row(self, vector_id: str, text: List[int], metadata: Dict) -> Optional[int]:
+        """Append a row's bookkeeping; returns the row it replaces, if any."""
+        row = len(self.ids)
+        self.ids.append(vector_id)
+        self.texts.append(text)
+        self.metadata.append(metadata)
+        if vector_id is None:
+            # Tombstone kept by a rewritten log to preserve row numbers
+            return None
+        old = self._rows.get(vector_id)
+        if old is not None:
+            self.ids[old] = None
+        self._rows[vector_id] = row
+        return old
+
+    def _append_log(self, records: List[Dict]):
+        with open(self._path("rows"), "ab") as f:
+            f.write(b"".join(
+                json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+                for record in records
+            ))
+
+    def upsert(self, ids: List[str], vectors: Sequence[Sequence[float]], documents: Optional[List[Document]] = None):
+        """Add or replace vectors, with their documents' text and metadata."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = int(vectors.shape[1])
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._write_header()
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(f"Expected {self.dimension}-dimensional vectors, got {vectors.shape[1]}")
+            codes, scales = quantize(vectors, self.dtype)
+
+            # Written at the next row position rather than appended, so bytes
+            # left by an interrupted batch are overwritten
+            self._vectors = self._scales = None
+            for (kind, row_bytes), data in zip(self._data_files(), (codes, scales)):
+                path = self._path(kind)
+                with open(path, "r+b" if path.exists() else "wb") as f:
+                    f.seek(len(self.ids) * row_bytes)
+                    f.write(data.tobytes())
+                    f.truncate()
+            texts = []
+            with open(self._path("texts"), "ab") as f:
+                offset = f.tell()
+                for i in range(len(ids)):
+                    text = documents[i].page_content.encode("utf-8") if documents else b""
+                    f.write(text)
+                    texts.append([offset, len(text)])
+                    offset += len(text)
+
+            assignments = _nearest(normalize(vectors), self.centroids) if self.centroids is not None else None
+            records = []
+            for i, vector_id in enumerate(ids):
+                record = {"id": vector_id, "text": texts[i], "metadata": dict(documents[i].metadata) if documents else {}}
+                if assignments is not None:
+                    record["list"] = int(assignments[i])
+                records.append(record)
+            self._append_log(records)
+
+            replaced = [self._add_row(r["id"], r["text"], r["metadata"]) for r in records]
+            self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+            for row in replaced:
+                if row is not None:
+                    self._alive[row] = False
+            if assignments is not None:
+                self._assignments = np.concatenate([self._assignments, assignments])
+
+            self._invalidate()
+            self._open()
+            self._maybe_compact()
+
+    def delete(self, ids: List[str]):
+        """Remove vectors by ID; unknown IDs are ignored."""
+        with self._lock:
+            deleted = [vector_id for vector_id in ids if vector_id in self._rows]
+            if not deleted:
+                return
+            self._append_log([{"deleted": deleted}])
+            for vector_id in deleted:
+                row = self._rows.pop(vector_id)
+                self.ids[row] = None
+                self._alive[row] = False
+            self._invalidate()
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self.ids and 1 - len(self._rows) / len(self.ids) > COMPACT_GARBAGE_RATIO:
+            self.compact()
+
+    def _write_header(self):
+        tmp_path = self.directory / (STATE_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dtype": self.dtype, "dimension": self.dimension,
+                       "generation": self.generation, "files": self._files}, f)
+        tmp_path.replace(self.directory / STATE_FILE)
+
+    def _next_files(self, kinds: Sequence[str]) -> Dict[str, str]:
+        """Names of the given kinds of file in the next generation."""
+        return {kind: _generation_name(FILE_KINDS[kind], self.generation + 1) for kind in kinds}
+
+    def _commit(self, files: Dict[str, str]):
+        """Switch to a fully written generation of files and remove the ones it replaces.
+
+        Replacing index.json is the one atomic step: until then the previous
+        generation is still named there and intact, and an unfinished one is
+        overwritten by the next attempt.
+        """
+        old = {kind: self._files[kind] for kind in files}
+        self.generation += 1
+        self._files.update(files)
+        self._write_header()
+        for kind, name in old.items():
+            if name != files[kind]:
+                (self.directory / name).unlink(missing_ok=True)
+
+    def _write_rows(self, path: Path, ids: List[Optional[str]], texts: List[List[int]],
+                    metadata: List[Dict], assignments: Optional[np.ndarray]):
+        with open(path, "wb") as f:
+            for row, vector_id in enumerate(ids):
+                record = {"id": vector_id, "text": texts[row], "metadata": metadata[row]}
+                if assignments is not None:
+                    record["list"] = int(assignments[row])
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+
+    def compact(self):
+        """Rewrite the data files and row log with only the live rows."""
+        with self._lock:
+            live = np.flatnonzero(self._alive)
+            files = self._next_files([kind for kind, _ in self._data_files()] + ["texts", "rows"])
+            texts = []
+            with open(self.directory / files["texts"], "wb") as out:
+                for row in live:
+                    text = self._text(row)
+                    texts.append([out.tell(), len(text)])
+                    out.write(text)
+            for kind, data in (("vectors", self._vectors), ("scales", self._scales)):
+                if kind in files:
+                    path = self.directory / files[kind]
+                    if len(live):
+                        np.asarray(data[live]).tofile(path)
+                    else:
+                        path.write_bytes(b"")
+            ids = [self.ids[row] for row in live]
+            metadata = [self.metadata[row] for row in live]
+            assignments = self._assignments[live] if self.centroids is not None else None
+            self._write_rows(self.directory / files["rows"], ids, texts, metadata, assignments)
+
+            self.close()
+            self._commit(files)
+            self.ids, self.texts, self.metadata = ids, texts, metadata
+            if assignments is not None:
+                self._assignments = assignments
+            self._alive = np.ones(len(live), dtype=bool)
+            self._rows = {vector_id: row for row, vector_id in enumerate(self.ids)}
+            self._invalidate()
+            self._open()
+            logger.info(f"Compacted quantized index to {len(live)} rows")
+
+    def clear(self):
+        """Remove every vector and the index files."""
+        with self._lock:
+            self.close()
+            (self.directory / STATE_FILE).unlink(missing_ok=True)
+            kinds = tuple(name.split(".", 1)[0] for name in FILE_KINDS.values())
+            if self.directory.exists():
+                # Every generation, including one an interrupted compaction left
+                for path in self.directory.iterdir():
+                    if path.name.split(".", 1)[0] in kinds:
+                        path.unlink()
+            self.__init__(self.directory, self.dtype, self.embeddings)
+
+    def close(self):
+        self._vectors = self._scales = None
+        self._widened = None
+        if self._text_map is not None:
+            self._text_map.close()
+            self._text_map = None
+        if self._text_file is not None:
+            self._text_file.close()
+            self._text_file = None
+
+    def _text(self, row: int) -> bytes:
+        offset, length = self.texts[row]
+        if not length:
+            return b""
+        # Appends grow the file past the current mapping, so remap on demand
+        if self._text_map is None or len(self._text_map) < offset + length:
+            if self._text_map is not None:
+                self._text_map.close()
+                self._text_file.close()
+            self._text_file = open(self._path("texts"), "rb")
+            self._text_map = mmap.mmap(self._text_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._text_map[offset:offset + length]
+
+    def dequantize(self, rows: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(self._vectors[rows], dtype=np.float32)
+        if self._scales is not None:
+            vectors = vectors * np.asarray(self._scales[rows])[:, None]
+        return vectors
+
+    def train_ivf(self, n_lists: int = IVF_LISTS, sample_size: int = 50000, iterations: int = 10):
+        """Partition the rows with k-means so queries only score nearby partitions."""
+        with self._lock:
+            live = np.flatnonzero(self._alive)
+            if n_lists <= 0 or len(live) < n_lists:
+                logger.info(f"Not training IVF: {len(live)} vectors for {n_lists} partitions")
+                return
+            rng = np.random.default_rng(0)
+            sample = np.sort(rng.choice(live, min(sample_size, len(live)), replace=False))
+            centroids = kmeans(self.dequantize(sample), n_lists, iterations)
+            assignments = np.concatenate([
+                _nearest(self.dequantize(np.arange(start, min(start + SEARCH_BLOCK_ROWS, len(self.ids)))), centroids)
+                for start in range(0, len(self.ids), SEARCH_BLOCK_ROWS)
+            ])
+            files = self._next_files(["rows", "ivf"])
+            with open(self.directory / files["ivf"], "wb") as f:
+                np.savez(f, centroids=centroids)
+            self._write_rows(self.directory / files["rows"], self.ids, self.texts, self.metadata, assignments)
+            self._commit(files)
+            self.centroids, self._assignments = centroids, assignments
+            self._invalidate()
+            logger.info(f"Trained IVF with {n_lists} partitions on {len(sample)} vectors")
+
+    def _list_index(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows sorted by partition and each partition's bounds in that order."""
+        if self._lists is None:
+            order = np.argsort(self._assignments, kind="stable")
+            bounds = np.searchsorted(self._assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = order, bounds
+        return self._lists
+
+    def _mask(self, filter: Optional[Filter]) -> np.ndarray:
+        """Live rows matching the filter, cached until the next write."""
+        key = filter_key(filter)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = self._alive
+            if filter:
+                mask = mask & np.array([matches_filter(m, filter) for m in self.metadata], dtype=bool)
+            self._masks[key] = mask
+        return mask
+
+    def _widen(self) -> Optional[np.ndarray]:
+        """float32 copy of a float16 index's vectors, extended as rows are added."""
+        rows = len(self.ids)
+        if self.dtype != "float16" or rows * self.dimension * 4 > QUANTIZED_FLOAT16_CACHE_MB * 2 ** 20:
+            self._widened = None
+            return None
+        # Upserts only append rows; compaction and clearing drop the copy
+        cached = len(self._widened) if self._widened is not None else 0
+        if cached < rows:
+            tail = np.asarray(self._vectors[cached:rows], dtype=np.float32)
+            self._widened = tail if self._widened is None else np.concatenate([self._widened, tail])
+        return self._widened
+
+    def _score(self, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        widened = self._widen()
+        if widened is not None:
+            return widened @ query if rows is None else widened[rows] @ query
+        count = len(self.ids) if rows is None else len(rows)
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, count)
+            selection = slice(start, end) if rows is None else rows[start:end]
+            scores[start:end] = self._vectors[selection].astype(np.float32, copy=False) @ query
+            if self._scales is not None:
+                scores[start:end] *= self._scales[selection]
+        return scores
+
+    def search(self, embedding: Sequence[float], k: int = 4, filter: Optional[Filter] = None,
+               n_probe: int = IVF_PROBES) -> List[Tuple[int, float]]:
+        """(row, cosine similarity) of the k best live rows within the filter, best first."""
+        with self._lock:
+            if not self._rows:
+                return []
+            query = normalize(embedding)[0]
+            if len(query) != self.dimension:
+                raise ValueError(f"Expected a {self.dimension}-dimensional query, got {len(query)}")
+
+            rows = None
+            if self.centroids is not None and n_probe < len(self.centroids):
+                order, bounds = self._list_index()
+                probes = np.argpartition(-(self.centroids @ query), n_probe)[:n_probe]
+                rows = np.concatenate([order[bounds[p]:bounds[p + 1]] for p in probes])
+            mask = self._mask(filter)
+            if rows is not None:
+                rows = rows[mask[rows]]
+            elif not mask.all():
+                rows = np.flatnonzero(mask)
+
+            scores = self._score(query, rows)
+            if not len(scores):
+                return []
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            found = top if rows is None else rows[top]
+            return list(zip(found.tolist(), scores[top].tolist()))
+
+    def document(self, row: int) -> Document:
+        with self._lock:
+            return Document(page_content=self._text(row).decode("utf-8"), metadata=dict(self.metadata[row]))
+
+    # Vector store interface used by ChatEngine and the app
+
+    def similarity_search_by_vector_with_vectors(self, embedding: List[float], k: int = 4,
+                                                 **kwargs) -> List[Tuple[Document, float, List[float]]]:
+        """Matches with their similarity and (dequantized) stored vector."""
+        with self._lock:
+            results = self.search(embedding, k, filter=kwargs.get("filter"))
+            if not results:
+                return []
+            vectors = self.dequantize(np.array([row for row, _ in results]))
+            return [
+                (self.document(row), score, vector.tolist())
+                for (row, score), vector in zip(results, vectors)
+            ]
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4,
+                                               **kwargs) -> List[Tuple[Document, float]]:
+        with self._lock:
+            return [(self.document(row), score) for row, score in self.search(embedding, k, filter=kwargs.get("filter"))]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embeddings.embed_query(query), k, **kwargs)
+
+def _truncate(vectors: np.ndarray, dimension: Optional[int]) -> np.ndarray:
+    # text-embedding-3 shortens vectors the same way: leading dimensions, renormalized
+    return normalize(vectors if dimension is None else vectors[:, :dimension])
+
+def recall_report(base: np.ndarray, queries: np.ndarray, k: int = 10,
+                  dimensions: Sequence[Optional[int]] = (None, 512, 256),
+                  dtypes: Sequence[str] = ("float32", "float16", "int8"),
+                  ivf_lists: Optional[int] = None, probes: Sequence[int] = (4, 16)) -> List[Dict]:
+    """Recall@k and per-query latency of each index setting against exact float32 search."""
+    full_dimension = base.shape[1]
+    exact_scores = normalize(queries) @ normalize(base).T
+    exact = [set(np.argsort(-row)[:k].tolist()) for row in exact_scores]
+    ivf_lists = ivf_lists or max(1, int(4 * np.sqrt(len(base))))
+
+    settings = [(dimension, dtype, None, None) for dimension in dimensions for dtype in dtypes]
+    settings += [(dimension, "int8", ivf_lists, p) for dimension in dimensions for p in probes if p < ivf_lists]
+
+    report = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n, (dimension, dtype, lists, n_probe) in enumerate(settings):
+            index = QuantizedIndex(Path(directory) / str(n), dtype)
+            index.upsert([str(i) for i in range(len(base))], _truncate(base, dimension))
+            if lists:
+                index.train_ivf(lists)
+            query_vectors = _truncate(queries, dimension)
+
+            hits = 0
+            samples = []
+            for query, truth in zip(query_vectors, exact):
+                start = time.perf_counter()
+                found = index.search(query, k, n_probe=n_probe or IVF_PROBES)
+                samples.append(time.perf_counter() - start)
+                hits += len(truth & {row for row, _ in found})
+            index.close()
+
+            ms = np.asarray(samples) * 1000
+            report.append({
+                "dimension": dimension or full_dimension,
+                "dtype": dtype,
+                "ivf_lists": lists,
+                "probes": n_probe,
+                f"recall_at_{k}": hits / (k * len(queries)),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p99_ms": float(np.percentile(ms, 99)),
+                "bytes_per_vector": index.vector_bytes,
+                "compression": full_dimension * 4 / index.vector_bytes,
+            })
+    return report
+
+def synthetic_embeddings(count: int, dimension: int, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors whose leading dimensions carry the most variance, like text-embedding-3's."""
+    rng = np.random.default_rng(seed)
+    spectrum = 1 / np.sqrt(1 + np.arange(dimension) / 64)
+    centers = rng.standard_normal((clusters, dimension)) * spectrum
+    labels = rng.integers(clusters, size=count)
+    return normalize(centers[labels] + 0.6 * rng.standard_normal((count, dimension)) * spectrum)
+
+def cached_embeddings(path: str) -> np.ndarray:
+    """Every vector in the embedding cache, for a report on real data."""
+    import sqlite3
+    with sqlite3.connect(path) as conn:
+        blobs = [blob for blob, in conn.execute("SELECT vector FROM embeddings")]
+    return np.stack([np.frombuffer(blob, dtype=np.float32) for blob in blobs])
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Recall vs latency of the quantized index against exact search.")
+    parser.add_argument("--vectors", type=int, default=20000, help="Synthetic vectors to index")
+    parser.add_argument("--dimension", type=int, default=1536, help="Dimension of the synthetic vectors")
+    parser.add_argument("--embedding-cache", help="Use the vectors in this embedding cache instead")
+    parser.add_argument("--queries", type=int, default=200, help="Queries, held out from the vectors")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--dimensions", type=int, nargs="*", default=[512, 256],
+                        help="Reduced dimensions to compare besides the full one")
+    parser.add_argument("--ivf-lists", type=int, help="IVF partitions (default: 4 * sqrt(vectors))")
+    parser.add_argument("--probes", type=int, nargs="*", default=[4, 16], help="IVF partitions searched per query")
+    parser.add_argument("--output", help="Also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.embedding_cache:
+        vectors = cached_embeddings(args.embedding_cache)
+    else:
+        vectors = synthetic_embeddings(args.vectors + args.queries, args.dimension)
+    base, queries = vectors[:-args.queries], vectors[-args.queries:]
+
+    report = recall_report(base, queries, args.k, [None] + args.dimensions,
+                           ivf_lists=args.ivf_lists, probes=args.probes)
+    print(f"{len(base)} vectors, {len(queries)} queries, k={args.k}")
+    print(f"{'dim':>5} {'dtype':>8} {'ivf':>9} {'recall':>7} {'p50 ms':>7} {'p99 ms':>7} {'bytes':>6} {'x smaller':>9}")
+    for row in report:
+        ivf = f"{row['probes']}/{row['ivf_lists']}" if row["ivf_lists"] else "exact"
+        print(f"{row['dimension']:>5} {row['dtype']:>8} {ivf:>9} {row[f'recall_at_{args.k}']:>7.3f} "
+              f"{row['p50_ms']:>7.3f} {row['p99_ms']:>7.3f} {row['bytes_per_vector']:>6} {row['compression']:>9.1f}")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
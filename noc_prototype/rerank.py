@@ -0,0 +1,41 @@
+from typing import List, Optional, Sequence
+from .config import MMR_LAMBDA
+import numpy as np
+
+def mmr_select(relevance: Sequence[float], vectors: Sequence[Optional[Sequence[float]]],
+               k: int, lambda_mult: float = MMR_LAMBDA) -> List[int]:
+    """Pick k candidate positions by maximal marginal relevance.
+
+    Each step takes the candidate maximising
+    lambda * relevance - (1 - lambda) * max cosine similarity to those already
+    picked. Relevance is scaled so the best candidate scores 1. Candidates
+    without a vector are never penalised as redundant.
+    """
+    count = len(relevance)
+    if count <= 1 or k <= 0:
+        return list(range(min(count, max(k, 0))))
+
+    relevance = np.asarray(relevance, dtype=np.float32)
+    top = relevance.max()
+    if top > 0:
+        relevance = relevance / top
+
+    dimension = next((len(vector) for vector in vectors if vector is not None), 0)
+    matrix = np.zeros((count, dimension), dtype=np.float32)
+    for i, vector in enumerate(vectors):
+        if vector is not None:
+            matrix[i] = vector
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+    similarities = matrix @ matrix.T
+
+    selected = []
+    redundancy = np.zeros(count, dtype=np.float32)
+    available = np.ones(count, dtype=bool)
+    for _ in range(min(k, count)):
+        scores = np.where(available, lambda_mult * relevance - (1 - lambda_mult) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarities[best])
+    return selected
@@ -0,0 +1,204 @@
+"""
+Deterministic local stand-ins for the embedding model, vector store and LLM.
+
+Used by the benchmark and load-test tools so they run offline and repeatably;
+each stand-in can inject latency and a rate of failed calls to mimic the
+real service.
+"""
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Tuple
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from .lexical_index import tokenize
+from .tags import matches_filter
+import asyncio
+import hashlib
+import random
+import time
+import numpy as np
+
+class StandInServiceError(Exception):
+    """Injected failure, shaped like a client error carrying an HTTP status."""
+
+    def __init__(self, service: str, status_code: int = 503):
+        super().__init__(f"{service} unavailable (injected, status {status_code})")
+        self.status_code = status_code
+
+class _FailureInjector:
+    def __init__(self, service: str, error_rate: float = 0.0, seed: int = 0):
+        self.service = service
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+
+    def maybe_fail(self):
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise StandInServiceError(self.service)
+
+class StandInEmbeddings(Embeddings):
+    """Feature-hashed bag of words: similar texts get similar vectors, no network."""
+
+    def __init__(self, dimension: int = 256, latency: float = 0.0, error_rate: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+        self.failures = _FailureInjector("embeddings", error_rate)
+        self.calls = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for term in tokenize(text):
+            digest = hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        self.failures.maybe_fail()
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.failures.maybe_fail()
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+class StandInVectorStore:
+    """In-memory cosine index exposing the search methods ChatEngine uses."""
+
+    def __init__(self, embeddings: Embeddings, latency: float = 0.0, error_rate: float = 0.0):
+        self.embeddings = embeddings
+        self.latency = latency
+        self.failures = _FailureInjector("vector store", error_rate)
+        self.documents: List[Document] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self.search_calls = 0
+
+    def add_documents(self, documents: List[Document]):
+        vectors = self.embeddings.embed_documents([doc.page_content for doc in documents])
+        matrix = np.asarray(vectors, dtype=np.float32)
+        self._matrix = matrix if not len(self.documents) else np.vstack([self._matrix, matrix])
+        self.documents.extend(documents)
+
+    def similarity_search_by_vector_with_vectors(self, embedding: List[float], k: int = 4,
+                                                 **kwargs) -> List[Tuple[Document, float, List[float]]]:
+        self.search_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        self.failures.maybe_fail()
+        if not self.documents:
+            return []
+        scores = self._matrix @ np.asarray(embedding, dtype=np.float32)
+        if kwargs.get("filter"):
+            excluded = [not matches_filter(doc.metadata, kwargs["filter"]) for doc in self.documents]
+            scores[np.asarray(excluded)] = -np.inf
+        top = [i for i in np.argsort(-scores)[:k] if scores[i] != -np.inf]
+        return [
+            (Document(page_content=self.documents[i].page_content, metadata=dict(self.documents[i].metadata)),
+             float(scores[i]), self._matrix[i].tolist())
+            for i in top
+        ]
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4, **kwargs) -> List[Tuple[Document, float]]:
+        return [(doc, score) for doc, score, _ in self.similarity_search_by_vector_with_vectors(embedding, k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embeddings.embed_query(query), k, **kwargs)
+
+class StandInLLM:
+    """Chat model stand-in with a fixed time to first token and per-token delay."""
+
+    def __init__(self, first_token_latency: float = 0.0, token_latency: float = 0.0, answer_tokens: int = 60,
+                 error_rate: float = 0.0):
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.answer_tokens = answer_tokens
+        self.failures = _FailureInjector("llm", error_rate)
+        self.calls = 0
+
+    def bind(self, **kwargs) -> "StandInLLM":
+        return self
+
+    def _answer(self, prompt: str) -> List[str]:
+        if prompt.rstrip().endswith("Standalone question:"):
+            # Condensing step: echo the follow-up question
+            return prompt.rsplit("Follow-up question:", 1)[-1].replace("Standalone question:", "").split()
+        words = prompt.rsplit("Context:", 1)[-1].split()
+        return ["**Topic**:"] + words[:self.answer_tokens]
+
+    def invoke(self, prompt: str):
+        from langchain_core.messages import AIMessage
+        self.calls += 1
+        tokens = self._answer(prompt)
+        time.sleep(self.first_token_latency + self.token_latency * len(tokens))
+        self.failures.maybe_fail()
+        return AIMessage(content=" ".join(tokens))
+
+    async def ainvoke(self, prompt: str):
+        from langchain_core.messages import AIMessage
+        self.calls += 1
+        tokens = self._answer(prompt)
+        await asyncio.sleep(self.first_token_latency + self.token_latency * len(tokens))
+        self.failures.maybe_fail()
+        return AIMessage(content=" ".join(tokens))
+
+    def stream(self, prompt: str) -> Iterator:
+        from langchain_core.messages import AIMessageChunk
+        self.calls += 1
+        time.sleep(self.first_token_latency)
+        self.failures.maybe_fail()
+        for token in self._answer(prompt):
+            time.sleep(self.token_latency)
+            yield AIMessageChunk(content=token + " ")
+
+    async def astream(self, prompt: str) -> AsyncIterator:
+        from langchain_core.messages import AIMessageChunk
+        self.calls += 1
+        await asyncio.sleep(self.first_token_latency)
+        self.failures.maybe_fail()
+        for token in self._answer(prompt):
+            await asyncio.sleep(self.token_latency)
+            yield AIMessageChunk(content=token + " ")
+
+TOPICS = [
+    "premium club voucher", "sms verification", "escalation contacts", "billing reconciliation",
+    "gateway timeout", "payment provider outage", "shop exchange points", "test accounts",
+]
+WORDS = (
+    "check the dashboard before restarting the service and confirm the alert with the on call "
+    "engineer then record the incident in the tracker and notify the account team if customers "
+    "are affected verify the voucher status in the admin panel and retry the request"
+).split()
+
+def synthetic_corpus(documents: int = 20, pages: int = 10, words_per_page: int = 400,
+                     seed: int = 0) -> Iterator[Dict]:
+    """Processed-JSON documents of NOC-like text, the same for a given seed."""
+    rng = random.Random(seed)
+    for d in range(documents):
+        topic = TOPICS[d % len(TOPICS)]
+        content = []
+        for p in range(pages):
+            words = []
+            while len(words) < words_per_page:
+                words.extend(rng.choice(WORDS) for _ in range(rng.randint(8, 20)))
+                words.extend(topic.split())
+                words.append(f"ERR-{rng.randint(100, 599)}.")
+            content.append({"type": "Text", "page_number": p, "text": " ".join(words[:words_per_page])})
+        yield {
+            "metadata": {"source": f"data/runbook_{d:03d}.pdf", "filename": f"runbook_{d:03d}.pdf"},
+            "content": content
+        }
+
+def synthetic_queries(count: int, seed: int = 1) -> Iterable[str]:
+    """Questions over the synthetic corpus; all distinct so no answer is cached."""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield f"how do I handle {rng.choice(TOPICS)} ERR-{rng.randint(100, 599)} case {i}"
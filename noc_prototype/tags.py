@@ -0,0 +1,103 @@
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+from .config import PRODUCT_AREA_KEYWORDS, DOCUMENT_TYPE_KEYWORDS, DEFAULT_TAG
+import json
+import re
+
+# Tags copied from a processed document's metadata onto each of its chunks
+TAG_FIELDS = ("product_area", "document_type", "last_modified")
+
+# Metadata filters use the Mongo-style syntax that Pinecone and Chroma both
+# accept, e.g. {"$and": [{"product_area": {"$eq": "sms"}}, {"page": {"$lte": 3}}]}
+Filter = Dict[str, Any]
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+def _match_keywords(text: str, rules: Dict[str, Iterable[str]]) -> Optional[str]:
+    text = text.lower()
+    for tag, keywords in rules.items():
+        if any(re.search(rf"\b{re.escape(keyword)}\b", text) for keyword in keywords):
+            return tag
+    return None
+
+def tag_document(source: str, first_page: str = "", data_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Product area, document type and last-modified time of a PDF."""
+    path = Path(source)
+    name = path.stem.replace("_", " ").replace("-", " ")
+
+    area = None
+    if data_dir is not None:
+        try:
+            relative = path.relative_to(data_dir)
+        except ValueError:
+            relative = None
+        if relative is not None and len(relative.parts) > 1:
+            area = _slug(relative.parts[0])
+
+    tags = {
+        "product_area": area or _match_keywords(f"{name}\n{first_page}", PRODUCT_AREA_KEYWORDS) or DEFAULT_TAG,
+        # The filename says more about the kind of document than its body does
+        "document_type": (_match_keywords(name, DOCUMENT_TYPE_KEYWORDS)
+                          or _match_keywords(first_page, DOCUMENT_TYPE_KEYWORDS) or DEFAULT_TAG),
+    }
+    if path.exists():
+        tags["last_modified"] = int(path.stat().st_mtime)
+    return tags
+
+def build_filter(product_area: Union[str, Iterable[str], None] = None,
+                 document_type: Union[str, Iterable[str], None] = None,
+                 modified_since: Optional[float] = None,
+                 pages: Optional[Tuple[int, int]] = None) -> Optional[Filter]:
+    """Metadata filter for retrieval; None when nothing restricts the search."""
+    conditions = []
+    for field, value in (("product_area", product_area), ("document_type", document_type)):
+        if value is None:
+            continue
+        if isinstance(value, str):
+            conditions.append({field: {"$eq": value}})
+        elif value:
+            conditions.append({field: {"$in": list(value)}})
+    if modified_since is not None:
+        conditions.append({"last_modified": {"$gte": int(modified_since)}})
+    if pages is not None:
+        conditions.append({"page": {"$gte": pages[0]}})
+        conditions.append({"page": {"$lte": pages[1]}})
+
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+_OPERATORS = {
+    "$eq": lambda value, arg: value == arg,
+    "$ne": lambda value, arg: value != arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+}
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[Filter]) -> bool:
+    """Evaluate a metadata filter locally, for in-memory indexes."""
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, part) for part in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, part) for part in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            if not all(_OPERATORS[op](value, arg) for op, arg in condition.items()):
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+def filter_key(filter: Optional[Filter]) -> str:
+    """Canonical text of a filter, for keying requests by it."""
+    return json.dumps(filter, sort_keys=True) if filter else ""
@@ -1,16 +1,83 @@
 from pathlib import Path
-from typing import List
-from langchain.schema import Document
+from typing import AsyncIterator, Awaitable, Iterator, List, TypeVar
+from langchain_core.documents import Document
+from functools import lru_cache
+from .config import INDEX_VERSION_PATH, TOKEN_ENCODING
+import asyncio
+import threading
+import uuid
+
+T = TypeVar("T")
 
 def format_source_documents(source_documents: List[Document]) -> str:
     """Format source documents for display."""
     sources = []
     for doc in source_documents:
-        if hasattr(doc.metadata, 'source'):
+        if 'source' in doc.metadata:
             source = Path(doc.metadata['source']).name
-            page = doc.metadata.get('page', 1)
+            page = doc.metadata.get('page', 0) + 1  # Pages are stored zero-based
             sources.append(f"- {source} (Page {page})")
     
     if sources:
-        return "\n".join(["Sources:"] + list(set(sources)))
-    return "No source documents found." 
\ No newline at end of file
+        return "\n".join(["Sources:"] + list(dict.fromkeys(sources)))
+    return "No source documents found." 
+
+def get_index_version() -> str:
+    """Return the version of the current vector index, written at ingestion."""
+    try:
+        return Path(INDEX_VERSION_PATH).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return "0"
+
+def bump_index_version() -> str:
+    """Record that the index contents changed so cached answers are dropped."""
+    version = uuid.uuid4().hex
+    path = Path(INDEX_VERSION_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(version, encoding="utf-8")
+    return version
+
+@lru_cache(maxsize=None)
+def get_token_encoding():
+    """Return the tokenizer used to measure chunks and prompts, loaded on first use."""
+    import tiktoken
+    return tiktoken.get_encoding(TOKEN_ENCODING)
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in text."""
+    return len(get_token_encoding().encode(text, disallowed_special=()))
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Process-wide event loop on a daemon thread that runs the async query path.
+
+    Keeping one loop for the life of the process lets async HTTP clients reuse
+    their connections across calls from any thread.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="noc-event-loop", daemon=True).start()
+    return _loop
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """Run a coroutine on the shared loop and block until it finishes."""
+    loop = get_event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("run_sync called from the shared event loop; await the async API instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+def iterate_sync(agen: AsyncIterator[T]) -> Iterator[T]:
+    """Consume an async iterator from synchronous code, one item at a time."""
+    while True:
+        try:
+            yield run_sync(agen.__anext__())
+        except StopAsyncIteration:
+            return
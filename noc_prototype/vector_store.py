@@ -1,92 +1,411 @@
-from pinecone import Pinecone  # For Pinecone V3 client
-from langchain_community.vectorstores.pinecone import Pinecone as LangchainPinecone  # For LangChain integration
-from langchain_openai import OpenAIEmbeddings
-from .document_loader import load_processed_documents
-from langchain.schema import Document
-import pinecone
+from .embeddings import get_embeddings
+from .document_loader import (
+    DocumentLoader, extract_pdfs, iter_processed_documents
+)
+from .corpus import CorpusStore
+from .manifest import IndexManifest, discard_manifest, hash_chunk, hash_file
+from .ingest import IngestionPipeline, discard_checkpoint
+from .lexical_index import BM25Index, discard_lexical_index
+from .quantized_index import QuantizedIndex
+from .tags import Filter
+from pathlib import Path
+from .config import (
+    VECTOR_STORE_BACKEND, CHROMA_PERSIST_DIR, CHROMA_COLLECTION_NAME,
+    INDEX_MANIFEST_PATH, LEXICAL_INDEX_PATH, EMBEDDING_DIMENSIONS,
+    QUANTIZED_INDEX_DIR, QUANTIZED_DTYPE, IVF_LISTS
+)
+from .utils import bump_index_version
+from langchain_core.documents import Document
+from functools import lru_cache
 import os
-import streamlit as st
 import logging
-from typing import Optional
-import requests
+from typing import Dict, Optional, List, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Client libraries for each backend are imported on first use so that CLI
+# jobs and the other backend don't pay for them
+
+@lru_cache(maxsize=None)
+def local_chroma_class():
+    """Return the LocalChroma class, importing chromadb's integration on first use."""
+    from langchain_community.vectorstores.chroma import Chroma
+
+    class LocalChroma(Chroma):
+        """Chroma store that reports cosine similarity like Pinecone does.
+
+        Chroma returns distances (lower is better); the chat engine filters on
+        similarity (higher is better), so scores are converted here.
+        """
+
+        def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> List[Tuple[Document, float]]:
+            return [
+                (doc, 1.0 - distance)
+                for doc, distance in super().similarity_search_with_score(query, k=k, **kwargs)
+            ]
+
+        def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4, **kwargs) -> List[Tuple[Document, float]]:
+            return [
+                (doc, 1.0 - distance)
+                for doc, distance in self.similarity_search_by_vector_with_relevance_scores(embedding, k=k, **kwargs)
+            ]
+
+        def _select_relevance_score_fn(self):
+            # Scores are already similarities
+            return lambda score: score
+
+        def similarity_search_by_vector_with_vectors(self, embedding: List[float], k: int = 4, **kwargs) -> List[Tuple[Document, float, List[float]]]:
+            """Like similarity_search_by_vector_with_score, plus each match's stored vector."""
+            results = self._collection.query(
+                query_embeddings=[embedding],
+                n_results=k,
+                where=kwargs.get("filter"),
+                include=["documents", "metadatas", "distances", "embeddings"]
+            )
+            return [
+                (Document(page_content=text, metadata=metadata or {}), 1.0 - distance, vector)
+                for text, metadata, distance, vector in zip(
+                    results["documents"][0], results["metadatas"][0],
+                    results["distances"][0], results["embeddings"][0]
+                )
+            ]
+
+    return LocalChroma
+
+@lru_cache(maxsize=None)
+def pinecone_store_class():
+    """Return the PineconeStore class, importing LangChain's integration on first use."""
+    from langchain_community.vectorstores.pinecone import Pinecone as LangchainPinecone
+
+    class PineconeStore(LangchainPinecone):
+        """LangChain Pinecone store that can also return the matched vectors."""
+
+        def similarity_search_by_vector_with_vectors(self, embedding: List[float], k: int = 4, **kwargs) -> List[Tuple[Document, float, List[float]]]:
+            """Like similarity_search_by_vector_with_score, plus each match's stored vector."""
+            results = self._index.query(
+                vector=[embedding],
+                top_k=k,
+                include_metadata=True,
+                include_values=True,
+                namespace=kwargs.get("namespace") or self._namespace,
+                filter=kwargs.get("filter")
+            )
+            matches = []
+            for res in results["matches"]:
+                metadata = dict(res["metadata"])
+                if self._text_key not in metadata:
+                    logger.warning(f"Found document with no `{self._text_key}` key. Skipping.")
+                    continue
+                text = metadata.pop(self._text_key)
+                matches.append((Document(page_content=text, metadata=metadata), res["score"], res["values"]))
+            return matches
+
+    return PineconeStore
+
+class VectorStoreBackend:
+    """Interface for the index that stores document embeddings."""
+
+    name = None
+
+    def __init__(self, embeddings=None):
+        self.embeddings = embeddings
+
+    def from_documents(self, documents: List[Document], ids: Optional[List[str]] = None):
+        """Index documents and return a LangChain vector store."""
+        raise NotImplementedError
+
+    def load(self):
+        """Return a LangChain vector store over the existing index."""
+        raise NotImplementedError
+
+    def upsert_vectors(self, ids: List[str], vectors: List[List[float]], documents: List[Document]):
+        """Add or replace precomputed embeddings and their documents under the given IDs."""
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]):
+        """Remove the vectors with the given IDs."""
+        self.load().delete(ids=ids)
+
+    def verify(self) -> int:
+        """Log a sample of the index and return the number of vectors."""
+        raise NotImplementedError
+
+    def delete_all(self):
+        """Remove every vector from the index."""
+        raise NotImplementedError
+
+    @property
+    def scope(self) -> str:
+        """Identifies the index written to, for ingest checkpoints."""
+        return self.name
+
+    def finish_ingestion(self):
+        """Called after documents have been (re)indexed."""
+        pass
+
+class PineconeBackend(VectorStoreBackend):
+    """Hosted Pinecone index."""
+
+    name = "pinecone"
+
+    def __init__(self, embeddings=None):
+        super().__init__(embeddings)
+        from pinecone import Pinecone  # For Pinecone V3 client
+        
+        # Initialize Pinecone (new style)
+        self.pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        self.index_name = os.getenv("PINECONE_INDEX_NAME")
+        self.index = self.pc.Index(self.index_name)
+
+    def from_documents(self, documents: List[Document], ids: Optional[List[str]] = None):
+        # Create vector store using LangChain's Pinecone integration
+        return pinecone_store_class().from_documents(
+            documents=documents,
+            embedding=self.embeddings,
+            ids=ids,
+            index_name=self.index_name  # Use stored name directly
+        )
+
+    def load(self):
+        return pinecone_store_class().from_existing_index(
+            index_name=self.index_name,  # Use stored name directly
+            embedding=self.embeddings
+        )
+
+    def verify(self) -> int:
+        # Get index statistics
+        stats = self.index.describe_index_stats()
+        logger.info(f"Index stats: {stats}")
+        
+        # Query for a few random documents to verify content
+        # Using a simple query that should match most documents
+        results = self.index.query(
+            vector=[0]*EMBEDDING_DIMENSIONS,  # Dummy vector to get random docs
+            top_k=5,
+            include_metadata=True
+        )
+        
+        logger.info("Sample documents in index:")
+        for match in results['matches']:
+            logger.info(f"ID: {match['id']}")
+            logger.info(f"Score: {match['score']}")
+            logger.info(f"Metadata: {match['metadata']}")
+            
+        return stats['total_vector_count']
+
+    def upsert_vectors(self, ids: List[str], vectors: List[List[float]], documents: List[Document]):
+        # Same layout as LangChain's integration: chunk text lives in the metadata
+        self.index.upsert(vectors=[
+            {"id": vector_id, "values": vector, "metadata": {**doc.metadata, "text": doc.page_content}}
+            for vector_id, vector, doc in zip(ids, vectors, documents)
+        ])
+
+    def delete_all(self):
+        self.index.delete(delete_all=True)
+
+    @property
+    def scope(self) -> str:
+        return f"{self.name}:{self.index_name}"
+
+class ChromaBackend(VectorStoreBackend):
+    """Local persistent Chroma index in CHROMA_PERSIST_DIR; no network needed for search."""
+
+    name = "chroma"
+
+    def __init__(self, embeddings=None, persist_directory: str = CHROMA_PERSIST_DIR,
+                 collection_name: str = CHROMA_COLLECTION_NAME):
+        super().__init__(embeddings)
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        # Cosine space so scores line up with the Pinecone index
+        self.collection_metadata = {"hnsw:space": "cosine"}
+        self._store = None
+
+    def _collection(self):
+        # Reuse one client across ingestion batches
+        if self._store is None:
+            self._store = self.load()
+        return self._store._collection
+
+    def from_documents(self, documents: List[Document], ids: Optional[List[str]] = None):
+        return local_chroma_class().from_documents(
+            documents=documents,
+            embedding=self.embeddings,
+            ids=ids,
+            collection_name=self.collection_name,
+            persist_directory=self.persist_directory,
+            collection_metadata=self.collection_metadata
+        )
+
+    def load(self):
+        return local_chroma_class()(
+            collection_name=self.collection_name,
+            embedding_function=self.embeddings,
+            persist_directory=self.persist_directory,
+            collection_metadata=self.collection_metadata
+        )
+
+    def verify(self) -> int:
+        collection = self.load()._collection
+        count = collection.count()
+        logger.info(f"Collection {self.collection_name} holds {count} vectors")
+        
+        sample = collection.peek(limit=5)
+        logger.info("Sample documents in collection:")
+        for doc_id, metadata in zip(sample["ids"], sample["metadatas"]):
+            logger.info(f"ID: {doc_id}")
+            logger.info(f"Metadata: {metadata}")
+            
+        return count
+
+    def upsert_vectors(self, ids: List[str], vectors: List[List[float]], documents: List[Document]):
+        self._collection().upsert(
+            ids=ids,
+            embeddings=vectors,
+            metadatas=[doc.metadata for doc in documents],
+            documents=[doc.page_content for doc in documents]
+        )
+
+    def delete_all(self):
+        self.load().delete_collection()
+        self._store = None
+
+    @property
+    def scope(self) -> str:
+        return f"{self.name}:{os.path.abspath(self.persist_directory)}:{self.collection_name}"
+
+class QuantizedBackend(VectorStoreBackend):
+    """Local memory-mapped index of float16 or int8 vectors in QUANTIZED_INDEX_DIR."""
+
+    name = "quantized"
+
+    def __init__(self, embeddings=None, directory: str = QUANTIZED_INDEX_DIR, dtype: str = QUANTIZED_DTYPE):
+        super().__init__(embeddings)
+        self.directory = directory
+        self.dtype = dtype
+        self._store = None
+
+    def from_documents(self, documents: List[Document], ids: Optional[List[str]] = None):
+        ids = ids or [str(i) for i in range(len(documents))]
+        vectors = self.embeddings.embed_documents([doc.page_content for doc in documents])
+        self.upsert_vectors(ids, vectors, documents)
+        return self.load()
+
+    def load(self):
+        # One mapping per process, shared by ingestion batches and searches
+        if self._store is None:
+            self._store = QuantizedIndex(self.directory, self.dtype, self.embeddings)
+        return self._store
+
+    def verify(self) -> int:
+        index = self.load()
+        count = len(index)
+        logger.info(
+            f"Quantized index holds {count} {index.dtype} vectors of {index.dimension} dimensions "
+            f"({count * index.vector_bytes / 1e6:.1f} MB)"
+        )
+        return count
+
+    def upsert_vectors(self, ids: List[str], vectors: List[List[float]], documents: List[Document]):
+        self.load().upsert(ids, vectors, documents)
+
+    def delete_all(self):
+        self.load().clear()
+
+    @property
+    def scope(self) -> str:
+        return f"{self.name}:{os.path.abspath(self.directory)}:{self.dtype}"
+
+    def finish_ingestion(self):
+        if IVF_LISTS:
+            self.load().train_ivf(IVF_LISTS)
+
+BACKENDS = {
+    PineconeBackend.name: PineconeBackend,
+    ChromaBackend.name: ChromaBackend,
+    QuantizedBackend.name: QuantizedBackend,
+}
+
+def get_backend(name: Optional[str] = None, embeddings=None) -> VectorStoreBackend:
+    """Return the configured vector store backend."""
+    name = (name or VECTOR_STORE_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown vector store backend '{name}'. Expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name](embeddings=embeddings)
+
 class VectorStore:
-    def __init__(self):
-        """Initialize vector store with OpenAI embeddings and Pinecone."""
+    def __init__(self, backend: Optional[str] = None):
+        """Initialize vector store with OpenAI embeddings and the configured backend."""
         try:
             # Get API keys
             openai_api_key = os.getenv("OPENAI_API_KEY")
             if not openai_api_key:
                 raise ValueError("OPENAI_API_KEY not found in environment variables")
             
-            # Initialize OpenAI embeddings with explicit key
-            self.embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
+            # Initialize cached OpenAI embeddings with explicit key
+            self.embeddings = get_embeddings(openai_api_key)
             
-            # Initialize Pinecone (new style)
-            self.pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-            self.index_name = os.getenv("PINECONE_INDEX_NAME")
-            self.index = self.pc.Index(self.index_name)
+            # Pinecone, local Chroma or the local quantized index, chosen through config
+            self.backend = get_backend(backend, self.embeddings)
             
         except Exception as e:
             logger.error(f"Error initializing vector store: {str(e)}")
             raise
 
     def _convert_json_to_documents(self, json_docs):
-        """Convert JSON documents to LangChain Document format."""
-        documents = []
-        for doc in json_docs:
-            # Combine all content into a single text
-            text = "\n".join(item["text"] for item in doc["content"])
-            
-            # Create LangChain Document
-            document = Document(
-                page_content=text,
-                metadata={
-                    "source": doc["metadata"]["source"],
-                    "filename": doc["metadata"]["filename"]
-                }
-            )
-            documents.append(document)
-        return documents
+        """Convert JSON documents to token-bounded LangChain chunks with page metadata."""
+        return DocumentLoader()._convert_json_to_documents(json_docs)
 
-    def create_vector_store(self):
-        """Create and return a Pinecone vector store from processed documents."""
+    def create_vector_store(self, processed_dir: str = "processed_data",
+                            lexical_index_path: str = LEXICAL_INDEX_PATH):
+        """Create and return the vector store from processed documents.
+
+        Documents stream through load, clean, chunk, embed and upsert as lazy
+        iterators, so only a bounded number of batches is held at a time.
+        """
         try:
-            # Load processed JSON documents
-            json_docs = load_processed_documents()
-            logger.info(f"Loaded {len(json_docs)} JSON documents")
-            
-            # Convert to LangChain format
-            documents = self._convert_json_to_documents(json_docs)
-            logger.info(f"Converted {len(documents)} documents")
-            
-            # Create vector store using LangChain's Pinecone integration
-            return LangchainPinecone.from_documents(
-                documents=documents,
-                embedding=self.embeddings,
-                index_name=self.index_name  # Use stored name directly
-            )
+            lexical_index = BM25Index()
+            
+            def indexed(chunks):
+                # Lexical index over the same chunks for hybrid retrieval
+                for chunk in chunks:
+                    lexical_index.add_documents([chunk])
+                    yield chunk
+            
+            # Directories written before the corpus store hold one JSON per PDF
+            CorpusStore(processed_dir).import_json_files()
+            chunks = DocumentLoader().iter_chunks(iter_processed_documents(processed_dir))
+            
+            # Batched, concurrent and resumable embedding and upsert
+            result = IngestionPipeline(self.backend).run(indexed(chunks))
+            self.backend.finish_ingestion()
+            logger.info(f"Indexed {result['upserted'] + result['resumed']} chunks")
+            store = self.backend.load()
+            lexical_index.save(lexical_index_path)
+            
+            # Invalidate answers cached against the previous contents; the
+            # manifest no longer describes the index so update_index rebuilds
+            bump_index_version()
+            discard_manifest()
+            return store
             
         except Exception as e:
             logger.error(f"Error creating vector store: {str(e)}")
             raise
 
     def load_vector_store(self):
-        """Load and return the existing Pinecone vector store."""
-        return LangchainPinecone.from_existing_index(
-            index_name=self.index_name,  # Use stored name directly
-            embedding=self.embeddings
-        )
+        """Load and return the existing vector store for the configured backend."""
+        return self.backend.load()
 
-    def get_relevant_documents(self, query: str, score_threshold: float = 0.7):
-        """Get relevant documents with similarity scoring."""
+    def get_relevant_documents(self, query: str, score_threshold: float = 0.7,
+                               filter: Optional[Filter] = None):
+        """Get relevant documents with similarity scoring, optionally within a metadata filter."""
         try:
-            # Get documents with scores
-            docs_and_scores = self.index.similarity_search_with_score(
+            # Get documents with scores; the filter is applied by the backend
+            docs_and_scores = self.load_vector_store().similarity_search_with_score(
                 query=query,
-                k=4  # Fetch top 4 documents
+                k=4,  # Fetch top 4 documents
+                filter=filter
             )
             
             # Filter by score threshold
@@ -107,27 +426,9 @@ class VectorStore:
             raise
 
     def verify_index_content(self):
-        """Verify documents in Pinecone index."""
+        """Verify documents in the vector index."""
         try:
-            # Get index statistics
-            stats = self.index.describe_index_stats()
-            logger.info(f"Index stats: {stats}")
-            
-            # Query for a few random documents to verify content
-            # Using a simple query that should match most documents
-            results = self.index.query(
-                vector=[0]*1536,  # Dummy vector to get random docs
-                top_k=5,
-                include_metadata=True
-            )
-            
-            logger.info("Sample documents in index:")
-            for match in results['matches']:
-                logger.info(f"ID: {match['id']}")
-                logger.info(f"Score: {match['score']}")
-                logger.info(f"Metadata: {match['metadata']}")
-                
-            return stats['total_vector_count']
+            return self.backend.verify()
             
         except Exception as e:
             logger.error(f"Error verifying index: {str(e)}")
@@ -143,12 +444,8 @@ def migrate_to_pinecone():
     try:
         logger.info("Starting migration to Pinecone...")
         
-        # Load documents
-        documents = load_processed_documents()
-        logger.info(f"Loaded {len(documents)} documents")
-        
         # Create new vector store
-        vector_store = VectorStore()
+        vector_store = VectorStore(backend=PineconeBackend.name)
         pinecone_store = vector_store.create_vector_store()
         
         logger.info("Migration complete!")
@@ -158,9 +455,127 @@ def migrate_to_pinecone():
         logger.error(f"Error during migration: {str(e)}")
         raise
 
+def update_index(data_dir: str = "data", output_dir: str = "processed_data",
+                 backend: Optional[str] = None,
+                 manifest_path: str = INDEX_MANIFEST_PATH,
+                 lexical_index_path: str = LEXICAL_INDEX_PATH) -> Dict[str, int]:
+    """Incrementally sync the vector and lexical indexes with the PDFs in data_dir.
+
+    Only PDFs whose contents changed are re-extracted, only chunks that are
+    new or whose text or tags changed are embedded and upserted, and only chunks
+    that disappeared are deleted.
+    """
+    try:
+        vector_store = VectorStore(backend=backend)
+        manifest = IndexManifest.load(manifest_path)
+        
+        if manifest.backend != vector_store.backend.name:
+            # Nothing records what this index holds, so rebuild it from scratch
+            logger.info(f"No manifest for the {vector_store.backend.name} index, starting a full build")
+            vector_store.backend.delete_all()
+            discard_checkpoint()
+            manifest = IndexManifest(manifest.path, backend=vector_store.backend.name)
+        
+        loader = DocumentLoader()
+        corpus = CorpusStore(output_dir)
+        corpus.import_json_files()
+        
+        lexical_index = BM25Index.load(lexical_index_path) if manifest.sources else BM25Index()
+        if manifest.sources and not len(lexical_index):
+            # Index predates the lexical index; seed it from the processed corpus
+            logger.info("Building lexical index from processed documents")
+            lexical_index.add_documents(loader.iter_chunks(
+                corpus.get_document(source) for source in manifest.sources if source in corpus
+            ))
+        to_upsert = []
+        to_delete = []
+        seen_sources = set()
+        unchanged = 0
+        
+        changed = {}
+        for pdf_path in sorted(Path(data_dir).glob("**/*.pdf")):
+            source = str(pdf_path)
+            seen_sources.add(source)
+            stat = pdf_path.stat()
+            if manifest.is_unchanged(source, stat.st_mtime, stat.st_size):
+                unchanged += 1
+                continue
+            
+            file_hash = hash_file(pdf_path)
+            entry = manifest.sources.get(source)
+            if entry is not None and entry["sha256"] == file_hash:
+                # Touched but not modified
+                entry.update(mtime=stat.st_mtime, size=stat.st_size)
+                unchanged += 1
+                continue
+            
+            changed[pdf_path] = (file_hash, stat)
+        
+        logger.info(f"Re-indexing {len(changed)} changed documents...")
+        # Failed PDFs keep their old manifest entry and are retried next run
+        with corpus:
+            for pdf_path, json_content in extract_pdfs(list(changed), data_dir=data_dir):
+                if json_content is None:
+                    continue
+                source = str(pdf_path)
+                file_hash, stat = changed[pdf_path]
+                corpus.put(json_content)
+                
+                chunks = loader.split_json_document(json_content)
+                old_hashes = manifest.chunk_hashes(source)
+                new_hashes = {}
+                for chunk in chunks:
+                    chunk_id = chunk.metadata["chunk_id"]
+                    new_hashes[chunk_id] = hash_chunk(chunk)
+                    if old_hashes.get(chunk_id) != new_hashes[chunk_id]:
+                        to_upsert.append(chunk)
+                to_delete.extend(chunk_id for chunk_id in old_hashes if chunk_id not in new_hashes)
+                
+                manifest.sources[source] = {
+                    "sha256": file_hash,
+                    "mtime": stat.st_mtime,
+                    "size": stat.st_size,
+                    "chunks": new_hashes
+                }
+        
+            # Drop chunks of PDFs that were removed
+            for source in [source for source in manifest.sources if source not in seen_sources]:
+                logger.info(f"Removing deleted document {source}")
+                to_delete.extend(manifest.sources.pop(source)["chunks"])
+                corpus.remove(source)
+        
+        if to_delete:
+            vector_store.backend.delete(to_delete)
+        if to_upsert:
+            IngestionPipeline(vector_store.backend).run(to_upsert)
+        if to_upsert or to_delete:
+            vector_store.backend.finish_ingestion()
+        
+        lexical_index.remove(to_delete)
+        lexical_index.add_documents(to_upsert)
+        lexical_index.save(lexical_index_path)
+        
+        # Manifest is written only after the indexes have been updated
+        manifest.save()
+        if to_upsert or to_delete:
+            bump_index_version()
+        
+        summary = {
+            "upserted": len(to_upsert),
+            "deleted": len(to_delete),
+            "unchanged_documents": unchanged
+        }
+        logger.info(f"Index update complete: {summary}")
+        return summary
+        
+    except Exception as e:
+        logger.error(f"Error updating index: {str(e)}")
+        raise
+
 def test_pinecone_connection():
     """Test Pinecone connection and API key."""
     try:
+        from pinecone import Pinecone
         pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
         indexes = pc.list_indexes()
         logger.info(f"Available indexes: {indexes}")
@@ -171,6 +586,7 @@ def test_pinecone_connection():
 def create_pinecone_index():
     """Create the Pinecone index if it doesn't exist."""
     try:
+        from pinecone import Pinecone
         pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
         index_name = os.getenv("PINECONE_INDEX_NAME")
         
@@ -180,7 +596,7 @@ def create_pinecone_index():
             # Create the index
             pc.create_index(
                 name=index_name,
-                dimension=1536,  # OpenAI embedding dimensions
+                dimension=EMBEDDING_DIMENSIONS,
                 metric='cosine'
             )
             logger.info(f"Created new index: {index_name}")
@@ -194,6 +610,8 @@ def create_pinecone_index():
 def test_basic_connection():
     """Test basic HTTP connection to Pinecone."""
     try:
+        import requests
+        
         api_key = os.getenv("PINECONE_API_KEY")
         environment = os.getenv("PINECONE_ENVIRONMENT")
         
@@ -211,14 +629,15 @@ def test_basic_connection():
     except Exception as e:
         return False, f"Connection test failed: {str(e)}"
 
-def delete_all_vectors():
-    """Delete all vectors from the Pinecone index."""
+def delete_all_vectors(backend: Optional[str] = None):
+    """Delete all vectors from the configured vector index."""
     try:
-        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-        index = pc.Index(os.getenv("PINECONE_INDEX_NAME"))
-        
         # Delete all vectors
-        index.delete(delete_all=True)
+        get_backend(backend).delete_all()
+        discard_checkpoint()
+        bump_index_version()
+        discard_manifest()
+        discard_lexical_index()
         logger.info("Deleted all vectors from index")
         return True, "All vectors deleted successfully"
     except Exception as e:
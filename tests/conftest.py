@@ -1,4 +1,5 @@
 import pytest
+import re
 import json
 from pathlib import Path
 
@@ -19,4 +20,93 @@ def sample_document():
 
 @pytest.fixture
 def processed_docs_dir():
-    return Path("processed_data") 
\ No newline at end of file
+    return Path("processed_data") 
+
+KEYWORDS = ["premium", "club", "voucher", "sms", "verification"]
+
+
+class FakeEmbeddings:
+    """Keyword-count embeddings so related questions land close together."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        words = re.findall(r"\w+", text.lower())
+        return [float(words.count(keyword)) + 0.01 for keyword in KEYWORDS]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+class FakeVectorStore:
+    """Offline stand-in for the LangChain vector store used by ChatEngine."""
+
+    def __init__(self, docs_and_scores):
+        self.docs_and_scores = docs_and_scores
+        self.embeddings = FakeEmbeddings()
+        self.search_calls = 0
+        self.search_kwargs = []
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, **kwargs):
+        self.search_calls += 1
+        self.search_kwargs.append(kwargs)
+        return self.docs_and_scores[:k]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector_with_score(
+            self.embeddings.embed_query(query), k=k, **kwargs
+        )
+
+
+class FakeLLM:
+    """Offline stand-in for ChatOpenAI that records the prompts it receives."""
+
+    def __init__(self, answer="**Topic**: Premium Club voucher", condensed="premium club voucher shops"):
+        self.answer = answer
+        self.condensed = condensed
+        self.prompts = []
+
+    def bind(self, **kwargs):
+        return self
+
+    def invoke(self, prompt):
+        from langchain.schema import AIMessage
+        self.prompts.append(prompt)
+        if prompt.rstrip().endswith("Standalone question:"):
+            return AIMessage(content=self.condensed)
+        return AIMessage(content=self.answer)
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+    async def astream(self, prompt):
+        for chunk in self.stream(prompt):
+            yield chunk
+
+    def stream(self, prompt):
+        from langchain.schema.messages import AIMessageChunk
+        self.prompts.append(prompt)
+        for word in self.answer.split(" "):
+            yield AIMessageChunk(content=word + " ")
+
+
+@pytest.fixture
+def offline_chat_engine(monkeypatch, tmp_path):
+    """Build a ChatEngine wired to fakes so no network calls are made."""
+    from langchain.schema import Document
+    from noc_prototype import chat_engine as chat_engine_module
+    from noc_prototype import utils
+
+    monkeypatch.setattr(chat_engine_module, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(utils, "INDEX_VERSION_PATH", str(tmp_path / "index_version"))
+    monkeypatch.setattr(chat_engine_module, "LEXICAL_INDEX_PATH", str(tmp_path / "lexical_index.json"))
+    store = FakeVectorStore([
+        (Document(page_content="Premium club voucher steps", metadata={"source": "a.pdf"}), 0.82),
+        (Document(page_content="SMS verification toggle", metadata={"source": "b.pdf"}), 0.41),
+        (Document(page_content="Unrelated boilerplate", metadata={"source": "c.pdf"}), 0.05),
+    ])
+    engine = chat_engine_module.ChatEngine(store)
+    engine.llm = FakeLLM()
+    return engine
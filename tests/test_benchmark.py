@@ -0,0 +1,21 @@
+import json
+from noc_prototype.benchmark import find_regressions, main
+
+def test_benchmark_writes_results(tmp_path, monkeypatch):
+    from noc_prototype import utils
+    monkeypatch.setattr(utils, "INDEX_VERSION_PATH", str(tmp_path / "index_version"))
+    output = tmp_path / "results.json"
+    assert main(["--documents", "2", "--pages", "2", "--queries", "5", "--output", str(output)]) == 0
+    
+    results = json.loads(output.read_text(encoding="utf-8"))
+    benchmarks = results["benchmarks"]
+    assert set(benchmarks) == {"chunking", "load_processed_documents", "retrieval", "get_response"}
+    assert benchmarks["chunking"]["chunks"] > 0
+    assert benchmarks["retrieval"]["p99_ms"] >= benchmarks["retrieval"]["p50_ms"]
+    assert benchmarks["get_response"]["peak_alloc_max_kb"] > 0
+    assert results["parameters"]["queries"] == 5
+
+def test_regressions_respect_metric_direction():
+    baseline = {"benchmarks": {"retrieval": {"p99_ms": 10.0, "queries": 5}, "chunking": {"chunks_per_second": 100.0}}}
+    current = {"benchmarks": {"retrieval": {"p99_ms": 11.0, "queries": 50}, "chunking": {"chunks_per_second": 50.0}}}
+    assert find_regressions(current, baseline, tolerance=0.2) == ["chunking.chunks_per_second: 100.000 -> 50.000"]
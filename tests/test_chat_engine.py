@@ -18,4 +18,271 @@ def test_premium_club_retrieval(chat_engine):
 def test_document_retrieval_scores(chat_engine):
     results = chat_engine.test_retrieval("premium club voucher")
     for doc, score in results:
-        assert score >= 0.0 and score <= 1.0 
\ No newline at end of file
+        assert score >= 0.0 and score <= 1.0 
+
+def test_get_response_retrieves_once(offline_chat_engine):
+    response, docs = offline_chat_engine.get_response("premium club voucher")
+    assert offline_chat_engine.vector_store.search_calls == 1
+    assert [doc.metadata["source"] for doc in docs] == ["a.pdf", "b.pdf"]
+    assert docs[0].metadata["score"] == 0.82
+    # The prompt is built from exactly the documents returned as sources
+    prompt = offline_chat_engine.llm.prompts[0]
+    assert "Premium club voucher steps" in prompt
+    assert "Unrelated boilerplate" not in prompt
+
+def test_repeated_questions_hit_answer_cache(offline_chat_engine):
+    first, _ = offline_chat_engine.get_response("Premium club voucher?")
+    # Exact match after normalization, then a reworded question via embeddings
+    offline_chat_engine.get_response("premium  club voucher")
+    second, docs = offline_chat_engine.get_response("the premium club voucher please")
+    assert second == first
+    assert len(docs) == 2
+    assert len(offline_chat_engine.llm.prompts) == 1
+    stats = offline_chat_engine.answer_cache.stats()
+    assert stats["exact_hits"] == 1 and stats["semantic_hits"] == 1
+
+def test_answer_cache_invalidated_on_reindex(offline_chat_engine):
+    from noc_prototype.utils import bump_index_version
+    offline_chat_engine.get_response("premium club voucher")
+    bump_index_version()
+    offline_chat_engine.get_response("premium club voucher")
+    assert len(offline_chat_engine.llm.prompts) == 2
+
+def test_stream_response_returns_sources_before_tokens(offline_chat_engine):
+    docs, tokens = offline_chat_engine.stream_response("premium club voucher")
+    assert [doc.metadata["source"] for doc in docs] == ["a.pdf", "b.pdf"]
+    assert offline_chat_engine.llm.prompts == []  # Nothing generated until consumed
+    answer = "".join(tokens)
+    assert answer.strip() == offline_chat_engine.llm.answer
+    
+    # The streamed answer is cached like a regular one
+    cached_answer, cached_docs = offline_chat_engine.get_response("premium club voucher")
+    assert cached_answer == answer and cached_docs == docs
+
+def test_concurrent_async_sessions(offline_chat_engine):
+    import asyncio
+    
+    async def ask_all():
+        return await asyncio.gather(*[
+            offline_chat_engine.aget_response(f"premium club voucher {i}") for i in range(5)
+        ])
+    
+    results = asyncio.run(ask_all())
+    assert len(results) == 5
+    assert all(len(docs) == 2 for _, docs in results)
+
+def test_hybrid_retrieval_adds_lexical_matches(offline_chat_engine):
+    from langchain.schema import Document
+    from noc_prototype.lexical_index import BM25Index
+    
+    offline_chat_engine._lexical_index = BM25Index.from_documents([
+        Document(page_content="Premium club voucher steps", metadata={"chunk_id": "a", "source": "a.pdf"}),
+        Document(page_content="Gateway returns ERR-502 during voucher redemption", metadata={"chunk_id": "d", "source": "d.pdf"}),
+    ])
+    offline_chat_engine._reload_lexical = False
+    
+    _, docs = offline_chat_engine.get_response("voucher ERR-502")
+    sources = [doc.metadata["source"] for doc in docs]
+    # The error code is only found lexically; vector hits are kept alongside
+    assert "d.pdf" in sources and "a.pdf" in sources
+    assert docs[sources.index("d.pdf")].metadata["bm25_score"] > 0
+
+def test_retrieval_diversifies_near_duplicate_chunks(offline_chat_engine):
+    from langchain.schema import Document
+    
+    class VectorReturningStore(type(offline_chat_engine.vector_store)):
+        def similarity_search_by_vector_with_vectors(self, embedding, k=4, **kwargs):
+            self.search_calls += 1
+            return self.matches[:k]
+    
+    store = VectorReturningStore([])
+    copy = "Premium club voucher steps, repeated header"
+    store.matches = [
+        (Document(page_content=copy, metadata={"chunk_id": f"dup{i}"}), 0.9 - i * 0.01, [1.0, 0.0, 0.0])
+        for i in range(4)
+    ] + [
+        (Document(page_content="SMS verification toggle", metadata={"chunk_id": "sms"}), 0.6, [0.0, 1.0, 0.0]),
+        (Document(page_content="Voucher shops list", metadata={"chunk_id": "shops"}), 0.55, [0.0, 0.0, 1.0]),
+    ]
+    offline_chat_engine.vector_store = store
+    
+    docs = [doc.metadata["chunk_id"] for doc, _ in offline_chat_engine.retrieve("premium club voucher")]
+    assert store.search_calls == 1
+    assert len(docs) == 4
+    assert docs[0] == "dup0" and {"sms", "shops"} <= set(docs)
+
+def test_prompt_context_respects_token_budget(offline_chat_engine, monkeypatch):
+    from noc_prototype import chat_engine as chat_engine_module
+    from noc_prototype.utils import count_tokens
+    
+    monkeypatch.setattr(chat_engine_module, "CONTEXT_TOKEN_BUDGET", 60)
+    offline_chat_engine.vector_store.docs_and_scores[0][0].page_content = "Premium club voucher steps. " * 100
+    _, docs = offline_chat_engine.get_response("premium club voucher")
+    prompt = offline_chat_engine.llm.prompts[0]
+    context = prompt.split("Context: ")[1].split("\nQuestion:")[0]
+    assert count_tokens(context) <= 60
+    # The oversized first document used up the budget, so it is the only source
+    assert [doc.metadata["source"] for doc in docs] == ["a.pdf"]
+
+def test_follow_up_is_condensed_and_reuses_sources(offline_chat_engine):
+    from noc_prototype.memory import ConversationMemory
+    
+    memory = ConversationMemory()
+    offline_chat_engine.answer_cache.similarity_threshold = 1.1  # Exact hits only
+    offline_chat_engine.get_response("premium club voucher", memory=memory)
+    _, docs = offline_chat_engine.get_response("and where are the shops?", memory=memory)
+    
+    condense_prompt, answer_prompt = offline_chat_engine.llm.prompts[1:]
+    assert "User: premium club voucher" in condense_prompt
+    assert "Question: premium club voucher shops" in answer_prompt
+    # Same topic, so the previous turn's sources are reused without a search
+    assert offline_chat_engine.vector_store.search_calls == 1
+    assert [doc.metadata["source"] for doc in docs] == ["a.pdf", "b.pdf"]
+    assert [turn.standalone_question for turn in memory.turns] == ["premium club voucher", "premium club voucher shops"]
+
+def test_responses_record_stage_breakdown(offline_chat_engine):
+    from noc_prototype.metrics import REGISTRY
+    REGISTRY.reset()
+    offline_chat_engine.get_response("premium club voucher")
+    trace = REGISTRY.traces[-1]
+    assert trace["name"] == "get_response"
+    assert {"embed_query", "answer_cache", "vector_search", "context_pack", "llm"} <= set(trace["stages_ms"])
+    assert trace["counters"]["noc_prompt_tokens_total"] > 0
+    
+    # A streamed answer's trace stays open until the last token
+    docs, tokens = offline_chat_engine.stream_response("another premium club question")
+    assert len(REGISTRY.traces) == 1
+    "".join(tokens)
+    trace = REGISTRY.traces[-1]
+    assert trace["name"] == "stream_response"
+    assert {"llm_first_token", "llm"} <= set(trace["stages_ms"])
+    assert trace["counters"]["noc_completion_tokens_total"] > 0
+    assert 'noc_query_stage_seconds_count{stage="llm"} 2' in REGISTRY.to_prometheus()
+
+def test_identical_questions_in_flight_share_one_answer(offline_chat_engine):
+    import asyncio
+    
+    async def herd():
+        stream_docs, stream = await offline_chat_engine.astream_response("Premium club voucher?")
+        results = await asyncio.gather(*[
+            offline_chat_engine.aget_response("premium  club voucher") for _ in range(4)
+        ])
+        streamed = "".join([token async for token in stream])
+        return stream_docs, streamed, results
+    
+    stream_docs, streamed, results = asyncio.run(herd())
+    # One search and one LLM call, shared by the stream and every attached request
+    assert offline_chat_engine.vector_store.search_calls == 1
+    assert len(offline_chat_engine.llm.prompts) == 1
+    assert streamed.strip() == offline_chat_engine.llm.answer
+    assert all(answer == streamed and docs == stream_docs for answer, docs in results)
+    assert offline_chat_engine._in_flight == {}
+
+def test_every_coalesced_request_gets_the_shared_stages(offline_chat_engine):
+    import asyncio
+    from noc_prototype.metrics import REGISTRY
+    REGISTRY.reset()
+    
+    async def herd():
+        return await asyncio.gather(*[
+            offline_chat_engine.aget_response("premium club voucher") for _ in range(3)
+        ])
+    
+    asyncio.run(herd())
+    assert len(offline_chat_engine.llm.prompts) == 1
+    assert len(REGISTRY.traces) == 3
+    for trace in REGISTRY.traces:
+        assert {"vector_search", "llm"} <= set(trace["stages_ms"])
+        assert trace["counters"]["noc_prompt_tokens_total"] > 0
+    # The one LLM call is counted once in the registry
+    assert 'noc_query_stage_seconds_count{stage="llm"} 1' in REGISTRY.to_prometheus()
+
+def test_reused_conversation_sources_are_not_shared(offline_chat_engine):
+    import asyncio
+    from langchain.schema import Document
+    from noc_prototype.memory import ConversationMemory, Turn
+    
+    # The condensed follow-up is the same question another operator asks
+    standalone = offline_chat_engine.llm.condensed
+    private = [Document(page_content="Notes from this conversation only", metadata={"chunk_id": "private"})]
+    memory = ConversationMemory()
+    memory.add_turn(Turn("earlier", "earlier", "answer", private, offline_chat_engine.embed_query(standalone)))
+    
+    async def together():
+        return await asyncio.gather(
+            offline_chat_engine.aget_response("and the shops?", memory=memory),
+            offline_chat_engine.aget_response(standalone),
+        )
+    
+    (_, follow_up_docs), (_, other_docs) = asyncio.run(together())
+    assert follow_up_docs == private
+    assert other_docs and "private" not in {doc.metadata.get("chunk_id") for doc in other_docs}
+    # The follow-up's condense call, then an answer for each
+    assert len(offline_chat_engine.llm.prompts) == 3
+    # Only the answer from searched sources is cached for everyone
+    assert offline_chat_engine.answer_cache.get_exact(standalone).sources == other_docs
+
+def test_in_flight_failure_reaches_every_caller(offline_chat_engine):
+    import asyncio
+    
+    async def fail(prompt):
+        raise ConnectionError("LLM down")
+    offline_chat_engine.llm.ainvoke = fail
+    
+    async def herd():
+        return await asyncio.gather(*[
+            offline_chat_engine.aget_response("premium club voucher") for _ in range(3)
+        ], return_exceptions=True)
+    
+    results = asyncio.run(herd())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert offline_chat_engine._in_flight == {}
+    assert offline_chat_engine.answer_cache.get_exact("premium club voucher") is None
+
+def test_cancelled_producer_reaches_every_caller(offline_chat_engine):
+    import asyncio
+    from noc_prototype.chat_engine import _SharedAnswer
+    
+    async def hang(*args, **kwargs):
+        await asyncio.Event().wait()
+    offline_chat_engine._aprepare_prompt = hang
+    
+    async def herd():
+        callers = [
+            asyncio.ensure_future(offline_chat_engine.aget_response("premium club voucher")) for _ in range(2)
+        ]
+        await asyncio.sleep(0.05)
+        for producer in list(offline_chat_engine._producers):
+            producer.cancel()
+        return await asyncio.gather(*callers, return_exceptions=True)
+    
+    results = asyncio.run(herd())
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert offline_chat_engine._in_flight == {}
+    
+    async def finished_without_sources():
+        shared = _SharedAnswer()
+        await shared.finish()
+        await shared.wait_prepared()
+    
+    with pytest.raises(RuntimeError):
+        asyncio.run(finished_without_sources())
+
+def test_filter_is_pushed_down_and_bypasses_answer_cache(offline_chat_engine):
+    from langchain.schema import Document
+    from noc_prototype.lexical_index import BM25Index
+    from noc_prototype.tags import build_filter
+    
+    offline_chat_engine._lexical_index = BM25Index.from_documents([
+        Document(page_content="voucher refund steps", metadata={"chunk_id": "p", "source": "p.pdf", "product_area": "payments"}),
+        Document(page_content="voucher shops list", metadata={"chunk_id": "q", "source": "q.pdf", "product_area": "premium_club"}),
+    ])
+    offline_chat_engine._reload_lexical = False
+    
+    scope = build_filter(product_area="payments")
+    offline_chat_engine.get_response("premium club voucher")
+    _, docs = offline_chat_engine.get_response("premium club voucher", filter=scope)
+    assert offline_chat_engine.vector_store.search_kwargs == [{}, {"filter": scope}]
+    # The scoped question was searched again rather than answered from the cache
+    assert len(offline_chat_engine.llm.prompts) == 2
+    assert "q.pdf" not in [doc.metadata["source"] for doc in docs]
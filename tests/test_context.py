@@ -0,0 +1,48 @@
+from langchain.schema import Document
+from noc_prototype.context import pack_context
+from noc_prototype.utils import count_tokens
+
+PAGE = "Premium club vouchers are redeemed in the shop. " * 10 + "Escalate failures to the billing team. " * 10
+
+def _chunk(start, end, source="a.pdf"):
+    return Document(page_content=PAGE[start:end], metadata={"source": source, "page": 0, "offset": start})
+
+def test_overlapping_chunks_are_deduplicated():
+    first, second = _chunk(0, 600), _chunk(400, len(PAGE))
+    packed = pack_context([first, second], budget=10_000)
+    assert packed.documents == [first, second]
+    # Overlap is included once
+    assert packed.text.count(PAGE[400:600].strip()) == 1
+    assert packed.duplicate_tokens > 0
+    assert packed.saved_tokens > 0
+
+def test_fully_covered_and_repeated_chunks_are_dropped():
+    whole, inner = _chunk(0, len(PAGE)), _chunk(100, 300)
+    repeated = Document(page_content="Boilerplate footer", metadata={})
+    packed = pack_context([whole, inner, repeated, Document(page_content="Boilerplate footer")], budget=10_000)
+    assert packed.documents == [whole, repeated]
+
+def test_budget_is_filled_in_relevance_order():
+    docs = [
+        Document(page_content="premium club " * 80, metadata={"source": "a.pdf"}),
+        Document(page_content="sms verification " * 80, metadata={"source": "b.pdf"}),
+        Document(page_content="voucher shops " * 80, metadata={"source": "c.pdf"}),
+    ]
+    packed = pack_context(docs, budget=250)
+    assert packed.tokens <= 250
+    assert count_tokens(packed.text) <= 250
+    # The second document is truncated to fit; the third is left out
+    assert [doc.metadata["source"] for doc in packed.documents] == ["a.pdf", "b.pdf"]
+    assert packed.truncated_tokens > 0
+
+def test_float_and_missing_offsets():
+    # Pinecone returns numeric metadata as floats
+    first, second = _chunk(0, 600), _chunk(400, len(PAGE))
+    first.metadata["offset"], second.metadata["offset"] = 0.0, 400.0
+    packed = pack_context([first, second], budget=10_000)
+    assert packed.text.count(PAGE[400:600].strip()) == 1
+
+    # Non-numeric offsets fall back to exact-text dedup
+    odd = Document(page_content=PAGE[:100], metadata={"source": "a.pdf", "page": 0, "offset": "n/a"})
+    packed = pack_context([odd, odd], budget=10_000)
+    assert packed.documents == [odd]
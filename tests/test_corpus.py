@@ -0,0 +1,82 @@
+import json
+import pytest
+from noc_prototype.corpus import CorpusStore
+from noc_prototype.document_loader import load_processed_documents
+
+def _doc(source, *pages):
+    return {
+        "metadata": {"source": source, "filename": source.split("/")[-1]},
+        "content": [{"type": "Text", "page_number": i, "text": text} for i, text in enumerate(pages)]
+    }
+
+def test_random_access_round_trip(tmp_path):
+    with CorpusStore(str(tmp_path)) as corpus:
+        corpus.put(_doc("data/a.pdf", "premium club", "voucher shops"))
+        corpus.put(_doc("data/b.pdf", "sms verification – ünïcode"))
+    
+    corpus = CorpusStore(str(tmp_path))
+    assert corpus.sources() == ["data/a.pdf", "data/b.pdf"]
+    assert corpus.get_page("data/a.pdf", 1)["text"] == "voucher shops"
+    assert corpus.get_document("data/b.pdf") == _doc("data/b.pdf", "sms verification – ünïcode")
+    assert corpus.get_document("data/missing.pdf") is None
+
+def test_replacing_documents_compacts(tmp_path):
+    corpus = CorpusStore(str(tmp_path))
+    for version in range(5):
+        corpus.put(_doc("data/a.pdf", f"version {version}"))
+        # Reads still work while appends grow the file
+        assert corpus.get_page("data/a.pdf", 0)["text"] == f"version {version}"
+    corpus.put(_doc("data/b.pdf", "escalation"))
+    corpus.remove("data/b.pdf")
+    
+    reopened = CorpusStore(str(tmp_path))
+    assert [doc["content"][0]["text"] for doc in reopened.iter_documents()] == ["version 4"]
+    lines = reopened.data_path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) <= 2
+    assert sorted(path.name for path in tmp_path.iterdir()) == [reopened.data_path.name, "corpus.index.json"]
+
+def test_interrupted_compaction_keeps_previous_generation(tmp_path, monkeypatch):
+    corpus = CorpusStore(str(tmp_path))
+    corpus.put(_doc("data/a.pdf", "version 0"))
+    corpus.put(_doc("data/b.pdf", "escalation"))
+    corpus.remove("data/b.pdf")
+    
+    # Dies after writing the new data file but before the index names it
+    def crash(self):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(CorpusStore, "_write_index", crash)
+    with pytest.raises(KeyboardInterrupt):
+        corpus.compact()
+    monkeypatch.undo()
+    
+    reopened = CorpusStore(str(tmp_path))
+    assert reopened.get_page("data/a.pdf", 0)["text"] == "version 0"
+    reopened.compact()
+    assert CorpusStore(str(tmp_path)).get_page("data/a.pdf", 0)["text"] == "version 0"
+
+def test_legacy_json_files_are_imported_when_processing(tmp_path):
+    from noc_prototype.document_loader import process_directory_to_json
+    legacy = _doc("data/a.pdf", "premium club")
+    (tmp_path / "a.json").write_text(json.dumps(legacy, indent=2), encoding="utf-8")
+    
+    # Reading never changes the directory
+    assert load_processed_documents(str(tmp_path)) == []
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.json"]
+    
+    process_directory_to_json(str(tmp_path / "data"), str(tmp_path))
+    assert load_processed_documents(str(tmp_path)) == [legacy]
+    assert (tmp_path / "a.json.migrated").exists()
+
+def test_json_import_keeps_originals_and_skips_other_files(tmp_path):
+    legacy = _doc("data/a.pdf", "premium club")
+    (tmp_path / "a.json").write_text(json.dumps(legacy), encoding="utf-8")
+    (tmp_path / "settings.json").write_text(json.dumps({"theme": "dark"}), encoding="utf-8")
+    (tmp_path / "broken.json").write_text("{", encoding="utf-8")
+    
+    corpus = CorpusStore(str(tmp_path))
+    assert corpus.import_json_files() == 1
+    assert not corpus._batching
+    assert json.loads((tmp_path / "a.json.migrated").read_text(encoding="utf-8")) == legacy
+    assert (tmp_path / "settings.json").exists() and (tmp_path / "broken.json").exists()
+    assert corpus.import_json_files() == 0
+    assert CorpusStore(str(tmp_path)).sources() == ["data/a.pdf"]
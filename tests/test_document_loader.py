@@ -1,6 +1,6 @@
 import pytest
 from pathlib import Path
-from noc_prototype.document_loader import DocumentLoader, process_pdf_to_json
+from noc_prototype.document_loader import DocumentLoader, process_pdf_to_json, process_directory_to_json
 
 def test_document_loader_initialization():
     loader = DocumentLoader()
@@ -25,4 +25,37 @@ def test_json_document_conversion():
     loader = DocumentLoader()
     docs = loader._convert_json_to_documents([test_json])
     assert len(docs) == 1
-    assert docs[0].page_content == "Test content" 
\ No newline at end of file
+    assert docs[0].page_content == "Test content"
+
+def test_process_directory_isolates_bad_pdfs(tmp_path):
+    from pypdf import PdfWriter
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    writer = PdfWriter()
+    writer.add_blank_page(width=200, height=200)
+    with open(data_dir / "good.pdf", "wb") as f:
+        writer.write(f)
+    (data_dir / "broken.pdf").write_bytes(b"not a pdf")
+    
+    docs = process_directory_to_json(str(data_dir), str(tmp_path / "processed"), max_workers=2,
+                                     cache_path=str(tmp_path / "extraction.sqlite"))
+    assert [doc["metadata"]["filename"] for doc in docs] == ["good.pdf"]
+    assert not list((tmp_path / "processed").glob("good*.json"))
+    from noc_prototype.corpus import CorpusStore
+    assert [Path(source).name for source in CorpusStore(str(tmp_path / "processed")).sources()] == ["good.pdf"]
+
+def test_chunks_are_token_bounded_with_pages():
+    from noc_prototype.utils import count_tokens
+    test_json = {
+        "metadata": {"source": "data/runbook.pdf", "filename": "runbook.pdf"},
+        "content": [
+            {"type": "Text", "page_number": 0, "text": "Premium club voucher escalation. " * 60},
+            {"type": "Text", "page_number": 1, "text": "SMS verification toggle"}
+        ]
+    }
+    loader = DocumentLoader(chunk_size=50, chunk_overlap=10)
+    docs = loader._convert_json_to_documents([test_json])
+    assert len(docs) > 2
+    assert all(count_tokens(doc.page_content) <= 50 for doc in docs)
+    assert {doc.metadata["page"] for doc in docs} == {0, 1}
+    assert len({doc.metadata["chunk_id"] for doc in docs}) == len(docs)
@@ -0,0 +1,38 @@
+from langchain_core.embeddings import Embeddings
+from noc_prototype.embeddings import CachedEmbeddings, EmbeddingCache
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+def test_cache_skips_unchanged_texts(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    underlying = CountingEmbeddings()
+    embeddings = CachedEmbeddings(underlying, model="test-model", cache=EmbeddingCache(path))
+    first = embeddings.embed_documents(["premium club", "sms  verification", "premium club"])
+    assert underlying.embedded == ["premium club", "sms  verification"]
+    
+    # A fresh process over the same file makes no calls, even with reformatted text
+    underlying = CountingEmbeddings()
+    embeddings = CachedEmbeddings(underlying, model="test-model", cache=EmbeddingCache(path))
+    assert embeddings.embed_documents(["premium club", "sms verification\n"]) == first[:2]
+    assert embeddings.embed_query("premium club") == first[0]
+    assert underlying.embedded == []
+
+def test_cache_is_keyed_by_model():
+    assert EmbeddingCache.make_key("text", "model-a") != EmbeddingCache.make_key("text", "model-b")
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), max_entries=2)
+    cache.put_many({"a": [1.0]})
+    cache.put_many({"b": [2.0]})
+    cache.get_many(["a"])
+    cache.put_many({"c": [3.0]})
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
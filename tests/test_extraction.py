@@ -0,0 +1,109 @@
+import pytest
+from noc_prototype import extraction
+from noc_prototype.extraction import ExtractionCache, OCR, TEXT_LAYER, extract_pages, needs_ocr
+
+def write_pdf(path, pages):
+    """PDF with one page per entry: a line of text, or None for a blank (scan-like) page."""
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for text in pages:
+        page = writer.add_blank_page(width=300, height=200)
+        if text is None:
+            continue
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 12 Tf 20 100 Td ({text}) Tj ET".encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+    with open(path, "wb") as f:
+        writer.write(f)
+
+def test_needs_ocr():
+    assert not needs_ocr("Premium Club vouchers are issued within 24h (see SMS runbook).")
+    assert needs_ocr("")
+    assert needs_ocr("  12 \n")
+    assert needs_ocr("(cid:3)(cid:17)(cid:42)(cid:9)(cid:3)(cid:17)(cid:42)(cid:9) ab")
+    assert needs_ocr("��� voucher shops �������")
+
+def test_only_unusable_pages_are_ocred_and_results_are_cached(tmp_path, monkeypatch):
+    # OCR runs in child processes, so calls are counted in a file
+    ocr_calls = tmp_path / "ocr_calls"
+
+    def fake_ocr(pdf_bytes):
+        with open(ocr_calls, "a") as f:
+            f.write("call\n")
+        return "Scanned escalation matrix"
+
+    monkeypatch.setattr(extraction, "ocr_page", fake_ocr)
+    pdf_path = tmp_path / "runbook.pdf"
+    write_pdf(pdf_path, ["Premium Club voucher runbook page one", None, "SMS verification toggle steps"])
+    cache = ExtractionCache(str(tmp_path / "extraction.sqlite"))
+
+    pages = extract_pages(str(pdf_path), cache=cache)
+    assert [page["method"] for page in pages] == [TEXT_LAYER, OCR, TEXT_LAYER]
+    assert "voucher runbook" in pages[0]["text"]
+    assert pages[1]["text"] == "Scanned escalation matrix"
+    assert len(ocr_calls.read_text().splitlines()) == 1
+
+    # Unchanged pages come from the cache, even in an edited copy of the PDF
+    edited_path = tmp_path / "runbook-v2.pdf"
+    write_pdf(edited_path, ["Premium Club voucher runbook page one", None, "SMS verification is now disabled"])
+    pages = extract_pages(str(edited_path), cache=cache)
+    assert [page["method"] for page in pages] == [TEXT_LAYER, OCR, TEXT_LAYER]
+    assert "disabled" in pages[2]["text"]
+    assert len(ocr_calls.read_text().splitlines()) == 1
+
+def test_failed_ocr_keeps_text_layer_and_retries_later(tmp_path, monkeypatch):
+    def failing_ocr(pdf_bytes):
+        raise RuntimeError("tesseract is not installed")
+
+    monkeypatch.setattr(extraction, "ocr_page", failing_ocr)
+    pdf_path = tmp_path / "scan.pdf"
+    write_pdf(pdf_path, [None])
+    cache = ExtractionCache(str(tmp_path / "extraction.sqlite"))
+
+    assert extract_pages(str(pdf_path), cache=cache) == [{"page_number": 0, "text": "", "method": TEXT_LAYER}]
+
+    monkeypatch.setattr(extraction, "ocr_page", lambda pdf_bytes: "Scanned page")
+    assert extract_pages(str(pdf_path), cache=cache)[0]["method"] == OCR
+
+def test_timeout_stops_running_ocr(tmp_path, monkeypatch):
+    import multiprocessing
+    import signal
+    import time
+    from noc_prototype.document_loader import ExtractionTimeout, _raise_timeout
+    
+    finished = tmp_path / "finished"
+    
+    def slow_ocr(pdf_bytes):
+        time.sleep(2)
+        finished.write_text("OCR kept running")
+        return "Scanned page"
+    
+    monkeypatch.setattr(extraction, "ocr_page", slow_ocr)
+    pdf_path = tmp_path / "scan.pdf"
+    write_pdf(pdf_path, [None, None])
+    cache = ExtractionCache(str(tmp_path / "extraction.sqlite"))
+    
+    # The per-PDF alarm set by the extraction workers
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    start = time.perf_counter()
+    signal.alarm(1)
+    try:
+        with pytest.raises(ExtractionTimeout):
+            extract_pages(str(pdf_path), cache=cache)
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous)
+    assert time.perf_counter() - start < 2
+    assert multiprocessing.active_children() == []
+    time.sleep(2)
+    assert not finished.exists()
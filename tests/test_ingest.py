@@ -0,0 +1,119 @@
+import pytest
+from langchain.schema import Document
+from noc_prototype.ingest import IngestionPipeline
+
+class RateLimitError(Exception):
+    status_code = 429
+    headers = {"retry-after": "0.01"}
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[float(len(text))] for text in texts]
+
+class FakeBackend:
+    def __init__(self, fail_on=None, scope="fake:index"):
+        self.embeddings = FakeEmbeddings()
+        self.scope = scope
+        self.vectors = {}
+        self.calls = 0
+        self.fail_on = fail_on or {}
+
+    def upsert_vectors(self, ids, vectors, documents):
+        self.calls += 1
+        error = self.fail_on.pop(self.calls, None)
+        if error is not None:
+            raise error
+        self.vectors.update(zip(ids, vectors))
+
+    def delete_all(self):
+        self.vectors.clear()
+
+def make_chunks(n):
+    return [
+        Document(page_content=f"chunk {i}", metadata={"chunk_id": f"id-{i}"})
+        for i in range(n)
+    ]
+
+def test_pipeline_batches_and_retries_rate_limits(tmp_path):
+    backend = FakeBackend(fail_on={2: RateLimitError("429 Too Many Requests")})
+    pipeline = IngestionPipeline(
+        backend, embed_batch_size=4, upsert_batch_size=2, max_concurrency=1,
+        checkpoint_path=str(tmp_path / "checkpoint.json")
+    )
+    result = pipeline.run(make_chunks(10))
+    assert result["upserted"] == 10
+    assert len(backend.vectors) == 10
+    assert backend.calls == 6  # 5 upsert batches plus one retry
+    assert not (tmp_path / "checkpoint.json").exists()
+
+def test_pipeline_resumes_from_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.json")
+    backend = FakeBackend(fail_on={3: ValueError("bad vector")})
+    pipeline = IngestionPipeline(backend, embed_batch_size=4, max_concurrency=1, checkpoint_path=checkpoint)
+    with pytest.raises(ValueError):
+        pipeline.run(make_chunks(12))
+    
+    # Restarted run skips the two batches that were already upserted
+    backend = FakeBackend()
+    pipeline = IngestionPipeline(backend, embed_batch_size=4, max_concurrency=1, checkpoint_path=checkpoint)
+    result = pipeline.run(make_chunks(12))
+    assert result == {**result, "upserted": 4, "resumed": 8}
+    assert sorted(backend.vectors) == ["id-10", "id-11", "id-8", "id-9"]
+
+def test_checkpoint_does_not_skip_changed_content(tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.json")
+    backend = FakeBackend(fail_on={2: ValueError("bad vector")})
+    pipeline = IngestionPipeline(backend, embed_batch_size=4, max_concurrency=1, checkpoint_path=checkpoint)
+    with pytest.raises(ValueError):
+        pipeline.run(make_chunks(8))
+    
+    # Same chunk IDs, edited text: the leftover checkpoint must not apply
+    edited = [Document(page_content=f"edited {doc.page_content}", metadata=doc.metadata) for doc in make_chunks(8)]
+    backend = FakeBackend()
+    pipeline = IngestionPipeline(backend, embed_batch_size=4, max_concurrency=1, checkpoint_path=checkpoint)
+    assert pipeline.run(edited)["upserted"] == 8
+    assert len(backend.vectors) == 8
+
+def test_checkpoint_is_scoped_to_the_index_and_cleared_with_it(tmp_path, monkeypatch):
+    from noc_prototype import vector_store
+    monkeypatch.chdir(tmp_path)
+    backend = FakeBackend(fail_on={2: ValueError("bad vector")})
+    with pytest.raises(ValueError):
+        IngestionPipeline(backend, embed_batch_size=4, max_concurrency=1).run(make_chunks(8))
+    assert len(backend.vectors) == 4
+    
+    # A different index does not inherit the other one's progress
+    other = FakeBackend(scope="fake:other")
+    assert IngestionPipeline(other, embed_batch_size=4, max_concurrency=1).run(make_chunks(8))["upserted"] == 8
+    
+    backend.vectors.clear()
+    backend.fail_on = {backend.calls + 2: ValueError("bad vector")}
+    with pytest.raises(ValueError):
+        IngestionPipeline(backend, embed_batch_size=4, max_concurrency=1).run(make_chunks(8))
+    
+    # Deleting every vector drops the checkpoint, so the rerun writes all batches
+    monkeypatch.setattr(vector_store, "get_backend", lambda name: backend)
+    assert vector_store.delete_all_vectors()[0]
+    assert IngestionPipeline(backend, embed_batch_size=4, max_concurrency=1).run(make_chunks(8))["upserted"] == 8
+    assert len(backend.vectors) == 8
+
+def test_pipeline_pulls_chunks_lazily(tmp_path):
+    produced = []
+    
+    def chunks():
+        for chunk in make_chunks(40):
+            produced.append(chunk)
+            yield chunk
+    
+    class TrackingBackend(FakeBackend):
+        def upsert_vectors(self, ids, vectors, documents):
+            super().upsert_vectors(ids, vectors, documents)
+            self.max_in_flight = max(getattr(self, "max_in_flight", 0), len(produced) - len(self.vectors))
+    
+    backend = TrackingBackend()
+    pipeline = IngestionPipeline(
+        backend, embed_batch_size=4, max_concurrency=1, checkpoint_path=str(tmp_path / "checkpoint.json")
+    )
+    assert pipeline.run(chunks())["upserted"] == 40
+    # At most the queued batches plus the one being assembled are held at once
+    assert backend.max_in_flight <= 4 * 3
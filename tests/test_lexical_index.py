@@ -0,0 +1,39 @@
+from langchain.schema import Document
+from noc_prototype.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+def _chunk(chunk_id, text):
+    return Document(page_content=text, metadata={"chunk_id": chunk_id, "source": f"{chunk_id}.pdf"})
+
+def test_tokenize_keeps_codes_and_hostnames():
+    terms = tokenize("What is ERR-502 on noc01.example.com?")
+    assert "err-502" in terms and "502" in terms
+    assert "noc01.example.com" in terms
+    assert "what" not in terms
+
+def test_exact_tokens_rank_first():
+    index = BM25Index.from_documents([
+        _chunk("a", "Premium Club voucher redemption steps"),
+        _chunk("b", "Gateway returns ERR-502 when the SMS provider is down"),
+        _chunk("c", "Escalate voucher issues to the billing team"),
+    ])
+    results = index.search("why do we see 502 errors", k=2)
+    assert results[0][0].metadata["chunk_id"] == "b"
+    assert index.search("premium club")[0][0].metadata["chunk_id"] == "a"
+    assert index.search("kubernetes") == []
+
+def test_update_and_round_trip(tmp_path):
+    path = str(tmp_path / "lexical.json")
+    index = BM25Index.from_documents([_chunk("a", "premium club"), _chunk("b", "sms verification")])
+    index.add_documents([_chunk("a", "voucher shops")])
+    index.remove(["b"])
+    index.save(path)
+
+    loaded = BM25Index.load(path)
+    assert len(loaded) == 1
+    assert loaded.search("premium") == []
+    assert loaded.search("voucher")[0][0].metadata["source"] == "a.pdf"
+    assert len(BM25Index.load(str(tmp_path / "missing.json"))) == 0
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c"]])
+    assert [key for key, _ in fused] == ["b", "c", "a"]
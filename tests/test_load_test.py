@@ -0,0 +1,29 @@
+import json
+from noc_prototype.load_test import main, run_load_test
+
+def test_load_test_reports_concurrent_sessions(tmp_path, monkeypatch):
+    from noc_prototype import utils
+    monkeypatch.setattr(utils, "INDEX_VERSION_PATH", str(tmp_path / "index_version"))
+    report = run_load_test(sessions=4, turns=3, documents=2, pages=2, llm_latency=0.02)
+    assert report["requests"] == report["succeeded"] == 12
+    assert report["peak_in_flight"] > 1
+    assert report["latency"]["p99_ms"] >= report["latency"]["p50_ms"] >= 20
+    assert "llm" in {stage.get("stage") for stage in report["stages"]}
+
+def test_injected_errors_are_counted(tmp_path, monkeypatch):
+    from noc_prototype import utils
+    monkeypatch.setattr(utils, "INDEX_VERSION_PATH", str(tmp_path / "index_version"))
+    output = tmp_path / "load.json"
+    assert main(["--sessions", "2", "--turns", "2", "--documents", "2", "--pages", "2",
+                 "--llm-error-rate", "1.0", "--output", str(output)]) == 0
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert report["succeeded"] == 0
+    assert report["errors"] == {"StandInServiceError": 4}
+
+def test_session_memory_is_measured_while_sessions_are_live(tmp_path, monkeypatch):
+    from noc_prototype import utils
+    monkeypatch.setattr(utils, "INDEX_VERSION_PATH", str(tmp_path / "index_version"))
+    report = run_load_test(sessions=3, turns=3, documents=2, pages=2, trace_memory=True)
+    # Each session's conversation memory is still referenced when measured
+    assert report["memory"]["traced_per_session_kb"] > 0
+    assert report["memory"]["traced_peak_kb"] >= report["memory"]["traced_retained_kb"]
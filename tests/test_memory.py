@@ -0,0 +1,32 @@
+from noc_prototype.memory import ConversationMemory, Turn
+from noc_prototype.utils import count_tokens
+
+def _turn(i):
+    return Turn(f"question {i}", f"standalone question {i}", "long answer " * 200, [])
+
+def test_history_is_windowed_and_token_capped():
+    memory = ConversationMemory(max_tokens=120, window_turns=2, answer_tokens=30)
+    for i in range(10):
+        memory.add_turn(_turn(i))
+    
+    history = memory.render()
+    assert count_tokens(history) <= 120
+    assert len(memory.turns) == 2
+    assert "User: question 9" in history and "User: question 7" not in history
+    assert "standalone question 7" in history  # Older turns survive in the summary
+
+def test_condensed_question_cached_per_turn():
+    memory = ConversationMemory()
+    memory.add_turn(_turn(0))
+    memory.set_condensed("And the shops?", "premium club shops")
+    assert memory.get_condensed("and the shops") == "premium club shops"
+    
+    # A new turn changes the history, so the question is condensed again
+    memory.add_turn(_turn(1))
+    assert memory.get_condensed("and the shops") is None
+
+def test_sources_reused_only_on_same_topic():
+    memory = ConversationMemory()
+    memory.add_turn(Turn("q", "q", "a", ["doc"], [1.0, 0.0]))
+    assert memory.reusable_sources([0.99, 0.05]) == ["doc"]
+    assert memory.reusable_sources([0.0, 1.0]) is None
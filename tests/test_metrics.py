@@ -0,0 +1,45 @@
+import asyncio
+from noc_prototype.metrics import (
+    INGEST_STAGE_SECONDS, MetricsRegistry, count, request_trace, span
+)
+
+def test_percentiles_cover_rolling_window():
+    registry = MetricsRegistry(window=10)
+    for seconds in range(100):
+        registry.observe("noc_query_stage_seconds", float(seconds), stage="llm")
+    # Only the last 10 samples count towards percentiles, all towards count/sum
+    assert registry.percentiles("noc_query_stage_seconds", stage="llm")[0.5] == 94.5
+    text = registry.to_prometheus()
+    assert 'noc_query_stage_seconds_count{stage="llm"} 100' in text
+    assert 'noc_query_stage_seconds_sum{stage="llm"} 4950.000000' in text
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.observe(INGEST_STAGE_SECONDS, 0.5, stage="embed_batch")
+    registry.inc("noc_ingest_chunks_total", 100)
+    registry.inc("noc_answer_cache_hits_total", match="exact")
+    lines = registry.to_prometheus().splitlines()
+    assert "# TYPE noc_ingest_stage_seconds summary" in lines
+    assert 'noc_ingest_stage_seconds{stage="embed_batch",quantile="0.99"} 0.500000' in lines
+    assert "# TYPE noc_ingest_chunks_total counter" in lines
+    assert "noc_ingest_chunks_total 100" in lines
+    assert 'noc_answer_cache_hits_total{match="exact"} 1' in lines
+
+def test_request_trace_collects_nested_and_async_stages():
+    registry = MetricsRegistry()
+
+    async def search():
+        with span("vector_search", registry=registry):
+            await asyncio.to_thread(lambda: count("noc_prompt_tokens_total", 42, registry=registry))
+
+    with request_trace("chat", registry) as trace:
+        with request_trace("get_response", registry) as inner:
+            assert inner is trace  # Nested requests join the outer trace
+            asyncio.run(search())
+        with span("render", registry=registry):
+            pass
+
+    assert set(trace.stages) == {"vector_search", "render"}
+    assert trace.counters == {"noc_prompt_tokens_total": 42}
+    assert [t["name"] for t in registry.traces] == ["chat"]
+    assert registry.percentiles("noc_request_seconds", kind="chat")
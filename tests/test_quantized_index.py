@@ -0,0 +1,150 @@
+import numpy as np
+import pytest
+from langchain.schema import Document
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from noc_prototype.quantized_index import QuantizedIndex, recall_report, synthetic_embeddings
+from noc_prototype.vector_store import QuantizedBackend
+
+def exact_top_k(vectors, query, k):
+    return set(np.argsort(-(vectors @ query))[:k].tolist())
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_round_trip_and_persistence(tmp_path, dtype):
+    vectors = synthetic_embeddings(200, 64)
+    docs = [Document(page_content=f"chunk {i}", metadata={"page": i}) for i in range(200)]
+    index = QuantizedIndex(str(tmp_path), dtype)
+    index.upsert([str(i) for i in range(200)], vectors, docs)
+
+    # Reopened from disk, a stored vector finds itself first
+    reopened = QuantizedIndex(str(tmp_path))
+    assert reopened.dtype == dtype and len(reopened) == 200
+    row, score = reopened.search(vectors[17], k=1)[0]
+    assert reopened.document(row).page_content == "chunk 17"
+    assert score == pytest.approx(1.0, abs=1e-2)
+
+    # Replacing and deleting tombstone the old rows
+    reopened.upsert(["17"], [vectors[3]], [Document(page_content="moved", metadata={"page": 17})])
+    reopened.delete(["3"])
+    results = reopened.similarity_search_by_vector_with_score(list(vectors[3]), k=1)
+    assert results[0][0].page_content == "moved"
+    assert len(QuantizedIndex(str(tmp_path))) == 199
+
+def test_interrupted_writes_are_discarded_on_open(tmp_path):
+    vectors = synthetic_embeddings(12, 32)
+    index = QuantizedIndex(str(tmp_path), "int8")
+    index.upsert([str(i) for i in range(10)], vectors[:10])
+    index.close()
+
+    # A batch that died after writing its vectors but before logging its rows
+    with open(tmp_path / "vectors.bin", "ab") as f:
+        f.write(np.full((2, 32), -127, dtype=np.int8).tobytes())
+    with open(tmp_path / "scales.bin", "ab") as f:
+        f.write(np.full(2, 9.0, dtype=np.float32).tobytes())
+    with open(tmp_path / "rows.jsonl", "ab") as f:
+        f.write(b'{"id":"half-writ')
+
+    reopened = QuantizedIndex(str(tmp_path))
+    assert len(reopened) == 10
+    reopened.upsert(["10", "11"], vectors[10:])
+    for i in (10, 11):
+        row, score = reopened.search(vectors[i], k=1)[0]
+        assert reopened.ids[row] == str(i)
+        assert score == pytest.approx(1.0, abs=1e-2)
+    assert len(QuantizedIndex(str(tmp_path))) == 12
+
+def test_interrupted_compaction_keeps_previous_generation(tmp_path, monkeypatch):
+    vectors = synthetic_embeddings(10, 32)
+    docs = [Document(page_content=f"chunk {i}") for i in range(10)]
+    index = QuantizedIndex(str(tmp_path), "int8")
+    index.upsert([str(i) for i in range(10)], vectors, docs)
+    index.delete(["0", "1", "2"])
+
+    # Dies after writing the new generation but before index.json names it
+    def crash(self, files):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(QuantizedIndex, "_commit", crash)
+    with pytest.raises(KeyboardInterrupt):
+        index.compact()
+    monkeypatch.undo()
+
+    reopened = QuantizedIndex(str(tmp_path))
+    assert len(reopened) == 7 and reopened.generation == 0
+    row, _ = reopened.search(vectors[9], k=1)[0]
+    assert reopened.document(row).page_content == "chunk 9"
+
+    # The next compaction overwrites the leftovers and drops the old files
+    reopened.compact()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "index.json", "rows.1.jsonl", "scales.1.bin", "texts.1.bin", "vectors.1.bin"
+    ]
+    reopened = QuantizedIndex(str(tmp_path))
+    assert (len(reopened), len(reopened.ids)) == (7, 7)
+    row, _ = reopened.search(vectors[9], k=1)[0]
+    assert reopened.document(row).page_content == "chunk 9"
+    reopened.clear()
+    assert list(tmp_path.iterdir()) == []
+
+def test_int8_recall_against_exact_search(tmp_path):
+    vectors = synthetic_embeddings(2000, 128)
+    queries = synthetic_embeddings(20, 128, seed=1)
+    index = QuantizedIndex(str(tmp_path), "int8")
+    index.upsert([str(i) for i in range(2000)], vectors)
+
+    hits = sum(
+        len(exact_top_k(vectors, query, 10) & {row for row, _ in index.search(query, k=10)})
+        for query in queries
+    )
+    assert hits / 200 >= 0.9
+    # A byte per dimension plus the row's scale, against four bytes per dimension
+    assert index.vector_bytes == 128 + 4
+
+def test_ivf_searches_nearby_partitions(tmp_path):
+    vectors = synthetic_embeddings(2000, 64)
+    index = QuantizedIndex(str(tmp_path), "int8")
+    index.upsert([str(i) for i in range(2000)], vectors)
+    query = vectors[5]
+    exact = index.search(query, k=5)
+    index.train_ivf(16)
+
+    # Probing every partition is the same as an exact scan
+    assert index.search(query, k=5, n_probe=16) == exact
+    assert index.search(query, k=5, n_probe=4)[0][0] == 5
+
+    # Partitions survive a reload and new rows are assigned to one
+    reopened = QuantizedIndex(str(tmp_path))
+    assert reopened.centroids.shape == (16, 64)
+    reopened.upsert(["new"], [vectors[5]])
+    assert {row for row, _ in reopened.search(query, k=2, n_probe=1)} == {5, 2000}
+
+def test_filter_and_backend(tmp_path):
+    backend = QuantizedBackend(DeterministicFakeEmbedding(size=32), directory=str(tmp_path))
+    backend.from_documents([
+        Document(page_content="voucher refund", metadata={"source": "a.pdf", "product_area": "payments"}),
+        Document(page_content="voucher shops", metadata={"source": "b.pdf", "product_area": "premium_club"}),
+    ], ids=["a", "b"])
+    assert backend.verify() == 2
+
+    query_vector = backend.embeddings.embed_query("voucher refund")
+    store = backend.load()
+    matches = store.similarity_search_by_vector_with_vectors(query_vector, k=2)
+    assert matches[0][0].metadata["source"] == "a.pdf"
+    assert len(matches[0][2]) == 32
+    scoped = store.similarity_search_by_vector_with_vectors(
+        query_vector, k=2, filter={"product_area": {"$eq": "premium_club"}}
+    )
+    assert [doc.metadata["source"] for doc, _, _ in scoped] == ["b.pdf"]
+
+    backend.delete_all()
+    assert backend.verify() == 0
+
+def test_recall_report_compares_settings():
+    vectors = synthetic_embeddings(600, 64)
+    report = recall_report(vectors[:500], vectors[500:], k=5, dimensions=(None, 32),
+                           dtypes=("float32", "int8"), ivf_lists=8, probes=(4,))
+    exact = report[0]
+    assert (exact["dimension"], exact["dtype"], exact["recall_at_5"]) == (64, "float32", 1.0)
+    int8 = next(row for row in report if row["dtype"] == "int8" and row["dimension"] == 64 and not row["ivf_lists"])
+    assert int8["compression"] == pytest.approx(256 / 68)
+    ivf = [row for row in report if row["ivf_lists"]]
+    assert [(row["dimension"], row["probes"]) for row in ivf] == [(64, 4), (32, 4)]
+    assert all(0 < row["recall_at_5"] <= 1 for row in ivf)
@@ -0,0 +1,12 @@
+from noc_prototype.rerank import mmr_select
+
+def test_mmr_skips_near_duplicates():
+    relevance = [0.90, 0.89, 0.70, 0.60]
+    vectors = [[1.0, 0.0], [0.99, 0.01], [0.0, 1.0], [0.7, 0.7]]
+    # The runner-up is a near copy of the best match, so a different chunk wins
+    assert mmr_select(relevance, vectors, k=2) == [0, 2]
+    assert mmr_select(relevance, vectors, k=2, lambda_mult=1.0) == [0, 1]
+
+def test_mmr_without_vectors_keeps_relevance_order():
+    assert mmr_select([0.2, 0.9, 0.5], [None, None, None], k=2) == [1, 2]
+    assert mmr_select([0.5], [None], k=4) == [0]
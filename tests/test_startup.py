@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+
+# Generous enough for a slow CI box; a regression back to eager imports
+# of the clients costs several seconds
+IMPORT_BUDGET_SECONDS = 2.0
+
+HEAVY_MODULES = [
+    "streamlit", "pinecone", "unstructured", "langchain_openai",
+    "langchain_community", "chromadb",
+]
+
+def _import_in_subprocess(module):
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_config_import_does_not_touch_environment():
+    result = subprocess.run(
+        [sys.executable, "-c", "import os; import noc_prototype.config; print(os.environ.get('NOC_STARTUP_CHECK'))"],
+        capture_output=True, text=True, check=True,
+        env={**os.environ, "NOC_STARTUP_CHECK": "kept"}
+    )
+    assert result.stdout.strip().splitlines()[-1] == "kept"
+
+def test_chat_engine_import_is_lazy_and_fast():
+    result = _import_in_subprocess("noc_prototype.chat_engine")
+    assert result["loaded"] == []
+    assert result["seconds"] < IMPORT_BUDGET_SECONDS
+
+def test_vector_store_import_is_lazy():
+    result = _import_in_subprocess("noc_prototype.vector_store")
+    assert result["loaded"] == []
@@ -0,0 +1,39 @@
+from noc_prototype.document_loader import DocumentLoader
+from noc_prototype.tags import build_filter, matches_filter, tag_document
+
+def test_tags_from_folder_keywords_and_mtime(tmp_path):
+    pdf = tmp_path / "data" / "Payments" / "refund_runbook.pdf"
+    pdf.parent.mkdir(parents=True)
+    pdf.write_bytes(b"%PDF")
+    tags = tag_document(str(pdf), "Steps for SMS issues", data_dir=str(tmp_path / "data"))
+    # The folder wins over keywords in the text; the filename names the type
+    assert tags["product_area"] == "payments"
+    assert tags["document_type"] == "runbook"
+    assert tags["last_modified"] == int(pdf.stat().st_mtime)
+    
+    tags = tag_document("data/NOC handbook.pdf", "Premium Club voucher escalation contacts")
+    assert tags == {"product_area": "premium_club", "document_type": "escalation"}
+
+def test_chunks_carry_tags_including_untagged_documents():
+    doc = {
+        "metadata": {"source": "data/sms_faq.pdf", "filename": "sms_faq.pdf"},
+        "content": [{"type": "Text", "page_number": 2, "text": "How to resend the code"}]
+    }
+    chunk, = DocumentLoader().split_json_document(doc)
+    assert chunk.metadata["product_area"] == "sms"
+    assert chunk.metadata["document_type"] == "faq"
+    assert chunk.metadata["page"] == 2
+
+def test_build_and_match_filter():
+    assert build_filter() is None
+    assert build_filter(product_area="sms") == {"product_area": {"$eq": "sms"}}
+    
+    scope = build_filter(product_area=["sms", "payments"], document_type="runbook",
+                         modified_since=100.5, pages=(0, 3))
+    assert scope["$and"][0] == {"product_area": {"$in": ["sms", "payments"]}}
+    assert scope["$and"][2] == {"last_modified": {"$gte": 100}}
+    
+    metadata = {"product_area": "sms", "document_type": "runbook", "last_modified": 200, "page": 1}
+    assert matches_filter(metadata, scope)
+    assert not matches_filter({**metadata, "page": 4}, scope)
+    assert not matches_filter({"product_area": "sms", "document_type": "runbook", "page": 1}, scope)
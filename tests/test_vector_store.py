@@ -0,0 +1,141 @@
+import os
+import pytest
+from langchain.schema import Document
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from noc_prototype.vector_store import ChromaBackend, get_backend
+
+def test_chroma_backend_round_trip(tmp_path):
+    backend = ChromaBackend(
+        embeddings=DeterministicFakeEmbedding(size=32),
+        persist_directory=str(tmp_path / "chroma"),
+        collection_name="test_docs"
+    )
+    backend.from_documents([
+        Document(page_content="premium club voucher", metadata={"source": "a.pdf"}),
+        Document(page_content="sms verification", metadata={"source": "b.pdf"}),
+    ])
+    
+    # Reload from disk and check scores are similarities, best first
+    results = backend.load().similarity_search_with_score("premium club voucher", k=2)
+    assert results[0][0].metadata["source"] == "a.pdf"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-3)
+    assert results[0][1] > results[1][1]
+    assert backend.verify() == 2
+    
+    # Stored vectors come back with the matches for re-ranking
+    query_vector = backend.embeddings.embed_query("premium club voucher")
+    matches = backend.load().similarity_search_by_vector_with_vectors(query_vector, k=2)
+    assert matches[0][0].metadata["source"] == "a.pdf"
+    assert matches[0][1] == pytest.approx(results[0][1], abs=1e-3)
+    assert len(matches[0][2]) == 32
+
+def test_chroma_search_applies_metadata_filter(tmp_path):
+    from noc_prototype.tags import build_filter
+    backend = ChromaBackend(
+        embeddings=DeterministicFakeEmbedding(size=32),
+        persist_directory=str(tmp_path / "chroma"),
+        collection_name="test_docs"
+    )
+    backend.from_documents([
+        Document(page_content="voucher refund", metadata={"source": "a.pdf", "product_area": "payments", "page": 0}),
+        Document(page_content="voucher shops", metadata={"source": "b.pdf", "product_area": "premium_club", "page": 0}),
+        Document(page_content="voucher limits", metadata={"source": "c.pdf", "product_area": "premium_club", "page": 7}),
+    ])
+    query_vector = backend.embeddings.embed_query("voucher")
+    scope = build_filter(product_area=["premium_club"], pages=(0, 5))
+    matches = backend.load().similarity_search_by_vector_with_vectors(query_vector, k=3, filter=scope)
+    assert [doc.metadata["source"] for doc, _, _ in matches] == ["b.pdf"]
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_backend("faiss")
+
+def test_update_index_only_touches_changed_chunks(tmp_path, monkeypatch):
+    from noc_prototype import utils, vector_store
+    from noc_prototype.tags import build_filter
+    
+    def fake_extract_pdfs(pdf_paths, **kwargs):
+        # Each line of the fake "PDF" is a page
+        for pdf_path in pdf_paths:
+            lines = pdf_path.read_text(encoding="utf-8").splitlines()
+            yield pdf_path, {
+                "metadata": {"source": str(pdf_path), "filename": pdf_path.name},
+                "content": [
+                    {"type": "Text", "page_number": i, "text": line}
+                    for i, line in enumerate(lines)
+                ]
+            }
+    
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda key: DeterministicFakeEmbedding(size=16))
+    monkeypatch.setattr(vector_store, "extract_pdfs", fake_extract_pdfs)
+    monkeypatch.setattr(vector_store, "get_backend", lambda name, embeddings: ChromaBackend(
+        embeddings, persist_directory=str(tmp_path / "chroma"), collection_name="test_docs"
+    ))
+    monkeypatch.setattr(utils, "INDEX_VERSION_PATH", str(tmp_path / "index_version"))
+    
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "a.pdf").write_text("premium club voucher\nsms verification", encoding="utf-8")
+    (data_dir / "b.pdf").write_text("escalation contacts", encoding="utf-8")
+    kwargs = {
+        "data_dir": str(data_dir),
+        "output_dir": str(tmp_path / "processed"),
+        "manifest_path": str(tmp_path / "manifest.json"),
+        "lexical_index_path": str(tmp_path / "lexical.json")
+    }
+    
+    assert vector_store.update_index(**kwargs)["upserted"] == 3
+    assert vector_store.update_index(**kwargs) == {"upserted": 0, "deleted": 0, "unchanged_documents": 2}
+    
+    (data_dir / "a.pdf").write_text("premium club voucher\nsms verification disabled", encoding="utf-8")
+    os.utime(data_dir / "a.pdf", (2_000_000_000, 2_000_000_000))
+    (data_dir / "b.pdf").unlink()
+    summary = vector_store.update_index(**kwargs)
+    # The untouched first page is re-upserted only for its new last_modified tag
+    assert summary["upserted"] == 2 and summary["deleted"] == 1
+    backend = ChromaBackend(
+        embeddings=DeterministicFakeEmbedding(size=16),
+        persist_directory=str(tmp_path / "chroma"), collection_name="test_docs"
+    )
+    assert backend.verify() == 2
+    recent = backend.load().similarity_search_by_vector_with_vectors(
+        backend.embeddings.embed_query("premium club voucher"), k=2,
+        filter=build_filter(modified_since=2_000_000_000)
+    )
+    assert sorted(doc.page_content for doc, _, _ in recent) == ["premium club voucher", "sms verification disabled"]
+    
+    # The lexical index follows the same changes
+    from noc_prototype.lexical_index import BM25Index
+    lexical_index = BM25Index.load(str(tmp_path / "lexical.json"))
+    assert len(lexical_index) == 2
+    assert lexical_index.search("disabled")[0][0].metadata["source"].endswith("a.pdf")
+    assert lexical_index.search("escalation") == []
+
+def test_create_vector_store_streams_from_corpus(tmp_path, monkeypatch):
+    from noc_prototype import utils, vector_store
+    from noc_prototype.corpus import CorpusStore
+    from noc_prototype.lexical_index import BM25Index
+    
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda key: DeterministicFakeEmbedding(size=16))
+    monkeypatch.setattr(vector_store, "get_backend", lambda name, embeddings: ChromaBackend(
+        embeddings, persist_directory=str(tmp_path / "chroma"), collection_name="test_docs"
+    ))
+    monkeypatch.setattr(utils, "INDEX_VERSION_PATH", str(tmp_path / "index_version"))
+    monkeypatch.setattr(vector_store, "discard_manifest", lambda: None)
+    monkeypatch.chdir(tmp_path)
+    
+    with CorpusStore(str(tmp_path / "processed")) as corpus:
+        for name in ["a", "b", "c"]:
+            corpus.put({
+                "metadata": {"source": f"data/{name}.pdf", "filename": f"{name}.pdf"},
+                "content": [{"type": "Text", "page_number": 0, "text": f"{name} runbook page"}]
+            })
+    
+    vector_store.VectorStore().create_vector_store(
+        processed_dir=str(tmp_path / "processed"),
+        lexical_index_path=str(tmp_path / "lexical.json")
+    )
+    assert ChromaBackend(persist_directory=str(tmp_path / "chroma"), collection_name="test_docs").verify() == 3
+    assert len(BM25Index.load(str(tmp_path / "lexical.json"))) == 3